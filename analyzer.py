@@ -3,21 +3,26 @@
 
 import argparse; # Script arguments
 import ast;
-import bokeh.io; # Interactive graphs in Jupyter Notebook.
-import bokeh.layouts; # Output HTML column layout.
-import bokeh.models; # Graph y-range, Hover Tool.
-import bokeh.palettes; # Graph color palettes.
-import bokeh.plotting; # Graph plot handling.
+import collections; # Per-project partial aggregates (in order of appearance).
 import datetime;
 import io; # File writing.
 import math;
+import modules.instrument as instrument; # Per-phase timing spans
+import modules.lazy as lazy; # Heavy dependencies imported on first use
+import modules.profiling as profiling; # Profiler hook
 import modules.shared as sh;
-import numpy; # CDF, histogram graphs.
+import modules.sketch as sketch; # Approximate distinct counts
+import modules.spill as spill; # Per-project values kept on disk when streaming data store
+import multiprocessing; # Per-feature statistics in parallel.
 import os; # File, directory handling.
-import pandas; # DataFrame handling.
 import sys; # Script termination.
 import time; # Time processing.
 
+# (Imported on first use, so that argument errors, and importing this module as a library, do not wait on them.)
+bokeh = lazy.import_lazily('bokeh', ['io', 'layouts', 'models', 'palettes', 'plotting']); # Graphs: HTML column layout, y-range, Hover Tool, color palettes, plot handling.
+numpy = lazy.import_lazily('numpy'); # CDF, histogram graphs.
+pandas = lazy.import_lazily('pandas'); # DataFrame handling.
+
 
 # Global variables.
 
@@ -46,8 +51,12 @@ xlsx_page_index_lookup = list();
 
 dtdeltas = list();
 
-# Process script arguments.
-def process_args():
+rollups_df = None; # Per-project rollups kept in data store by scraper (None unless they stand in for project summaries).
+
+spill_db = None; # Spill database of plot points, commit hashes and time buckets of projects (while streaming data store).
+
+# Process script arguments (from command line, or from list of arguments).
+def process_args(argv=None):
     
     argparser = argparse.ArgumentParser();
     
@@ -60,17 +69,21 @@ def process_args():
     argparser.add_argument('--labels', help="label commit records", type=str);
     argparser.add_argument('--since', help="analyze information about commits records more recent than a specific date", type=str);
     argparser.add_argument('--until', help="analyze information about commits records older than a specific date", type=str);
+    argparser.add_argument('--chunk-size', help="stream data store in chunks of this many commit records (bounded memory)", type=int);
+    argparser.add_argument('--approx-distinct', help="count active time units with HyperLogLog sketches of this relative standard error (e.g., 0.01), instead of exactly", type=float);
+    argparser.add_argument('-j', '--jobs', help="number of processes computing per-feature statistics", type=int, default=1);
+    argparser.add_argument('--export-format', help="format of exported statistics tables (xlsx, csv, tsv or parquet)", type=str, default='xlsx');
+    argparser.add_argument('-q', '--quiet', help="leave out progress output (of analysis phases and data store chunks read)", action="store_true");
+    argparser.add_argument('--trace', help="trace file of per-phase timing spans (JSON lines, or Chrome trace if '.json')", type=str);
+    argparser.add_argument('--profile', help="profile run with 'cprofile' (deterministic) or 'sample' (stack sampling); reports go next to outputs", choices=profiling.PROFILE_MODES);
+    argparser.add_argument('--profile-memory', help="take memory snapshots at phase boundaries (tracemalloc if available); report goes next to outputs", action="store_true");
     
-    return argparser.parse_args();
+    return argparser.parse_args(argv);
 
 
-# Dict of each datetime delta and its corresponding named unit.
-DTDELTA_LABELS = {'Y' : 'total_num_years_active',
-                  'm' : 'total_num_months_active',
-                  'd' : 'total_num_days_active',
-                  'H' : 'total_num_hours_active',
-                  'M' : 'total_num_minutes_active',
-                  'S' : 'total_num_seconds_active'};
+# Dict of each datetime delta and its corresponding named unit, and of each datetime delta and strftime-like format of its time buckets.
+DTDELTA_LABELS = sh.DTDELTA_LABELS;
+DTDELTA_BUCKET_FORMATS = sh.DTDELTA_BUCKET_FORMATS;
 
 # Dict of recognized datetime delta units and corresponding labels.
 DTDELTA_CODE_LABELS = {'Y' : 'years',
@@ -85,26 +98,63 @@ def check_args():
     
     global ds_df;
     
+    # Trace file.
+    if (args.trace):
+        try:
+            instrument.open_trace(args.trace);
+        except IOError:
+            sys.exit('Bad trace file \'' + args.trace + '\'.');
+    
     if (args.data_store):
        
         data_store = args.data_store;
         
-        ds_df = sh.load_from_data_store(data_store);
-        if (ds_df.empty): # Meaning 'ds_df' is None...
-            sys.exit('Bad data store source \'' + args.data_store + '\'.');
+        if (args.chunk_size is not None): # Data store is streamed chunk by chunk (instead of loaded whole)...
+            if (args.chunk_size < 1):
+                sys.exit("Chunk size must be a positive number of commit records.");
+            if (not (os.path.isfile(data_store) or sh.is_partitioned_data_store(data_store)) or not data_store.endswith(('.xlsx', '.db', '.parquet'))):
+                sys.exit('Bad data store source \'' + args.data_store + '\'.');
         
     else:
         sys.exit("Must specify an input data store!");
     
+    if (args.jobs < 1):
+        sys.exit("Number of jobs must be a positive number.");
+    
+    if (args.export_format not in sh.EXPORT_FORMAT_EXTS):
+        sys.exit('Unrecognized export format \'' + args.export_format + '\'.');
+    
+    # Working directory.
+    args.directory = sh.get_wd(args.directory);
+    
+    try:
+        check_analysis_args();
+    except ValueError as e:
+        sys.exit(str(e));
+
+    # Load data store (a database data store only returns commit records within 'since'/'until' dates and labels; a
+    # Parquet data store skips partitions and row groups outside those dates).
+    if (args.chunk_size is None):
+        (since, until) = get_epoch_window();
+        span = instrument.start_span('analyzer.load');
+        ds_df = sh.load_from_data_store(args.data_store, since, until, args.labels);
+        instrument.add_counts(span, rows=len(ds_df.index));
+        instrument.end_span(span);
+        if (len(ds_df.columns) == 0): # Meaning data store could not be loaded (an empty selection still has columns)...
+            sys.exit('Bad data store source \'' + args.data_store + '\'.');
+    else:
+        ds_df = None;
+
+
+# Check script arguments that shape the analysis (also used by library entry point, which has no data store); bad arguments raise ValueError.
+def check_analysis_args():
+    
     global class_widths;
     class_widths = sh.get_intervals_dict(args.class_widths);
     
     global num_classes_dict;
     num_classes_dict = sh.get_intervals_dict(args.num_classes);
     
-    # Working directory.
-    args.directory = sh.get_wd(args.directory);
-    
     # Get valid DTDs.
     dtd_codes = list();
     if (args.dt_deltas):
@@ -116,6 +166,9 @@ def check_args():
                 print(sh.get_warning_str("Unrecognized datetime delta code \'" + dtd_code + "\'"));
     args.dt_deltas = list(set(dtd_codes));
 
+    if (args.approx_distinct is not None and not (0 < args.approx_distinct < 1)):
+        raise ValueError("Approximate distinct count error must be between 0 and 1.");
+
     # Label commit records.
     args.labels = sh.get_labels(args.labels);
 
@@ -128,12 +181,47 @@ def check_args():
     args.until = until_dt_str if until_dt_str else sh.get_utc_now_str();
 
 
+# Write progress line (over the current terminal line); nothing if quiet.
+def write_progress(progress_str):
+    
+    if (args.quiet):
+        return;
+    
+    sys.stdout.write("\r");
+    sys.stdout.write(progress_str);
+    sys.stdout.flush();
+
+
+# Print progress message (of analysis phase); nothing if quiet.
+def print_progress(progress_str):
+    
+    if (not args.quiet):
+        print(progress_str);
+
+
+# Get 'since' and 'until' dates as epochs.
+def get_epoch_window():
+    
+    since = float(sh.utc_str_to_epoch(args.since));
+    until = float(sh.utc_str_to_epoch(args.until));
+    
+    return since, until;
+
+
 # Print script argument configurations.
 def echo_args():
     
     print("DATA_STORE: \'" + args.data_store + "\'");
     print("SINCE: " + str(args.since));
     print("UNTIL: " + str(args.until));
+    if (args.chunk_size is not None):
+        print("CHUNK_SIZE: " + str(args.chunk_size));
+    if (args.approx_distinct is not None):
+        print("APPROX_DISTINCT: " + str(args.approx_distinct));
+    print("JOBS: " + str(args.jobs));
+    print("EXPORT_FORMAT: " + args.export_format);
+    if (args.trace):
+        print("TRACE: \'" + args.trace + "\'");
 
 
 # Prepare data store DataFrame of commit records for efficient use.
@@ -159,11 +247,13 @@ def prepare_records(old_ds_df):
             dt_str_column_name = 'committer_' + dtdelta_label + '_str';
             ds_df[dt_str_column_name] = '';
     
-    since = float(sh.utc_str_to_epoch(args.since));
-    until = float(sh.utc_str_to_epoch(args.until));
+    (since, until) = get_epoch_window();
 
     drop_these = list(); # List of indices of corresponding DataFrame rows to drop.
     
+    if (args.labels):
+        is_labelled = sh.get_labels_mask(ds_df['labels'], args.labels); # Whether each commit record is labelled with ANY user-supplied label.
+    
     # Determine which records to prune.
     init_num_records = ds_df.shape[0];
     for i in range(0, init_num_records): # For each project commit record (row) in data store DataFrame...
@@ -180,17 +270,9 @@ def prepare_records(old_ds_df):
 
             drop_these.append(i);
         
-        elif (args.labels):
-            
-            commit_record_labels_tuple = commit_record['labels'];
-            include_commit_record = False;
-            for label in args.labels: # For EACH user-supplied label...
-                
-                if (label in commit_record_labels_tuple): # If commit record is labelled with 'label'... 
-                    include_commit_record = True; # Indicate to include this commit record in resulting DataFrame.
+        elif (args.labels and not is_labelled[i]):
             
-            if (not include_commit_record):
-                drop_these.append(i);
+            drop_these.append(i);
         
         if (i not in drop_these): # If this commit record is to be included in final DataFrame...
 
@@ -251,12 +333,8 @@ def process_project_patterns(project_df, p):
     return p;
 
 
-# Get plot containing development timeline for each repository.
-def get_commit_patterns(project_ids_df, ds_df):
-    
-    global figs_list;
-    
-    num_projects = project_ids_df.shape[0];
+# Get (empty) plot for development timeline of each of some number of repositories.
+def get_commit_patterns_fig(num_projects):
     
     plot_title = "Commit Patterns (N=" + str(num_projects) + ")";
     
@@ -283,6 +361,18 @@ def get_commit_patterns(project_ids_df, ds_df):
     p.yaxis.major_label_text_font_size='0pt';
     p.yaxis.axis_label_text_font_size=font_size;
 
+    return p;
+
+
+# Get plot containing development timeline for each repository.
+def get_commit_patterns(project_ids_df, ds_df):
+    
+    global figs_list;
+    
+    num_projects = project_ids_df.shape[0];
+    
+    p = get_commit_patterns_fig(num_projects);
+
     for i in range(0, num_projects): # For each project...
 
         if (args.paths_as_projects):
@@ -304,6 +394,37 @@ def get_commit_patterns(project_ids_df, ds_df):
     figs_list.append(p);
 
 
+# Get plot containing development timeline for each repository, from commit records kept in per-project partial aggregates.
+def get_chunked_commit_patterns(project_partials):
+    
+    global figs_list;
+    
+    num_projects = len(project_partials);
+    
+    p = get_commit_patterns_fig(num_projects);
+
+    i = 0;
+    for partial in project_partials.values(): # For each project (in order of appearance)...
+
+        (column_labels, points) = spill.get_points(spill_db, partial['index']); # (Read back one project at a time, in data store order.)
+        project_df = pandas.DataFrame.from_records(points, columns=column_labels)[PATTERN_COLUMN_LABELS];
+        for column_label in SUMMED_COLUMN_LABELS:
+            if (project_df[column_label].dtype == object): # (Line counts all missing; NaN, as kept in data store.)
+                project_df[column_label] = project_df[column_label].astype(float);
+        
+        committer_epochs = project_df['committer_epoch'].tolist();
+        num_commits = project_df.shape[0];
+        pindex = [i+1 for c in range(0, num_commits)];
+        project_df = project_df.drop('committer_epoch', axis=1);
+        project_df = project_df.assign(committer_datetime=[datetime.datetime.fromtimestamp(e) for e in committer_epochs],
+                                       committer_date_str=[datetime.datetime.fromtimestamp(e).strftime('%Y-%m-%d %H:%M:%S '+time.tzname[1]) for e in committer_epochs],
+                                       project_index=pindex);
+        p = process_project_patterns(project_df, p);
+        i = i + 1;
+
+    figs_list.append(p);
+
+
 # Dict of commit attributes names in plain English.
 commit_attribute_titles_dict = {'num_commits' : 'Number of Commits',
                                 'num_lines_changed' : 'Number of Lines Changed',
@@ -577,7 +698,7 @@ def get_commit_attribute_activity(commit_attribute, orig_ds_df):
             #print "snooper snooper snooper"
             #print project_df
             #p_df = project_df;
-            i = project_df.groupby(ID).sum();
+            i = project_df.groupby(ID, observed=True).sum(); # (Only combinations present; ID columns may be categorical.)
             i = i.reset_index();
             #print i
             #project_df = project_df.reset_index(drop=True);
@@ -684,7 +805,7 @@ def get_commit_attribute_cumsum(commit_attribute, orig_ds_df):
                                                   (relevant_projects_df['repo_owner'] == project_ids_df.iloc[i]['repo_owner']) &
                                                   (relevant_projects_df['repo_name'] == project_ids_df.iloc[i]['repo_name'])];# &
 
-            i = project_df.groupby(ID).sum();
+            i = project_df.groupby(ID, observed=True).sum(); # (Only combinations present; ID columns may be categorical.)
             i = i.reset_index();
 
             ii = i.copy();
@@ -759,6 +880,33 @@ def epoch_to_local_utc(epoch):
     return datetime.datetime.fromtimestamp(float(epoch));
 
 
+# Get new (empty) distinct datetime delta strings (time buckets): a set, or a sketch if counted approximately.
+def get_new_dtdelta_buckets():
+
+    if (args.approx_distinct is not None):
+        return sketch.new_sketch(sketch.get_precision(args.approx_distinct));
+
+    return set();
+
+
+# Add datetime delta strings to distinct time buckets.
+def add_dtdelta_buckets(buckets, dtdelta_strs):
+
+    if (isinstance(buckets, set)):
+        buckets.update(dtdelta_strs);
+    else:
+        sketch.update(buckets, dtdelta_strs);
+
+
+# Get number of distinct time buckets (estimated, if counted approximately).
+def get_num_dtdelta_buckets(buckets):
+
+    if (isinstance(buckets, set)):
+        return len(buckets);
+
+    return sketch.count(buckets);
+
+
 # Get number of datetime deltas given some list of epochs.
 def get_num_dtdeltas(epochs, dtdelta_code):
 
@@ -769,9 +917,10 @@ def get_num_dtdeltas(epochs, dtdelta_code):
         dtdelta_str = get_dtdelta_dt_str(dt, dtdelta_code);
         dtdeltas.append(dtdelta_str);
 
-    dtdeltas = list(set(dtdeltas));
+    buckets = get_new_dtdelta_buckets();
+    add_dtdelta_buckets(buckets, dtdeltas);
 
-    num_dtdeltas = len(dtdeltas);
+    num_dtdeltas = get_num_dtdelta_buckets(buckets);
 
     return num_dtdeltas;
 
@@ -863,6 +1012,294 @@ def get_project_summaries_df(features, project_ids_df, ds_df):
     return project_summaries_df;
 
 
+# Commit record columns summed into project summaries.
+SUMMED_COLUMN_LABELS = ['num_lines_changed', 'num_lines_inserted', 'num_lines_deleted', 'num_lines_modified'];
+
+# Commit record columns spilled (per project) for 'Commit Patterns' plot when streaming data store: those plotted or shown on hover.
+# (Committer dates are kept as epochs, and only formatted when plotted.)
+PATTERN_COLUMN_LABELS = ['repo_remote_hostname', 'repo_owner', 'repo_name', 'path_in_repo',
+                         'committer_epoch',
+                         'num_lines_changed', 'num_lines_inserted', 'num_lines_deleted', 'num_lines_modified'];
+
+
+# Filter chunk of commit records: drop records outside since/until dates or without any of the labels (as 'prepare_records' does for whole data store).
+def filter_records_chunk(chunk_df, since, until):
+
+    author_epochs = chunk_df['author_epoch'].astype(float);
+    committer_epochs = chunk_df['committer_epoch'].astype(float);
+
+    drop_mask = ((author_epochs < since) |
+                 (author_epochs > until) |
+                 (committer_epochs < since) |
+                 (committer_epochs > until));
+    
+    if (args.labels): # Drop commit records not labelled with ANY user-supplied label...
+        drop_mask = drop_mask | (~sh.get_labels_mask(chunk_df['labels'], args.labels));
+    
+    chunk_df = chunk_df[~drop_mask.values];
+    chunk_df = chunk_df.reset_index(drop=True); # Reset DataFrame row indices.
+    
+    return chunk_df;
+
+
+# Get new (empty) partial aggregates of a project (of some index in spill database). Plot points, commit hashes and time
+# buckets are spilled to disk, so partial aggregates do not grow with the number of commit records.
+def get_new_project_partial(project_index):
+
+    partial = {'index' : project_index,
+               'paths_in_repo' : list(), # Distinct paths, in order of appearance.
+               'first_row' : None, # Position in data store of first commit record (for partitioned data stores, streamed out of data store order).
+               'dtdeltas' : None}; # Sketches of time buckets per datetime delta, if counted approximately (else buckets spilled).
+    if (args.approx_distinct is not None):
+        partial['dtdeltas'] = dict([(dtdelta_code, get_new_dtdelta_buckets()) for dtdelta_code in dtdeltas]);
+    for column_label in SUMMED_COLUMN_LABELS:
+        partial[column_label] = 0;
+
+    return partial;
+
+
+# Fold chunk of (prepared) commit records into per-project partial aggregates, spilling plot points, commit hashes and
+# time buckets; records are at positions from 'first_row' on in data store (unless streamed with their positions).
+def fold_records_chunk(chunk_df, project_partials, first_row):
+
+    if (args.paths_as_projects):
+        ID = ['repo_remote_hostname', 'repo_owner', 'repo_name', 'path_in_repo'];
+    else:
+        ID = ['repo_remote_hostname', 'repo_owner', 'repo_name'];
+
+    if (chunk_df.empty):
+        return;
+
+    project_ids_df = chunk_df[ID].drop_duplicates(); # Projects, in order of appearance.
+    project_rows = chunk_df.groupby(ID, sort=False, observed=True).indices; # Row positions of each project.
+
+    if (sh.PARTITION_ROW_COLUMN in chunk_df.columns):
+        rows = numpy.asarray(chunk_df[sh.PARTITION_ROW_COLUMN]);
+    else:
+        rows = numpy.arange(first_row, first_row + chunk_df.shape[0]);
+
+    points = list();
+    commit_hashes = list();
+    buckets = list();
+    for project_id in project_ids_df.itertuples(index=False): # For each project in chunk...
+
+        project_id = tuple(project_id);
+        project_df = chunk_df.iloc[project_rows[project_id]];
+        project_records_rows = rows[project_rows[project_id]];
+
+        partial = project_partials.get(project_id);
+        if (partial is None):
+            partial = get_new_project_partial(len(project_partials));
+            project_partials[project_id] = partial;
+        project_index = partial['index'];
+
+        for path_in_repo in project_df['path_in_repo'].unique():
+            path_in_repo = str(path_in_repo);
+            if (path_in_repo not in partial['paths_in_repo']):
+                partial['paths_in_repo'].append(path_in_repo);
+
+        first_project_row = int(project_records_rows.min());
+        if (partial['first_row'] is None or first_project_row < partial['first_row']):
+            partial['first_row'] = first_project_row;
+
+        if (rollups_df is None): # (Otherwise, project summaries come from rollups.)
+            commit_hashes.extend([(project_index, commit_hash) for commit_hash in set(project_df['commit_hash'].tolist())]);
+
+        for column_label in SUMMED_COLUMN_LABELS:
+            partial[column_label] = partial[column_label] + project_df[column_label].sum(skipna=False);
+
+        if (rollups_df is None):
+            epochs = set(project_df['author_epoch'].tolist() + project_df['committer_epoch'].tolist());
+            dts = [epoch_to_local_utc(epoch) for epoch in epochs];
+            for dtdelta_code in dtdeltas:
+                dtdelta_strs = [get_dtdelta_dt_str(dt, dtdelta_code) for dt in dts];
+                if (partial['dtdeltas'] is None):
+                    buckets.extend([(project_index, dtdelta_code, dtdelta_str) for dtdelta_str in set(dtdelta_strs)]);
+                else:
+                    add_dtdelta_buckets(partial['dtdeltas'][dtdelta_code], dtdelta_strs);
+
+        pattern_columns = [project_df[column_label].tolist() for column_label in PATTERN_COLUMN_LABELS]; # (Plain values; sqlite3 does not take NumPy scalars.)
+        points.extend(zip([project_index] * project_df.shape[0], project_records_rows.tolist(), *pattern_columns));
+
+    spill.add_rows(spill_db, 'points', points);
+    spill.add_rows(spill_db, 'commit_hashes', commit_hashes);
+    spill.add_rows(spill_db, 'buckets', buckets);
+
+
+# Stream data store chunk by chunk, folding commit records into per-project partial aggregates (in order of appearance).
+def get_project_partials():
+
+    (since, until) = get_epoch_window();
+
+    global spill_db;
+    spill_db = spill.open_spill();
+
+    project_partials = collections.OrderedDict();
+
+    num_records = 0;
+    num_folded = 0;
+    for chunk_df in sh.iter_data_store_chunks(args.data_store, args.chunk_size, since, until, args.labels): # For each chunk of commit records...
+
+        num_records = num_records + chunk_df.shape[0];
+
+        chunk_df = filter_records_chunk(chunk_df, since, until);
+        fold_records_chunk(chunk_df, project_partials, num_folded);
+        num_folded = num_folded + chunk_df.shape[0];
+        
+        write_progress("Commit records read: " + str(num_records));
+    
+    if (not args.quiet):
+        sys.stdout.write("\n");
+
+    # Put projects in data store order (of partitioned data store, streamed out of order)...
+    project_partials = collections.OrderedDict(sorted(project_partials.items(), key=lambda item: item[1]['first_row']));
+
+    return project_partials;
+
+
+# Get project feature vectors by merging per-project partial aggregates (as 'get_project_summaries_df' builds them from whole data store).
+def get_merged_project_summaries_df(features, project_partials):
+
+    num_commits = spill.count_distinct(spill_db, 'commit_hashes');
+    num_buckets = spill.count_distinct(spill_db, 'buckets', ['dtdelta_code']);
+
+    summaries = list();
+    for (project_id, partial) in project_partials.items(): # For each project (in order of appearance)...
+
+        summary = {'repo_remote_hostname' : project_id[0],
+                   'repo_owner' : project_id[1],
+                   'repo_name' : project_id[2],
+                   'paths_in_repo' : tuple(list(set(partial['paths_in_repo']))),
+                   'total_num_commits' : num_commits[partial['index']]};
+        for column_label in SUMMED_COLUMN_LABELS:
+            summary['total_' + column_label] = partial[column_label];
+        for dtdelta_code in dtdeltas:
+            if (partial['dtdeltas'] is None):
+                summary[DTDELTA_LABELS[dtdelta_code]] = num_buckets[(partial['index'], dtdelta_code)];
+            else:
+                summary[DTDELTA_LABELS[dtdelta_code]] = get_num_dtdelta_buckets(partial['dtdeltas'][dtdelta_code]);
+        
+        summaries.append(summary);
+
+    return get_built_project_summaries_df(features, summaries);
+
+
+# Get project feature vectors computed by database data store itself, reading only commit records within 'since'/'until' dates and labels.
+def get_db_project_summaries_df(features):
+
+    if (args.paths_as_projects):
+        ID = ['repo_remote_hostname', 'repo_owner', 'repo_name', 'path_in_repo'];
+    else:
+        ID = ['repo_remote_hostname', 'repo_owner', 'repo_name'];
+    id_sql = ', '.join(ID);
+    num_id_columns = len(ID);
+
+    (since, until) = get_epoch_window();
+
+    db_conn = sh.connect_data_store_db(args.data_store, args.labels);
+    (filter_sql, params) = sh.get_commits_filter_sql(db_conn, since, until, args.labels);
+
+    summaries = collections.OrderedDict(); # Project summaries, in order of appearance.
+
+    # Commit counts and line sums (a missing line count makes sum missing, as with pandas).
+    sums_sql = ', '.join(['CASE WHEN COUNT(' + column_label + ') < COUNT(*) THEN NULL ELSE SUM(' + column_label + ') END' for column_label in SUMMED_COLUMN_LABELS]);
+    query = ('SELECT ' + id_sql + ', COUNT(DISTINCT commit_hash), ' + sums_sql +
+             ' FROM commits WHERE ' + filter_sql + ' GROUP BY ' + id_sql + ' ORDER BY MIN(rowid);');
+    for row in db_conn.execute(query, params):
+
+        summary = {'repo_remote_hostname' : row[0],
+                   'repo_owner' : row[1],
+                   'repo_name' : row[2],
+                   'paths_in_repo' : list(),
+                   'total_num_commits' : row[num_id_columns]};
+        for (j, column_label) in enumerate(SUMMED_COLUMN_LABELS):
+            total = row[num_id_columns + 1 + j];
+            summary['total_' + column_label] = total if (total is not None) else float('nan');
+
+        summaries[tuple(row[:num_id_columns])] = summary;
+
+    # Distinct paths of each project, in order of appearance.
+    query = ('SELECT ' + id_sql + ', path_in_repo' +
+             ' FROM commits WHERE ' + filter_sql + ' GROUP BY ' + id_sql + ', path_in_repo ORDER BY MIN(rowid);');
+    for row in db_conn.execute(query, params):
+        summaries[tuple(row[:num_id_columns])]['paths_in_repo'].append(str(row[-1]));
+
+    # Distinct time buckets (of author and committer dates) of each project, per datetime delta.
+    buckets_sql = ', '.join(["COUNT(DISTINCT strftime(?, epoch, 'unixepoch', 'localtime'))" for dtdelta_code in dtdeltas]);
+    query = ('SELECT ' + id_sql + ', ' + buckets_sql +
+             ' FROM (SELECT ' + id_sql + ', author_epoch AS epoch FROM commits WHERE ' + filter_sql +
+             ' UNION ALL SELECT ' + id_sql + ', committer_epoch AS epoch FROM commits WHERE ' + filter_sql + ')' +
+             ' GROUP BY ' + id_sql + ';');
+    bucket_params = [DTDELTA_BUCKET_FORMATS[dtdelta_code] for dtdelta_code in dtdeltas] + params + params;
+    for row in db_conn.execute(query, bucket_params):
+        summary = summaries[tuple(row[:num_id_columns])];
+        for (j, dtdelta_code) in enumerate(dtdeltas):
+            summary[DTDELTA_LABELS[dtdelta_code]] = row[num_id_columns + j];
+
+    db_conn.close();
+
+    for summary in summaries.values():
+        summary['paths_in_repo'] = tuple(list(set(summary['paths_in_repo'])));
+
+    return get_built_project_summaries_df(features, list(summaries.values()));
+
+
+# Get project feature vectors DataFrame from project summaries (dicts of project ID and feature values).
+def get_built_project_summaries_df(features, summaries):
+
+    COLUMN_LABELS = ['repo_remote_hostname', 'repo_owner', 'repo_name', 'paths_in_repo'] + features;
+
+    rows = [[summary[column_label] for column_label in COLUMN_LABELS] for summary in summaries];
+
+    project_summaries_df = pandas.DataFrame(rows, columns=COLUMN_LABELS, dtype=object);
+
+    sheet_name = 'project_activity_summaries';
+    dfs.append((project_summaries_df, sheet_name, False));
+
+    return project_summaries_df;
+
+
+# Get per-project rollups kept in data store by scraper (see 'sh.update_rollups'), if they can stand in for project
+# summaries built from commit records: no labels, all commit records within 'since'/'until' dates, rollups of every
+# commit record of data store, and time buckets in same local timezone. (None otherwise; e.g., for custom windows.)
+def get_applicable_rollups_df():
+
+    if (args.labels or not args.data_store.endswith(('.db', '.parquet'))):
+        return None;
+
+    rollups_df = sh.load_rollups(args.data_store);
+    if (rollups_df is None or rollups_df.empty):
+        return None;
+
+    (since, until) = get_epoch_window();
+    if (rollups_df['first_epoch'].min() < since or rollups_df['last_epoch'].max() > until): # Some commit records outside window...
+        return None;
+
+    if ((rollups_df['timezone'] != sh.get_local_timezone_str()).any()):
+        return None;
+
+    if (rollups_df[rollups_df['path_in_repo'].isnull()]['num_records'].sum() != sh.get_data_store_num_records(args.data_store)): # Data store changed since rolled up...
+        return None;
+
+    return rollups_df;
+
+
+# Get project feature vectors from per-project rollups (repo rollups, or path rollups if paths are projects), in data store order.
+def get_rollup_project_summaries_df(features):
+
+    if (args.paths_as_projects):
+        project_rollups_df = rollups_df[rollups_df['path_in_repo'].notnull()];
+    else:
+        project_rollups_df = rollups_df[rollups_df['path_in_repo'].isnull()];
+    project_rollups_df = project_rollups_df.sort_values(by='first_row', kind='mergesort');
+
+    summaries = project_rollups_df.to_dict('records');
+    for summary in summaries:
+        summary['paths_in_repo'] = tuple(list(set(ast.literal_eval(summary['paths_in_repo']))));
+
+    return get_built_project_summaries_df(features, summaries);
+
+
 # Dict of commit attributes names in plain English.
 feature_titles_dict = {'total_num_commits' : 'Total Number of Commits',
                        #'total_num_files_changed' : 'Total Number of Files Changed',
@@ -1286,6 +1723,27 @@ def get_feature_freq_dist_df(feature, use_singleunit_iwidth, project_summaries_d
     return df;
 
 
+# Get frequency distribution DataFrames of a feature (for spreadsheet, CDF and histogram), given (feature, project summaries DataFrame) pair.
+# (Pure function of project summaries, so features can be processed in parallel; figures are built afterwards, in order.)
+def get_feature_freq_dist_dfs(feature_job):
+    
+    (feature, project_summaries_df) = feature_job;
+    
+    # This signifies the case where the user didn't specify either of the (implied) below.
+    # In this instance, force the interval width ('iwidth') to 1 unit.
+    if (feature not in class_widths and
+        feature not in num_classes_dict):
+        feature_freq_dist_df = get_feature_freq_dist_df(feature, True, project_summaries_df);
+        cdf_freq_dist_df = feature_freq_dist_df;
+        histogram_freq_dist_df = get_feature_freq_dist_df(feature, False, project_summaries_df);
+    else:
+        feature_freq_dist_df = get_feature_freq_dist_df(feature, False, project_summaries_df);
+        cdf_freq_dist_df = get_feature_freq_dist_df(feature, True, project_summaries_df); # Need this because CDF always relies on iwidth being =1;
+        histogram_freq_dist_df = feature_freq_dist_df; # (Same intervals.)
+    
+    return feature_freq_dist_df, cdf_freq_dist_df, histogram_freq_dist_df;
+
+
 # Plot CDF for some feature.
 def process_new_cdf(feature, feature_freq_dist_df, p):
         
@@ -1350,6 +1808,76 @@ def get_cdf(feature, orig_feature_freq_dist_df):
     figs_list.append(p);
 
 
+# Get project features (summary columns), including one per considered datetime delta.
+def get_features():
+
+    features = ['total_num_commits',
+                'total_num_lines_changed',
+                'total_num_lines_inserted',
+                'total_num_lines_deleted',
+                'total_num_lines_modified'];
+    
+    dtdelta_labels = list();
+    for dtdelta_code in dtdeltas:
+
+        dtdelta_label = DTDELTA_LABELS[dtdelta_code];
+        dtdelta_labels.append(dtdelta_label);
+
+    return features + dtdelta_labels;
+
+
+# Analyze DataFrame of commit records (e.g., from 'scraper.scrape_repo'), without writing any outputs (library entry point):
+# get project summaries DataFrame, and dict of each feature and its frequency distribution DataFrame.
+# (Arguments as for the script: datetime deltas and labels are lists, class widths and number of classes are dicts by feature.
+# Bad arguments raise ValueError; 'quiet' leaves out progress output.)
+def analyze_df(ds_df, paths_as_projects=False, dt_deltas=None, labels=None, since=None, until=None, class_widths=None, num_classes=None, approx_distinct=None, quiet=False):
+    
+    global args;
+    global dtdeltas;
+    
+    argv = list();
+    if (paths_as_projects):
+        argv = argv + ['--paths-as-projects'];
+    if (dt_deltas):
+        argv = argv + ['--dt-deltas', ','.join(dt_deltas)];
+    if (labels):
+        argv = argv + ['--labels', ';'.join(labels)];
+    if (since):
+        argv = argv + ['--since', since];
+    if (until):
+        argv = argv + ['--until', until];
+    if (class_widths):
+        argv = argv + ['--class-widths', ';'.join([feature + ':' + str(class_widths[feature]) for feature in class_widths])];
+    if (num_classes):
+        argv = argv + ['--num-classes', ';'.join([feature + ':' + str(num_classes[feature]) for feature in num_classes])];
+    if (approx_distinct is not None):
+        argv = argv + ['--approx-distinct', str(approx_distinct)];
+    if (quiet):
+        argv = argv + ['--quiet'];
+    
+    args = process_args(argv);
+    check_analysis_args();
+    dtdeltas = list(set(['d'] + args.dt_deltas));
+    
+    del dfs[:]; # (Tables and figures of any previous analysis.)
+    del figs_list[:];
+    
+    feature_freq_dist_dfs = collections.OrderedDict();
+    
+    ds_df = prepare_records(ds_df);
+    if (ds_df.empty):
+        return pandas.DataFrame(), feature_freq_dist_dfs;
+    
+    features = get_features();
+    project_ids_df = get_project_ids_df(ds_df);
+    project_summaries_df = get_project_summaries_df(features, project_ids_df, ds_df);
+    for feature in features:
+        (feature_freq_dist_df, cdf_freq_dist_df, histogram_freq_dist_df) = get_feature_freq_dist_dfs((feature, project_summaries_df));
+        feature_freq_dist_dfs[feature] = feature_freq_dist_df;
+    
+    return project_summaries_df, feature_freq_dist_dfs;
+
+
 # Driver for analyzer.
 def main():
     
@@ -1358,19 +1886,40 @@ def main():
     global xlsfiles;
     
     args = process_args();
+    profiling.start(args.profile, args.profile_memory);
     print('');
     check_args();
     print('');
     echo_args();
     print('');
     start = datetime.datetime.now();
+    run_span = instrument.start_span('analyzer.run');
 
     global dtdeltas;
     dtdeltas = list(set(['d'] + args.dt_deltas));
     
-    ds_df = prepare_records(ds_df);
+    global rollups_df;
+    rollups_df = get_applicable_rollups_df();
+    instrument.set_attrs(run_span, rollups=(rollups_df is not None));
+    
+    if (args.chunk_size is not None): # Stream data store, keeping only per-project partial aggregates...
+        print_progress("Reading commit records (in chunks of " + str(args.chunk_size) + ")...");
+        span = instrument.start_span('analyzer.read_chunks');
+        project_partials = get_project_partials();
+        instrument.add_counts(span, rows=len(project_partials));
+        instrument.end_span(span);
+        print_progress("Done.");
+        has_records = (len(project_partials) > 0);
+        if (not has_records):
+            spill.close_spill(spill_db);
+    else:
+        span = instrument.start_span('analyzer.prepare_records');
+        ds_df = prepare_records(ds_df);
+        instrument.add_counts(span, rows=len(ds_df.index));
+        instrument.end_span(span);
+        has_records = (not ds_df.empty);
 
-    if (not ds_df.empty):
+    if (has_records):
         
         pathstr, file_ext = os.path.splitext(args.data_store);
         dir_name = args.directory if args.directory else os.path.dirname(pathstr);
@@ -1378,33 +1927,60 @@ def main():
         htmlfile = dir_name + '/' + filename + '-visual_analytics' + '.html';
         bokeh.plotting.output_file(htmlfile, title="Project Statistics");
 
-        print("Identifying projects...");
-        project_ids_df = get_project_ids_df(ds_df);
-        print("Done.");
-        
-        features = ['total_num_commits',
-                    'total_num_lines_changed',
-                    'total_num_lines_inserted',
-                    'total_num_lines_deleted',
-                    'total_num_lines_modified'];
-        
-        dtdelta_labels = list();
-        for dtdelta_code in dtdeltas:
+        FEATURES = get_features();
 
-            dtdelta_label = DTDELTA_LABELS[dtdelta_code];
-            dtdelta_labels.append(dtdelta_label);
-
-        FEATURES = features + dtdelta_labels;
+        if (args.chunk_size is not None):
+            
+            span = instrument.start_span('analyzer.project_summaries');
+            if (rollups_df is not None): # Project summaries kept in data store...
+                print_progress("Building project summaries from rollups...");
+                project_summaries_df = get_rollup_project_summaries_df(FEATURES);
+            else:
+                print_progress("Merging project summaries...");
+                project_summaries_df = get_merged_project_summaries_df(FEATURES, project_partials);
+            instrument.add_counts(span, rows=len(project_summaries_df.index));
+            instrument.end_span(span);
+            print_progress("Done.");
+            
+            print_progress("Generating project statistics...");
 
-        print("Building project summaries...");
-        project_summaries_df = get_project_summaries_df(FEATURES, project_ids_df, ds_df);
-        print("Done.");
+            span = instrument.start_span('analyzer.commit_patterns');
+            get_chunked_commit_patterns(project_partials);
+            instrument.end_span(span);
+            del project_partials;
+            spill.close_spill(spill_db); # (Spilled commit record values no longer needed.)
         
-        #num_projects = project_summaries_df.shape[0];    
-        
-        print("Generating project statistics...");
+        else:
+            
+            print_progress("Identifying projects...");
+            span = instrument.start_span('analyzer.project_ids');
+            project_ids_df = get_project_ids_df(ds_df);
+            instrument.add_counts(span, rows=len(project_ids_df.index));
+            instrument.end_span(span);
+            print_progress("Done.");
+            
+            span = instrument.start_span('analyzer.project_summaries');
+            if (rollups_df is not None): # Project summaries kept in data store...
+                print_progress("Building project summaries from rollups...");
+                project_summaries_df = get_rollup_project_summaries_df(FEATURES);
+            elif (args.data_store.endswith('.db')): # Aggregate within database...
+                print_progress("Building project summaries...");
+                project_summaries_df = get_db_project_summaries_df(FEATURES);
+            else:
+                print_progress("Building project summaries...");
+                project_summaries_df = get_project_summaries_df(FEATURES, project_ids_df, ds_df);
+            instrument.add_counts(span, rows=len(project_summaries_df.index));
+            instrument.end_span(span);
+            print_progress("Done.");
+            
+            #num_projects = project_summaries_df.shape[0];    
+            
+            print_progress("Generating project statistics...");
 
-        get_commit_patterns(project_ids_df, ds_df);
+            span = instrument.start_span('analyzer.commit_patterns');
+            get_commit_patterns(project_ids_df, ds_df);
+            instrument.add_counts(span, rows=len(ds_df.index));
+            instrument.end_span(span);
         #sys.exit();
 
         num_features = len(FEATURES);
@@ -1423,33 +1999,36 @@ def main():
         global dfs;
         global xlsx_sheet_num;
         global xlsx_page_index_lookup;
+        
+        span = instrument.start_span('analyzer.freq_dists', jobs=args.jobs);
+        feature_jobs = [(feature, project_summaries_df) for feature in FEATURES];
+        if (args.jobs > 1 and num_features > 1): # Compute frequency distributions of features in worker processes (results come back in feature order)...
+            pool = multiprocessing.Pool(min(args.jobs, num_features));
+            try:
+                feature_freq_dist_dfs = pool.map(get_feature_freq_dist_dfs, feature_jobs);
+                pool.close();
+            except:
+                pool.terminate();
+                raise;
+            finally:
+                pool.join();
+        else:
+            feature_freq_dist_dfs = [get_feature_freq_dist_dfs(feature_job) for feature_job in feature_jobs];
+        instrument.add_counts(span, rows=num_features);
+        instrument.end_span(span);
+        
+        span = instrument.start_span('analyzer.plots');
         for i in range(0, num_features):
             
             feature = FEATURES[i];
             
-            # This signifies the case where the user didn't specify either of the (implied) below.
-            # In this instance, force the interval width ('iwidth') to 1 unit.
-            if (feature not in class_widths and
-                feature not in num_classes_dict):
-                feature_freq_dist_df = get_feature_freq_dist_df(feature, True, project_summaries_df);
-                get_cdf(feature, feature_freq_dist_df);
-            else:
-                feature_freq_dist_df = get_feature_freq_dist_df(feature, False, project_summaries_df);
-                _feature_freq_dist_df = get_feature_freq_dist_df(feature, True, project_summaries_df); # Need this because CDF always relies on iwidth being =1;
-                get_cdf(feature, _feature_freq_dist_df);
-
-            #process_distribution_figs(feature, project_summaries_df);
+            (feature_freq_dist_df, cdf_freq_dist_df, histogram_freq_dist_df) = feature_freq_dist_dfs[i];
             
-            #feature_freq_dist_df = get_feature_freq_dist_df(feature, False, project_summaries_df);
+            get_cdf(feature, cdf_freq_dist_df);
 
-            #if (feature in class_widths):
-            #    feature_val = class_widths[feature];
-            #    if (feature_val > 1):
-            #_feature_freq_dist_df = get_feature_freq_dist_df(feature, True, project_summaries_df); # Need this because CDF always relies on iwidth being =1;
-            #get_cdf(feature, _feature_freq_dist_df);
+            #process_distribution_figs(feature, project_summaries_df);
             
-            hfd = get_feature_freq_dist_df(feature, False, project_summaries_df);
-            get_histogram(feature, hfd);
+            get_histogram(feature, histogram_freq_dist_df);
             
             sheet_name = feature;#'{:09d}'.format(xlsx_sheet_num);
             #label = 'per_project_' + feature + '_intervals';
@@ -1457,6 +2036,7 @@ def main():
             #xlsx_sheet_num = xlsx_sheet_num + 1;
 
             dfs.append((feature_freq_dist_df, sheet_name, False));
+        instrument.end_span(span);
         
         #df = pandas.DataFrame(xlsx_page_index_lookup, columns=['sheet', 'label']);
         #df['sheet'] = df['sheet'].apply(lambda s: '= \'{0}\''.format(s));
@@ -1465,29 +2045,41 @@ def main():
         pathstr, file_ext = os.path.splitext(args.data_store);
         dir_name = args.directory if args.directory else os.path.dirname(pathstr);
         filename = os.path.basename(pathstr);
-        xlsfile = dir_name + '/' + filename + '-quantatative_analytics' + '.xlsx';
-        sh.write_dfs_to_file(dfs, xlsfile);
-        #xlsfiles.append(xlsfile);
+        span = instrument.start_span('analyzer.export', export_format=args.export_format);
+        xlsfiles = sh.export_dfs(dfs, dir_name + '/' + filename + '-quantatative_analytics', args.export_format);
+        instrument.add_counts(span, rows=sum([len(df.index) for (df, sheet_name, index) in dfs]));
+        instrument.end_span(span);
 
-        print("Done.");
+        print_progress("Done.");
         print('');
 
         print("SPREADSHEET_PATH:");
-        #for xlsfile in xlsfiles:
-        print("-> " + xlsfile);
+        for xlsfile in xlsfiles:
+            print("-> " + xlsfile);
         print('');
 
+        span = instrument.start_span('analyzer.html');
         bokeh.io.save(bokeh.layouts.column(figs_list));
+        instrument.end_span(span);
         print("HTML_PATH:");
         print("-> " + htmlfile);
         print('');
 
+    instrument.end_span(run_span);
+    instrument.close_trace();
+
+    report_paths = profiling.stop(args.directory + '/' + os.path.basename(os.path.splitext(args.data_store)[0]));
+    if (report_paths):
+        print("PROFILE_PATH:");
+        for report_path in report_paths:
+            print("-> " + report_path);
+        print('');
+
     end = datetime.datetime.now();
     elapsed_time = end - start;
     print("Elapsed Time: " + str(elapsed_time));
     print("Execution complete.");
 
 
-main();
-
-
+if (__name__ == '__main__'):
+    main();
@@ -0,0 +1,171 @@
+#!/usr/bin/python
+
+
+# Benchmark in-process pack reading ('--backend pack') against the git-log subprocess path of the scraper.
+#
+# Usage: python benchmarks/bench_pack_reader.py [{path/to/repository}] [{path_in_repo}] [{num_rounds}]
+#
+# Without a repository, a throwaway repository of renames (as is, with edits, across directories, rewrites) is built
+# and compared, so that file counts of renamed files are covered.
+
+
+import os; # File, directory handling.
+import re; # Regular expressions.
+import shutil; # Throwaway repository removal.
+import subprocess; # Invoke git applications.
+import sys; # Script arguments.
+import tempfile; # Throwaway repository.
+import time; # Timing.
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), '..'));
+
+import modules.packreader as packreader;
+
+
+# git log commit fields (same as the scraper's).
+GITLOG_FIELDS = ['%H',
+                 '%an', '%ae', '%at',
+                 '%cn', '%ce', '%ct',
+                 '%s'];
+
+
+# Commits of throwaway rename repository: (subject, files written as {path: lines}, files moved as {old path: new path}, files removed).
+RENAME_COMMITS = [('add files', {'a/f.txt' : ['f line ' + str(i) for i in range(0, 20)],
+                                 'a/g.txt' : ['g line ' + str(i) for i in range(0, 20)],
+                                 'b/h.txt' : ['h line ' + str(i) for i in range(0, 20)],
+                                 'b/k.txt' : ['k line ' + str(i) for i in range(0, 10)],
+                                 'c/same.txt' : ['same line ' + str(i) for i in range(0, 20)],
+                                 'd/same.txt' : ['other line ' + str(i) for i in range(0, 20)],
+                                 'e/empty.txt' : []}, {}, []),
+                  ('rename as is', {}, {'a/f.txt' : 'a/f2.txt'}, []),
+                  ('rename with edit', {'b/g renamed.txt' : ['g line ' + str(i) for i in range(0, 20)] + ['appended']}, {}, ['a/g.txt']),
+                  ('move across directories with edit', {'x/h.txt' : ['h line ' + str(i) for i in range(0, 18)]}, {}, ['b/h.txt']),
+                  ('rewrite under new name', {'b/k2.txt' : ['new k line ' + str(i) for i in range(0, 10)]}, {}, ['b/k.txt']),
+                  ('move same basenames', {'y/same.txt' : ['same line ' + str(i) for i in range(0, 19)],
+                                           'z/same.txt' : ['other line ' + str(i) for i in range(0, 19)]}, {}, ['c/same.txt', 'd/same.txt']),
+                  ('rename empty file', {}, {'e/empty.txt' : 'e/empty2.txt'}, []),
+                  ('rename and edit several', {'m/f3.txt' : ['f line ' + str(i) for i in range(0, 20)] + ['more'],
+                                               'm/g3.txt' : ['g line ' + str(i) for i in range(0, 20)] + ['appended', 'more']}, {}, ['a/f2.txt', 'b/g renamed.txt'])];
+
+
+# Run git command (argument list) in repository.
+def run_git(path_to_repo, git_args):
+
+    subprocess.check_call(['git', '-C', path_to_repo] + git_args, stdout=open(os.devnull, 'w'));
+
+
+# Build throwaway repository of rename commits (RENAME_COMMITS) in directory.
+def make_rename_repo(path_to_repo):
+
+    run_git(path_to_repo, ['init', '-q']);
+    for (i, (subject, written_files, moved_files, removed_files)) in enumerate(RENAME_COMMITS):
+        for (path, lines) in written_files.items():
+            if (not os.path.isdir(os.path.dirname(os.path.join(path_to_repo, path)))):
+                os.makedirs(os.path.dirname(os.path.join(path_to_repo, path)));
+            with open(os.path.join(path_to_repo, path), 'w') as f:
+                f.write(''.join([line + '\n' for line in lines]));
+        for (old_path, new_path) in moved_files.items():
+            run_git(path_to_repo, ['mv', old_path, new_path]);
+        for path in removed_files:
+            run_git(path_to_repo, ['rm', '-q', path]);
+        run_git(path_to_repo, ['add', '-A']);
+        commit_date = str(1500000000 + i * 3600) + ' +0000';
+        run_git(path_to_repo, ['-c', 'user.name=Bench', '-c', 'user.email=bench@example.com', 'commit', '-q', '-m', subject,
+                               '--date=' + commit_date]);
+
+
+# Get commit metadata and file counts via the scraper's git-log invocation.
+def get_gitlog_records(path_to_repo, path_in_repo):
+
+    gitlog_format = '\x1e\x1e\x1e' + '\x1f\x1f\x1f'.join(GITLOG_FIELDS) + '\x1f\x1f\x1f';
+
+    cmd = ['git',
+           '-c', 'color.diff.plain=normal', '-c', 'color.diff.meta=normal bold', '-c', 'color.diff.old=red',
+           '-c', 'color.diff.new=green', '-c', 'color.diff.whitespace=normal', '-c', 'color.ui=always',
+           '--git-dir=' + path_to_repo + '/.git/', '--work-tree=' + path_to_repo,
+           'log', '--full-history', '--stat', '--stat-width=1000', '--format=' + gitlog_format,
+           '-p', '--word-diff=plain', '--', path_in_repo];
+
+    gitlog_str = subprocess.Popen(cmd, stdout=subprocess.PIPE).communicate()[0];
+
+    records = list();
+    for commit_group in gitlog_str.split(b'\n\x1e\x1e\x1e'):
+
+        commit_fields = commit_group.strip(b'\x1e\x1e\x1e').split(b'\x1f\x1f\x1f');
+        if (len(commit_fields) < 9):
+            continue;
+        files_str = commit_fields[8].split(b'diff --git a/')[0];
+        filenames = re.findall(br'\s+(.*[^\s]+)\s+\|\s+[a-zA-Z0-9]+', files_str);
+        records.append((commit_fields[0].decode('ascii'),
+                        commit_fields[1], commit_fields[2], int(commit_fields[3]),
+                        commit_fields[4], commit_fields[5], int(commit_fields[6]),
+                        commit_fields[7],
+                        len(filenames)));
+
+    return records;
+
+
+# Get commit metadata and file counts by reading pack files in-process.
+def get_pack_records(path_to_repo, path_in_repo):
+
+    repo = packreader.open_repo(path_to_repo);
+
+    records = list();
+    for commit in packreader.walk_commits(repo, path_in_repo, None, None):
+        records.append((commit['commit_hash'],
+                        commit['author'][0], commit['author'][1], commit['author'][2],
+                        commit['committer'][0], commit['committer'][1], commit['committer'][2],
+                        commit['subject'],
+                        commit['num_files_changed']));
+
+    packreader.close_repo(repo);
+
+    return records;
+
+
+# Time function over some number of rounds (returns best time and last result).
+def time_rounds(func, num_rounds, *func_args):
+
+    best = float('inf');
+    result = None;
+    for i in range(0, num_rounds):
+        t1 = time.time();
+        result = func(*func_args);
+        best = min(best, time.time() - t1);
+
+    return best, result;
+
+
+# Driver for benchmark.
+def main():
+
+    if (len(sys.argv) > 1):
+        path_to_repo = os.path.abspath(sys.argv[1]);
+        rename_repo_dir = None;
+    else:
+        rename_repo_dir = tempfile.mkdtemp(prefix='bench-renames-');
+        path_to_repo = os.path.join(rename_repo_dir, 'repo');
+        os.mkdir(path_to_repo);
+        make_rename_repo(path_to_repo);
+    path_in_repo = sys.argv[2] if (len(sys.argv) > 2) else '.';
+    num_rounds = int(sys.argv[3]) if (len(sys.argv) > 3) else 3;
+
+    try:
+        (gitlog_time, gitlog_records) = time_rounds(get_gitlog_records, num_rounds, path_to_repo, path_in_repo);
+        (pack_time, pack_records) = time_rounds(get_pack_records, num_rounds, path_to_repo, path_in_repo);
+    finally:
+        if (rename_repo_dir is not None):
+            shutil.rmtree(rename_repo_dir);
+
+    print("Repository: \'" + path_to_repo + "\' (path: \'" + path_in_repo + "\')");
+    print("Commits: " + str(len(gitlog_records)));
+    print("git-log subprocess: %.3fs" % gitlog_time);
+    print("pack reader: %.3fs (%.1fx)" % (pack_time, gitlog_time / pack_time if (pack_time > 0) else float('inf')));
+    print("Records match: " + str(gitlog_records == pack_records));
+    for (gitlog_record, pack_record) in zip(gitlog_records, pack_records):
+        if (gitlog_record != pack_record):
+            print("  Mismatch: " + gitlog_record[0] + " (" + gitlog_record[7].decode('utf-8', 'replace') + "): " +
+                  str(gitlog_record[8]) + " file(s) changed in git log, " + str(pack_record[8]) + " in pack reader");
+
+
+main();
@@ -0,0 +1,443 @@
+#!/usr/bin/python
+
+
+# Benchmark the collector/scraper/analyzer pipeline, stage by stage, on synthetic git repositories.
+#
+# Synthetic repositories (of configurable size) are generated with 'git fast-import' from a seed, so every run on
+# the same options benchmarks the very same commits. Each stage is timed over some number of rounds, and results
+# are written as JSON; pass the results of another version with '--compare' to see per-stage speedups/regressions.
+#
+# Usage: python benchmarks/bench_pipeline.py [--repos N] [--commits N] [--files N] [--paths N] [--patch-lines N]
+#                                            [--identities N] [--rounds N] [--seed N] [-d {directory}]
+#                                            [-o {results.json}] [--compare {results.json}]
+
+
+import argparse; # Script arguments.
+import datetime; # Timestamps.
+import json; # Results format.
+import os; # File, directory handling.
+import platform; # Machine description.
+import random; # Synthetic repository contents.
+import shutil; # Remove benchmark directories.
+import subprocess; # Invoke git applications.
+import sys; # Script termination.
+import tempfile; # Default working directory.
+import time; # Timing.
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), '..'));
+
+import analyzer;
+import bokeh.io;
+import bokeh.layouts;
+import bokeh.plotting;
+import collector;
+import modules.shared as sh;
+import scraper;
+
+
+BENCH_EPOCH = 1483228800; # Date of first synthetic commit (2017-01-01 00:00:00 UTC).
+
+REMOTE_HOSTNAME = 'bench.local'; # Host and owner of synthetic remotes (as collector/scraper identify repos from URLs).
+REMOTE_OWNER = 'gitrhig';
+
+
+# Global variables.
+
+args = None; # For script arguments object.
+
+stage_results = list(); # Timings of each stage, in run order.
+
+
+# Process script arguments.
+def process_args():
+
+    argparser = argparse.ArgumentParser();
+
+    argparser.add_argument('--repos', help="number of synthetic repositories", type=int, default=2);
+    argparser.add_argument('--commits', help="number of commits per repository", type=int, default=500);
+    argparser.add_argument('--files', help="number of files per repository", type=int, default=50);
+    argparser.add_argument('--paths', help="number of top-level directories (scraped as separate paths) per repository", type=int, default=2);
+    argparser.add_argument('--files-per-commit', help="number of files changed by each commit", type=int, default=2);
+    argparser.add_argument('--patch-lines', help="number of lines changed in each changed file", type=int, default=10);
+    argparser.add_argument('--identities', help="number of distinct author/committer identities", type=int, default=20);
+    argparser.add_argument('--rounds', help="number of timed rounds of each stage (best one is reported)", type=int, default=3);
+    argparser.add_argument('--seed', help="seed of synthetic repository contents", type=int, default=0);
+    argparser.add_argument('-d','--directory', help="working directory (default: temporary directory, removed afterwards)", type=str);
+    argparser.add_argument('-o','--outfile', help="output file for JSON results (default: 'bench_pipeline-results.json' in current directory)", type=str);
+    argparser.add_argument('--compare', help="JSON results of an earlier run (e.g., another version) to compare against", type=str);
+
+    return argparser.parse_args();
+
+
+# Check script arguments.
+def check_args():
+
+    for option in ['repos', 'commits', 'files', 'paths', 'files_per_commit', 'patch_lines', 'identities', 'rounds']:
+        if (getattr(args, option) < 1):
+            sys.exit("Option \'--" + option.replace('_', '-') + "\' must be a positive number.");
+
+    if (args.files_per_commit > args.files):
+        sys.exit("Commits cannot change more files than there are.");
+
+    if (args.compare and not os.path.isfile(args.compare)):
+        sys.exit("No such file \'" + args.compare + "\'.");
+
+    args.keep_directory = (args.directory is not None);
+    args.directory = sh.get_wd(args.directory) if (args.directory) else tempfile.mkdtemp(prefix='bench_pipeline-');
+
+    if (not args.outfile):
+        args.outfile = 'bench_pipeline-results.json';
+
+
+# Get output of git command (or None if it failed).
+def get_git_output(cmd):
+
+    try:
+        return subprocess.check_output(['git'] + cmd, stderr=subprocess.STDOUT).strip();
+    except (OSError, subprocess.CalledProcessError):
+        return None;
+
+
+# Get fast-import 'data' command for some content.
+def get_data_cmd(content):
+
+    return 'data ' + str(len(content)) + '\n' + content + '\n';
+
+
+# Change lines of file (list of lines) in place: some inserted, some deleted and the rest modified.
+def change_file_lines(rng, lines, num_lines, commit_num):
+
+    for k in range(0, num_lines):
+
+        change = rng.randint(0, 2) if (lines) else 0;
+        position = rng.randint(0, len(lines));
+        new_line = 'line ' + str(commit_num) + '.' + str(k) + ' ' + '%08x' % rng.getrandbits(32);
+        if (change == 0): # Insertion...
+            lines.insert(position, new_line);
+        elif (change == 1 and len(lines) > 1): # Deletion...
+            del lines[min(position, len(lines) - 1)];
+        else: # Modification...
+            lines[min(position, len(lines) - 1)] = new_line;
+
+
+# Get fast-import stream of synthetic repository history (deterministic, given seed and repo number).
+def get_fast_import_stream(repo_num):
+
+    rng = random.Random(args.seed * 1000003 + repo_num);
+
+    identities = [('Developer ' + str(i), 'developer' + str(i) + '@example.com') for i in range(0, args.identities)];
+    file_paths = ['dir' + str(i % args.paths) + '/file' + str(i) + '.txt' for i in range(0, args.files)];
+    file_lines = dict([(file_path, list()) for file_path in file_paths]);
+
+    cmds = list();
+    epoch = BENCH_EPOCH;
+    for i in range(0, args.commits):
+
+        epoch = epoch + rng.randint(60, 2 * 24 * 3600);
+        author = identities[rng.randint(0, args.identities - 1)];
+        committer = author if (rng.random() < 0.8) else identities[rng.randint(0, args.identities - 1)];
+
+        cmds.append('commit refs/heads/master\n');
+        cmds.append('author ' + author[0] + ' <' + author[1] + '> ' + str(epoch - rng.randint(0, 3600)) + ' +0000\n');
+        cmds.append('committer ' + committer[0] + ' <' + committer[1] + '> ' + str(epoch) + ' +0000\n');
+        cmds.append(get_data_cmd('Change ' + str(i) + ' of synthetic repository ' + str(repo_num)));
+
+        for file_path in rng.sample(file_paths, args.files_per_commit):
+            lines = file_lines[file_path];
+            change_file_lines(rng, lines, args.patch_lines, i);
+            cmds.append('M 100644 inline ' + file_path + '\n');
+            cmds.append(get_data_cmd(''.join([line + '\n' for line in lines])));
+
+    return ''.join(cmds);
+
+
+# Generate synthetic (bare) remote repositories; get their (file://) URLs.
+def generate_remotes():
+
+    repo_urls = list();
+    for repo_num in range(0, args.repos):
+
+        path_to_remote = os.path.join(args.directory, 'remotes', REMOTE_HOSTNAME, REMOTE_OWNER, 'repo' + str(repo_num) + '.git');
+        if (os.path.exists(path_to_remote)): # (Same options and seed give the same remote.)
+            shutil.rmtree(path_to_remote);
+        os.makedirs(path_to_remote);
+
+        subprocess.check_call(['git', 'init', '-q', '--bare', path_to_remote]);
+        subprocess.check_call(['git', '--git-dir=' + path_to_remote, 'symbolic-ref', 'HEAD', 'refs/heads/master']);
+
+        sp = subprocess.Popen(['git', '--git-dir=' + path_to_remote, 'fast-import', '--quiet'], stdin=subprocess.PIPE);
+        sp.communicate(get_fast_import_stream(repo_num));
+        if (sp.returncode != 0):
+            sys.exit("git fast-import failed for \'" + path_to_remote + "\'.");
+
+        repo_urls.append('file://' + path_to_remote);
+
+    return repo_urls;
+
+
+# Call function with stdout/stderr (of this process and its subprocesses) discarded.
+def call_quietly(func, *func_args):
+
+    sys.stdout.flush();
+    sys.stderr.flush();
+    saved_fds = (os.dup(1), os.dup(2));
+    devnull_fd = os.open(os.devnull, os.O_WRONLY);
+    os.dup2(devnull_fd, 1);
+    os.dup2(devnull_fd, 2);
+    try:
+        return func(*func_args);
+    finally:
+        sys.stdout.flush();
+        sys.stderr.flush();
+        os.dup2(saved_fds[0], 1);
+        os.dup2(saved_fds[1], 2);
+        os.close(saved_fds[0]);
+        os.close(saved_fds[1]);
+        os.close(devnull_fd);
+
+
+# Time stage over some number of rounds (each round preceded by untimed setup, if any); get result of last round.
+def run_stage(name, func, func_args, setup=None):
+
+    times = list();
+    result = None;
+    for i in range(0, args.rounds):
+
+        if (setup is not None):
+            call_quietly(setup);
+        t1 = time.time();
+        result = call_quietly(func, *func_args);
+        times.append(time.time() - t1);
+
+    stage_results.append({'stage' : name,
+                          'rounds' : times,
+                          'best' : min(times),
+                          'median' : sorted(times)[len(times) // 2]});
+
+    print(("{0:<45} {1:>10.3f}s").format(name, min(times)));
+
+    return result;
+
+
+# Clone (or update) every repository from its remote.
+def update_local_repos(repo_urls):
+
+    repo_local_paths = list();
+    for repo_url in repo_urls:
+
+        (repo_local_path, status) = collector.update_local_repo(repo_url);
+        if (status == 'failed'):
+            sys.exit("Could not retrieve \'" + repo_url + "\'.");
+        repo_local_paths.append(repo_local_path);
+
+    return repo_local_paths;
+
+
+# Remove local repository clones (so that they are cloned again).
+def remove_local_repos():
+
+    path_to_clones = os.path.join(args.directory, 'clones');
+    if (os.path.exists(path_to_clones)):
+        shutil.rmtree(path_to_clones);
+
+
+# Benchmark collector stages; get local paths of retrieved repositories.
+def bench_collector(repo_urls):
+
+    collector.args = collector.process_args(['--retrieve', '--directory', os.path.join(args.directory, 'clones')]);
+    collector.args.directory = sh.get_wd(collector.args.directory);
+
+    run_stage('collector.update_local_repo (clone)', update_local_repos, [repo_urls], remove_local_repos);
+
+    return run_stage('collector.update_local_repo (update)', update_local_repos, [repo_urls]);
+
+
+# Get (repository, path in repository) projects scraped from local repositories (each top-level directory, and whole repository).
+def get_scraper_projects(repo_local_paths):
+
+    projects = list();
+    for repo_local_path in repo_local_paths:
+        for path_in_repo in ['.'] + ['dir' + str(i) for i in range(0, args.paths)]:
+            projects.append((repo_local_path, path_in_repo));
+
+    return projects;
+
+
+# Point scraper at a single project (as its driver does for each repository and path).
+def set_scraper_project(project):
+
+    (scraper.path_to_repo, scraper.path_in_repo) = project;
+
+    remote_origin_url = sh.get_remote_origin_url(scraper.path_to_repo);
+    (scraper.repo_remote_hostname, scraper.repo_owner, scraper.repo_name) = sh.get_repo_id(remote_origin_url);
+    scraper.labels_for_repo = tuple(scraper.args.labels);
+    scraper.since_dt_str = scraper.args.since;
+    scraper.until_dt_str = scraper.args.until;
+
+
+# Call scraper function for every project; get its results.
+def call_per_project(func, projects):
+
+    results = list();
+    for project in projects:
+
+        set_scraper_project(project);
+        results.append(func());
+
+    return results;
+
+
+# Push commit records of every project into (fresh) data store.
+def push_commits_dfs(commits_dfs, destination):
+
+    for commits_df in commits_dfs:
+        scraper.push_commit_records(commits_df, 'commits', destination);
+
+
+# Clear scraper's data store (so that commit records are pushed into a fresh one).
+def clear_scraper_data_store():
+
+    scraper.ds_df = None;
+    if (os.path.exists(scraper.args.data_store)):
+        os.remove(scraper.args.data_store);
+
+
+# Benchmark scraper stages; get path to data store of scraped commit records.
+def bench_scraper(repo_local_paths):
+
+    data_store = os.path.join(args.directory, 'bench-data_store.db');
+    if (os.path.exists(data_store)):
+        os.remove(data_store);
+
+    scraper.args = scraper.process_args(['--sources', ';'.join(repo_local_paths), '--data-store', data_store]);
+    call_quietly(scraper.check_args);
+
+    projects = get_scraper_projects(repo_local_paths);
+
+    run_stage('scraper.get_gitlog_str', call_per_project, [scraper.get_gitlog_str, projects]);
+    commits_dfs = [commits_df for (commits_df, files_df) in run_stage('scraper.get_commits_df', call_per_project, [scraper.get_commits_df, projects])];
+    run_stage('scraper.get_pack_commits_df', call_per_project, [scraper.get_pack_commits_df, projects]);
+    run_stage('scraper.push_commit_records', push_commits_dfs, [commits_dfs, scraper.args.data_store], clear_scraper_data_store);
+
+    return scraper.args.data_store, sum([len(commits_df.index) for commits_df in commits_dfs]);
+
+
+# Clear analyzer's output sheets (project summaries are added to them as they are built).
+def clear_analyzer_dfs():
+
+    del analyzer.dfs[:];
+
+
+# Get frequency distributions of every feature.
+def get_freq_dist_dfs(features, project_summaries_df):
+
+    return [analyzer.get_feature_freq_dist_dfs((feature, project_summaries_df)) for feature in features];
+
+
+# Plot commit patterns and distributions of every feature, and save plots to HTML file.
+def plot_distributions(features, project_ids_df, ds_df, feature_freq_dist_dfs, htmlfile):
+
+    del analyzer.figs_list[:];
+
+    analyzer.get_commit_patterns(project_ids_df, ds_df);
+    for i in range(0, len(features)):
+        (feature_freq_dist_df, cdf_freq_dist_df, histogram_freq_dist_df) = feature_freq_dist_dfs[i];
+        analyzer.get_cdf(features[i], cdf_freq_dist_df);
+        analyzer.get_histogram(features[i], histogram_freq_dist_df);
+
+    bokeh.plotting.output_file(htmlfile, title="Project Statistics");
+    bokeh.io.save(bokeh.layouts.column(analyzer.figs_list));
+
+
+# Benchmark analyzer stages.
+def bench_analyzer(data_store):
+
+    path_to_outputs = sh.get_wd(os.path.join(args.directory, 'analyzer'));
+
+    analyzer.args = analyzer.process_args(['--data-store', data_store, '--directory', path_to_outputs]);
+    call_quietly(analyzer.check_args);
+    analyzer.dtdeltas = list(set(['d'] + analyzer.args.dt_deltas));
+    features = analyzer.get_features();
+
+    (since, until) = analyzer.get_epoch_window();
+    ds_df = run_stage('analyzer.load_from_data_store', sh.load_from_data_store, [data_store, since, until, analyzer.args.labels]);
+    ds_df = run_stage('analyzer.prepare_records', analyzer.prepare_records, [ds_df]);
+    project_ids_df = run_stage('analyzer.get_project_ids_df', analyzer.get_project_ids_df, [ds_df]);
+    project_summaries_df = run_stage('analyzer.get_project_summaries_df', analyzer.get_project_summaries_df, [features, project_ids_df, ds_df], clear_analyzer_dfs);
+    run_stage('analyzer.get_db_project_summaries_df', analyzer.get_db_project_summaries_df, [features], clear_analyzer_dfs);
+    feature_freq_dist_dfs = run_stage('analyzer.get_feature_freq_dist_dfs', get_freq_dist_dfs, [features, project_summaries_df]);
+    run_stage('analyzer.plots', plot_distributions, [features, project_ids_df, ds_df, feature_freq_dist_dfs, os.path.join(path_to_outputs, 'bench-visual_analytics.html')]);
+
+    dfs = [(project_summaries_df, 'project_activity_summaries', False)] + [(feature_freq_dist_dfs[i][0], features[i], False) for i in range(0, len(features))];
+    for export_format in ['xlsx', 'csv', 'parquet']:
+        run_stage('analyzer.export (' + export_format + ')', sh.export_dfs, [dfs, os.path.join(path_to_outputs, 'bench-quantatative_analytics'), export_format]);
+
+
+# Print speedup of each stage against results of an earlier run.
+def compare_results(results):
+
+    earlier_results = json.load(open(args.compare));
+    earlier_stages = dict([(stage['stage'], stage) for stage in earlier_results['stages']]);
+
+    print('');
+    print("Compared to \'" + args.compare + "\' (version " + str(earlier_results.get('version')) + "):");
+    if (earlier_results.get('params') != results['params']):
+        print(sh.get_warning_str("Benchmark parameters differ; timings are not comparable"));
+
+    for stage in results['stages']:
+
+        earlier_stage = earlier_stages.get(stage['stage']);
+        if (earlier_stage is None):
+            print(("{0:<45} {1:>10}").format(stage['stage'], 'new'));
+        else:
+            speedup = earlier_stage['best'] / stage['best'] if (stage['best'] > 0) else float('inf');
+            print(("{0:<45} {1:>10.3f}s -> {2:.3f}s ({3:.2f}x{4})").format(stage['stage'], earlier_stage['best'], stage['best'], speedup, ', REGRESSION' if (speedup < 0.9) else ''));
+
+
+# Driver for benchmark.
+def main():
+
+    global args;
+
+    args = process_args();
+    check_args();
+
+    params = dict([(option, getattr(args, option)) for option in ['repos', 'commits', 'files', 'paths', 'files_per_commit', 'patch_lines', 'identities', 'rounds', 'seed']]);
+
+    print("Generating synthetic repositories...");
+    t1 = time.time();
+    repo_urls = generate_remotes();
+    print(("Done in {0:.3f}s.").format(time.time() - t1));
+    print('');
+
+    try:
+        repo_local_paths = bench_collector(repo_urls);
+        (data_store, num_commit_records) = bench_scraper(repo_local_paths);
+        bench_analyzer(data_store);
+    finally:
+        if (not args.keep_directory):
+            shutil.rmtree(args.directory, ignore_errors=True);
+
+    results = {'benchmark' : 'pipeline',
+               'version' : get_git_output(['-C', os.path.join(os.path.dirname(os.path.abspath(__file__)), '..'), 'describe', '--always', '--dirty']),
+               'date' : datetime.datetime.utcnow().strftime('%Y-%m-%dT%H:%M:%SZ'),
+               'python' : platform.python_version(),
+               'git' : get_git_output(['--version']),
+               'platform' : platform.platform(),
+               'params' : params,
+               'num_commit_records' : num_commit_records,
+               'stages' : stage_results};
+
+    outfile = open(args.outfile, 'w');
+    json.dump(results, outfile, indent=2, sort_keys=True);
+    outfile.close();
+
+    print('');
+    print("Commit records: " + str(num_commit_records));
+    print("Results saved to \'" + args.outfile + "\'.");
+
+    if (args.compare):
+        compare_results(results);
+
+
+main();
@@ -6,11 +6,18 @@ import datetime; # Timestamp handling
 import getpass; # Get user input without echo
 import hashlib; # Generate hash from string
 import json; # Output format
+import modules.gitcmd as gitcmd; # Git plumbing (no shell)
+import modules.gitloop as gitloop; # Event loop running git commands concurrently
+import modules.github_api as api; # Pooled, rate-limit-aware GitHub API client
+import modules.heads as heads; # Repo heads as of last retrieval (change detection)
+import modules.instrument as instrument; # Per-stage timing spans
+import modules.journal as journal; # Progress journal (for resumable runs)
+import modules.profiling as profiling; # Profiler hook
+import modules.pseudonyms as pseudonyms; # Anonymization (memoized, optionally keyed pseudonyms)
 import modules.shared as sh;
 import os; # File, directory handling 
 import re; # Regular expressions
-import requests; # HTTP requests
-import subprocess; # Git
+import sqlite3; # Pseudonyms table errors
 import sys; # Script termination
 import time; # Timestamp handling
 import urlparse; # URL parsing
@@ -20,9 +27,15 @@ import urlparse; # URL parsing
 
 args = None; # For script arguments object.
 
-session = requests.Session(); # Session (used to make authenticated GitHub web requests.
-
 github_api_url = ''; # Github API URL.
+github_graphql_url = ''; # Github GraphQL API URL.
+
+repo_default_branches = dict(); # Default branch of each enumerated repo (by repo URL).
+repo_pushed_ats = dict(); # Last push date of each enumerated repo (by repo URL).
+
+heads_conn = None; # Heads table database (repos as of their last retrieval).
+
+next_repo_num = 1; # Number of next repo (in input order) whose local path is due in output file (once its retrieval finishes).
 
 # GitHub user authentication variables.
 username = ''; # Username.
@@ -33,8 +46,8 @@ access_token = ''; # Personal access token.
 authenticated_user = ''; # Authenticated user GitHub username.
 
 
-# Process script arguments.
-def process_args():
+# Process script arguments (from command line, or from list of arguments).
+def process_args(argv=None):
     
     argparser = argparse.ArgumentParser();
     
@@ -44,16 +57,27 @@ def process_args():
     argparser.add_argument('-t','--token', help="prompt for GitHub access token", action="store_true");
     #argparser.add_argument('-a','--oauth', help="prompt for GitHub OAuth credentials", action="store_true");
     argparser.add_argument('-u','--username', help="process repos of a specific GitHub user", type=str);
+    argparser.add_argument('--graphql', help="enumerate repos via the GitHub GraphQL API", action="store_true");
     argparser.add_argument('-d','--directory', help="runtime working directory", type=str);
     argparser.add_argument('-o','--outfile', help="output file for local repo paths", type=str);
+    argparser.add_argument('--journal', help="progress journal file (default: 'collector-journal.jsonl' in working directory)", type=str);
+    argparser.add_argument('--resume', help="skip repos already retrieved by the last (interrupted) run", action="store_true");
+    argparser.add_argument('--heads', help="heads table (DB file) of repos as of their last retrieval, shared with scraper; repos not pushed to since are skipped", type=str);
     argparser.add_argument('-q','--query', help="process only repos with key words in URL", type=str);
     argparser.add_argument('-r','--retrieve', help="clone repos to local machine", action="store_true");
+    argparser.add_argument('-j','--jobs', help="number of repos validated and retrieved at once (by a single-threaded event loop)", type=int, default=1);
+    argparser.add_argument('--jobs-per-host', help="number of repos of the same host validated and retrieved at once", type=int, default=4);
     argparser.add_argument('-b','--bare', help="clone bare repos to local machine", action="store_true");
     argparser.add_argument('-a','--anonymize', help="anonymize repo info in data store", action="store_true");
+    argparser.add_argument('--anonymize-key', help="secret key for keyed (HMAC) pseudonyms (default: $" + pseudonyms.KEY_ENV_VAR + ", else plain SHA-1)", type=str);
+    argparser.add_argument('--pseudonyms', help="persistent pseudonyms table (DB file), shared across runs", type=str);
     argparser.add_argument('--since', help="scrape only commits after a specific date", type=str);
     argparser.add_argument('--until', help="scrape only commits before a specific date", type=str);
+    argparser.add_argument('--trace', help="trace file of per-stage timing spans (JSON lines, or Chrome trace if '.json')", type=str);
+    argparser.add_argument('--profile', help="profile run with 'cprofile' (deterministic) or 'sample' (stack sampling); reports go to working directory", choices=profiling.PROFILE_MODES);
+    argparser.add_argument('--profile-memory', help="take memory snapshots at stage boundaries (tracemalloc if available); report goes to working directory", action="store_true");
     
-    return argparser.parse_args();
+    return argparser.parse_args(argv);
 
 
 # Verify GitHub authentication credentials have been provided.
@@ -84,18 +108,34 @@ def construct_github_api_url(github_host_url):
     return github_api_url;
 
 
+# Construct GitHub GraphQL API URL from its HTTPS hostname.
+def construct_github_graphql_url(github_host_url):
+    
+    (scheme, netloc, path, params, query, fragment) = urlparse.urlparse(github_host_url);
+    
+    if (netloc == 'github.com'): # GitHub.com URL
+        netloc = 'api.' + netloc;
+        path = 'graphql';
+    else: # GitHub Enterprise URL
+        path = 'api/graphql';
+    
+    github_graphql_url = urlparse.urlunparse((scheme, netloc, path, params, query, fragment));
+    
+    return github_graphql_url;
+
+
 # Validate user GitHub authentication.
 def valid_auth(github_api_url):
 
     if (args.password):
         auth_type = 'username/password';
-        request = requests.get(github_api_url, auth=(username, password));
+        request = api.get(github_api_url, auth=(username, password));
     elif (args.token):
         auth_type = 'access token';
-        request = requests.get(github_api_url, headers={'Authorization': 'token %s' % access_token});
+        request = api.get(github_api_url, headers={'Authorization': 'token %s' % access_token});
     #elif (args.oauth):
         # auth_type = 'OAuth';
-        # request = requests.get(github_api_url, ...);
+        # request = api.get(github_api_url, ...);
 
     try:
         request.raise_for_status(); # Request did not raise status code 4xx or 5xx.
@@ -137,29 +177,26 @@ def authenticate(github_api_url):
 # (Session object is used to make GitHub API requests, which requires authentication.)
 def authenticate_session():
     
-    global session;
-
     if (args.password): # Basic (username and password)
         global username;
         global password;
-        session.auth = (username, password);
+        api.set_basic_auth(username, password);
     elif (args.token): # Personal access token
         global access_token;
-        session.headers.update({'Authorization': 'token %s' % access_token});
+        api.set_token_auth(access_token);
     #elif (args.oauth1): # OAuth
-    #    session.auth = OAuth1(app_key, app_secret, oauth_token, oauth_token_secret);
+    #    api.get_session().auth = OAuth1(app_key, app_secret, oauth_token, oauth_token_secret);
 
 
 # Reset session authentication variables.
 def scrub_credentials_info():
    
-    global session;
     global username;
     global password;
     global access_token;
     # OAuth variables
 
-    session = '';
+    api.clear_auth();
     username = '';
     password = '';
     access_token = '';
@@ -171,7 +208,7 @@ def good_github_hostname(github_api_url):
 
     if (sh.is_url(github_api_url)):
 
-        response = requests.get(github_api_url);
+        response = api.get(github_api_url);
 
         if ('current_user_url' in response.content): # Check if response contains expected content for this type of API request.
             return True;
@@ -187,7 +224,7 @@ def get_authenticated_user(github_api_url):
 
     github_user_api_url = github_api_url + '/user';
 
-    response = session.get(github_user_api_url);
+    response = api.get(github_user_api_url);
     
     user = json.loads(response.content);
 
@@ -201,13 +238,23 @@ def check_args():
     
     print("Checking script arguments...");
     
+    # Trace file.
+    if (args.trace):
+        try:
+            instrument.open_trace(args.trace);
+        except IOError:
+            print("Bad trace file \'" + args.trace + "\'.");
+            sys.exit();
+    
     # GitHub host URL.
     if (args.host):
         if (not auth_provided()):
             print("Must specify authentication prompt!");
             sys.exit();
         global github_api_url;
+        global github_graphql_url;
         github_api_url = construct_github_api_url(args.host);
+        github_graphql_url = construct_github_graphql_url(args.host);
         #if (good_github_hostname(github_api_url)):
         if (authenticate(github_api_url)):
             authenticate_session();
@@ -221,16 +268,46 @@ def check_args():
         print("Must provide either a GitHub hostname or repo URLs.");
         sys.exit();
     
+    # Number of jobs.
+    if (args.jobs < 1 or args.jobs_per_host < 1):
+        print("Number of jobs must be a positive number.");
+        sys.exit();
+    
     # Repo sources (URIs and corresponding paths).
-    args.sources = sh.get_repo_urls(args.sources);
+    args.sources = get_repo_urls(args.sources);
     
     # Working directory.
     args.directory = sh.get_wd(args.directory);
     
     # Output file.
-    if (args.outfile):
+    if (args.outfile and not args.resume): # (When resuming, output file gets rewritten with the paths retrieved so far.)
         if (not sh.is_writable_file(args.outfile)):
             sys.exit();
+    
+    # Anonymization.
+    if (args.anonymize):
+        pseudonyms.set_key(args.anonymize_key);
+        if (args.pseudonyms):
+            args.pseudonyms = os.path.abspath(args.pseudonyms);
+            try:
+                pseudonyms.open_table(args.pseudonyms);
+            except sqlite3.DatabaseError:
+                print("Bad pseudonyms table \'" + args.pseudonyms + "\'.");
+                sys.exit();
+    
+    # Heads table.
+    if (args.heads):
+        global heads_conn;
+        args.heads = os.path.abspath(args.heads);
+        try:
+            heads_conn = heads.open_heads(args.heads);
+        except sqlite3.DatabaseError:
+            print("Bad heads table \'" + args.heads + "\'.");
+            sys.exit();
+    
+    # Progress journal file.
+    if (not args.journal):
+        args.journal = os.path.join(args.directory, 'collector-journal.jsonl');
     #else: # Default output filename...
     #    args.outfile = 'collected-repo-local-paths_' + datetime.datetime.now().strftime('%Y%m%d-%H%M%S%f')[:-3] + '.txt';
 
@@ -286,9 +363,13 @@ def get_user_repo_html_urls(user_repos_api_url):
     last_page = False;
     while (not last_page):
         
-        response = session.get(user_repos_api_url, params={'per_page': max_records_per_page, 'page': page_num});
+        response = api.get(user_repos_api_url, params={'per_page': max_records_per_page, 'page': page_num});
 
-        if (len(response.content) > len('[]')):
+        if (not response.ok): # Request failed (even after backing off)...
+            print(sh.get_warning_str("GitHub API request failed with HTTP " + str(response.status_code) + " on page " + str(page_num)));
+            last_page = True;
+
+        elif (len(response.content) > len('[]')):
             
             repos_info = json.loads(response.content);
 
@@ -299,6 +380,9 @@ def get_user_repo_html_urls(user_repos_api_url):
 
                 if (created_at_epoch >= since_epoch and pushed_at_epoch <= until_epoch):
                     repo_html_urls.append(str(repo['html_url']));
+                    if (repo.get('default_branch')):
+                        repo_default_branches[str(repo['html_url'])] = str(repo['default_branch']);
+                    repo_pushed_ats[str(repo['html_url'])] = str(repo['pushed_at']);
             
             page_num = page_num + 1;
         
@@ -308,6 +392,95 @@ def get_user_repo_html_urls(user_repos_api_url):
     return repo_html_urls;
 
 
+# GraphQL query for a page of user repos (only the fields needed), least recently pushed first.
+USER_REPOS_GRAPHQL_QUERY = """
+query($cursor: String) {
+  viewer {
+    repositories(first: 100, after: $cursor,
+                 ownerAffiliations: [OWNER, COLLABORATOR, ORGANIZATION_MEMBER],
+                 orderBy: {field: PUSHED_AT, direction: ASC}) {
+      pageInfo { hasNextPage endCursor }
+      nodes { url createdAt pushedAt defaultBranchRef { name } }
+    }
+  }
+}
+""";
+
+# GraphQL query for a page of some user's (or organization's) repos, least recently pushed first.
+OWNER_REPOS_GRAPHQL_QUERY = """
+query($login: String!, $cursor: String) {
+  repositoryOwner(login: $login) {
+    repositories(first: 100, after: $cursor,
+                 ownerAffiliations: [OWNER],
+                 orderBy: {field: PUSHED_AT, direction: ASC}) {
+      pageInfo { hasNextPage endCursor }
+      nodes { url createdAt pushedAt defaultBranchRef { name } }
+    }
+  }
+}
+""";
+
+
+# Obtain a list of user repo HTML URLs via the GitHub GraphQL API.
+# (Repos arrive in push date order, so enumeration stops at the first repo pushed after 'until'.)
+def get_user_repo_html_urls_graphql(github_graphql_url):
+    
+    since_epoch = float(sh.utc_str_to_epoch(args.since));
+    until_epoch = float(sh.utc_str_to_epoch(args.until));
+    
+    if (args.username):
+        query = OWNER_REPOS_GRAPHQL_QUERY;
+        variables = {'login': args.username};
+        owner_field = 'repositoryOwner';
+    else:
+        query = USER_REPOS_GRAPHQL_QUERY;
+        variables = dict();
+        owner_field = 'viewer';
+    
+    repo_html_urls = list();
+    cursor = None;
+    last_page = False;
+    while (not last_page):
+        
+        variables['cursor'] = cursor;
+        response = api.post_json(github_graphql_url, {'query': query, 'variables': variables});
+        
+        if (not response.ok): # Request failed (even after backing off)...
+            print(sh.get_warning_str("GitHub GraphQL request failed with HTTP " + str(response.status_code)));
+            break;
+        
+        result = json.loads(response.content);
+        if (result.get('errors') or not (result.get('data') or dict()).get(owner_field)):
+            errors = result.get('errors') or [{'message': "no such repository owner"}];
+            print(sh.get_warning_str("GitHub GraphQL query failed (" + "; ".join([str(e.get('message')) for e in errors]) + ")"));
+            break;
+        
+        repositories = result['data'][owner_field]['repositories'];
+        
+        for repo in repositories['nodes']:
+            
+            created_at_epoch = sh.utc_str_to_epoch(repo['createdAt']);
+            pushed_at_epoch = sh.utc_str_to_epoch(repo['pushedAt']) if repo['pushedAt'] else created_at_epoch;
+            
+            if (pushed_at_epoch > until_epoch): # Every remaining repo was pushed even later...
+                last_page = True;
+                break;
+            
+            if (created_at_epoch >= since_epoch):
+                repo_html_urls.append(str(repo['url']));
+                if (repo['defaultBranchRef']):
+                    repo_default_branches[str(repo['url'])] = str(repo['defaultBranchRef']['name']);
+                if (repo['pushedAt']):
+                    repo_pushed_ats[str(repo['url'])] = str(repo['pushedAt']);
+        
+        page_info = repositories['pageInfo'];
+        if (not page_info['hasNextPage']):
+            last_page = True;
+        cursor = page_info['endCursor'];
+    
+    return repo_html_urls;
+
+
 # Return list of repos where query str appears in repo URL.
 def find_repos(repo_urls, match_str):
     
@@ -327,7 +500,10 @@ def find_repos(repo_urls, match_str):
 def get_repo_ssh_url(repo_url):
     
     (scheme, netloc, path, params, query, fragment) = urlparse.urlparse(repo_url);
-    
+
+    if (scheme == 'file'): # Local remote (e.g., mirror) is cloned as is...
+        return repo_url;
+
     scheme = 'ssh';
     netloc = 'git@' + netloc;
     path = path + '.git';
@@ -340,40 +516,101 @@ def get_repo_ssh_url(repo_url):
 # Determine whether or not repo is bare.
 def is_bare_repo(path_to_repo):
     
-    config = '-c color.ui=\'false\'';
-    gd = '--git-dir=\'' + path_to_repo + '/.git/\'';
-    ibr = '--is-bare-repository';
+    return gitcmd.is_bare_repo(path_to_repo);
 
-    cmd_str = 'git %s %s rev-parse %s' % (config,gd,ibr);
-    #print(cmd_str);
 
-    sp = subprocess.Popen(cmd_str,
-                          stdout=subprocess.PIPE,
-                          stderr=subprocess.STDOUT,
-                          shell=True);
-    
-    (gitrevparse_str, _) = sp.communicate();
-    
-    bool_val = gitrevparse_str.strip();
-    if (bool_val == 'true'):
-        return True;
-    else:
-        return False;
-
-
-# Clone repository or just fetch its latest changes.
-def update_local_repo(repo_url):
+# Get local path to (clone of) repo.
+def get_local_repo_path(repo_url):
     
     repo_remote_hostname, repo_owner, repo_name = sh.get_repo_id(repo_url);
 
     if (args.anonymize):
-        repo_remote_hostname = sh.get_hash_str(repo_remote_hostname);
-        repo_owner = sh.get_hash_str(repo_owner);
-        repo_name = sh.get_hash_str(repo_name);
+        repo_remote_hostname = pseudonyms.get_pseudonym(repo_remote_hostname);
+        repo_owner = pseudonyms.get_pseudonym(repo_owner);
+        repo_name = pseudonyms.get_pseudonym(repo_name);
     
     path_to_repo = sh.add_path_to_uri(repo_remote_hostname, repo_owner);
     path_to_repo = sh.add_path_to_uri(path_to_repo, repo_name);
-    abspath_to_repo = sh.add_path_to_uri(args.directory, path_to_repo);
+    
+    return sh.add_path_to_uri(args.directory, path_to_repo);
+
+
+# Get key of repo in heads table.
+def get_repo_heads_key(repo_url):
+    
+    return heads.get_key(['collector', repo_url, get_local_repo_path(repo_url)]);
+
+
+# Record repo's last push date (if known from enumeration) in heads table, once repo is retrieved.
+def record_repo_head(repo_url):
+    
+    if (repo_url in repo_pushed_ats):
+        heads.set_heads(heads_conn, [(get_repo_heads_key(repo_url), repo_pushed_ats[repo_url])]);
+
+
+# Get host of repo (for bounding the number of its host's repos retrieved at once).
+def get_repo_host(repo_url):
+    
+    return urlparse.urlparse(repo_url).netloc;
+
+
+# Validate repo URL: check that it is well-formed and refers to a repo (task run by event loop).
+# (Yields 'git ls-remote' command, then URL, or None if not valid.)
+def validate_repo_url_task(source):
+    
+    (scheme, netloc, path, params, query, fragment) = urlparse.urlparse(source);
+    if (scheme not in ['http', 'https', 'file'] or not (netloc or scheme == 'file') or not path.strip('/')):
+        print(sh.get_warning_str("Malformed URI \'" + source + "\'"));
+        yield None;
+        return;
+    
+    (returncode, _) = yield ['ls-remote', get_repo_ssh_url(source), 'HEAD'];
+    if (returncode != 0):
+        print(sh.get_warning_str("\'" + source + "\' does not refer to a GitHub repository"));
+        yield None;
+        return;
+    
+    yield source;
+
+
+# Get valid repo URLs from sources string (validated concurrently, as many at once as there are jobs).
+def get_repo_urls(sources_str):
+    
+    sources = sh.get_url_sources(sources_str);
+    
+    tasks = [(get_repo_host(source), validate_repo_url_task(source)) for source in sources];
+    valid_urls = gitloop.run_tasks(tasks, args.jobs, args.jobs_per_host);
+    
+    repo_urls = list();
+    for repo_url in valid_urls:
+        if (repo_url is not None and repo_url not in repo_urls):
+            repo_urls.append(repo_url);
+    
+    return repo_urls;
+
+
+# Retrieve repo: skip it if unchanged since its last retrieval (when heads table is used), else clone it or just fetch its
+# latest changes (task run by event loop).
+# Repo is unchanged if its last push date (from enumeration) is the one recorded in heads table, or else (e.g., for
+# repos given as sources) if its remote HEAD is the local clone's.
+# (Yields git commands, then local path to repo and 'cloned'/'updated'/'unchanged' status, or None and 'failed' status.)
+def retrieve_repo_task(repo_url):
+    
+    abspath_to_repo = get_local_repo_path(repo_url);
+    url = get_repo_ssh_url(repo_url);
+    
+    if (heads_conn is not None and os.path.exists(abspath_to_repo) and sh.is_repo_root(abspath_to_repo)): # Retrieved before...
+        
+        if (repo_url in repo_pushed_ats):
+            unchanged = (heads.get_head(heads_conn, get_repo_heads_key(repo_url)) == repo_pushed_ats[repo_url]);
+        else:
+            (returncode, output) = yield ['ls-remote', url, 'HEAD'];
+            remote_head = output.split()[0] if (returncode == 0 and output.strip()) else None;
+            unchanged = (remote_head is not None and remote_head == gitcmd.resolve_ref(abspath_to_repo, 'HEAD'));
+        
+        if (unchanged):
+            yield (abspath_to_repo, 'unchanged');
+            return;
     
     clone_repo = False;
     if (not os.path.exists(abspath_to_repo)): # Local path to repo does not exist...
@@ -381,95 +618,69 @@ def update_local_repo(repo_url):
         clone_repo = True;
     elif (not sh.is_repo_root(abspath_to_repo)): # Local path to repo is not a repo directory...
         print(sh.get_warning_str("Destination path \'" + abspath_to_repo + "\' already exists and is not an empty directory"));
+        yield (None, 'failed');
         return;
     
-    url = get_repo_ssh_url(repo_url);
-    
     if (clone_repo): # Clone repo...
         
         #print("Cloning repo...");
         
         if (args.bare):
-            
-            b = '--bare';
-            p = '\'' + abspath_to_repo + '/.git/\'';
-
-            cmd_str = 'git clone %s %s %s' % (b,url,p);
-            #print(cmd_str);
-            sp = subprocess.Popen(cmd_str,
-                                  stdout=subprocess.PIPE,
-                                  #stderr=subprocess.STDOUT,
-                                  shell=True);
-            sp.wait();
-        
+            (returncode, output) = yield ['clone', '--bare', url, abspath_to_repo + '/.git/'];
         else:
-            
-            p = '\'' + abspath_to_repo + '\'';
-            
-            cmd_str = 'git clone %s %s' % (url,p);
-            #print(cmd_str);
-            sp = subprocess.Popen(cmd_str,
-                                  stdout=subprocess.PIPE,
-                                  #stderr=subprocess.STDOUT,
-                                  shell=True);
-            sp.wait();
+            (returncode, output) = yield ['clone', url, abspath_to_repo];
+        
+        status = 'cloned';
         
     else: # ...Or just update existing repo...
    
         bare = is_bare_repo(abspath_to_repo);
         
-        gd = '--git-dir=\'' + abspath_to_repo + '/.git/\'';
+        gd = '--git-dir=' + abspath_to_repo + '/.git/';
         
         if (bare):
             
             print("Updating bare repo...");
 
-            q = '-q origin';
+            branch = repo_default_branches.get(repo_url, 'master'); # Default branch (if known from enumeration).
 
-            cmd_str = 'git %s fetch %s master:master' % (gd,q);
-            #print(cmd_str);
-            sp = subprocess.Popen(cmd_str,
-                                  stdout=subprocess.PIPE,
-                                  #stderr=subprocess.STDOUT,
-                                  shell=True);
-            sp.wait();
+            (returncode, output) = yield [gd, 'fetch', '-q', 'origin', branch + ':' + branch];
         
         else:
             
             print("Updating repo...");
             
-            wt = '--work-tree=\'' + abspath_to_repo + '\'';
-            h = '--hard HEAD';
-            x = '-xffd';
-            
-            cmd_str = 'git %s %s reset %s' % (gd,wt,h);
-            #print(cmd_str);
-            sp = subprocess.Popen(cmd_str,
-                                  stdout=subprocess.PIPE,
-                                  #stderr=subprocess.STDOUT,
-                                  shell=True);
-            sp.wait();
+            wt = '--work-tree=' + abspath_to_repo;
             
-            cmd_str = 'git %s %s clean %s' % (gd,wt,x);
-            #print(cmd_str);
-            sp = subprocess.Popen(cmd_str,
-                                  stdout=subprocess.PIPE,
-                                  #stderr=subprocess.STDOUT,
-                                  shell=True);
-            sp.wait();
-            
-            cmd_str = 'git %s %s pull' % (gd,wt);
-            #print(cmd_str);
-            sp = subprocess.Popen(cmd_str,
-                                  stdout=subprocess.PIPE,
-                                  #stderr=subprocess.STDOUT,
-                                  shell=True);
-            sp.wait();
+            yield [gd, wt, 'reset', '--hard', 'HEAD'];
+            yield [gd, wt, 'clean', '-xffd'];
+            (returncode, output) = yield [gd, wt, 'pull'];
+        
+        status = 'updated';
+    
+    if (returncode != 0):
+        if (output.strip()):
+            print(output.rstrip());
+        print(sh.get_warning_str("git exited with status " + str(returncode) + " for \'" + repo_url + "\'"));
+        if (clone_repo):
+            try:
+                os.rmdir(abspath_to_repo); # Remove (empty) destination so that a later run can clone again.
+            except OSError:
+                pass;
+        yield (None, 'failed');
+        return;
     
     print("Done.");
     print("Repo is at latest version.");
     
-    return abspath_to_repo;
+    yield (abspath_to_repo, status);
+
+
+# Clone repository or just fetch its latest changes (or skip it if unchanged, when heads table is used).
+# (Returns local path to repo and 'cloned'/'updated'/'unchanged' status, or None and 'failed' status.)
+def update_local_repo(repo_url):
+    
+    return gitloop.run_task(retrieve_repo_task(repo_url));
 
 
 # Write list of repo local paths to file.
@@ -479,7 +690,67 @@ def write_repo_paths_to_file(repo_local_paths):
     outfile.write(';\n'.join(repo_local_paths));
     outfile.close();
 
-    print("List of repo local paths saved to \'" + args.outfile + "\'.");
+
+# Append repo local path to file (as soon as the repo has been retrieved).
+def append_repo_path_to_file(repo_local_path, is_first_path):
+
+    outfile = open(args.outfile, 'a');
+    if (not is_first_path):
+        outfile.write(';\n');
+    outfile.write(repo_local_path);
+    outfile.close();
+
+
+# Report repo retrieval as it starts (and start its span, when repos are retrieved one at a time).
+def start_repo_retrieval(pending_repo, num_repos, spans):
+    
+    (repo_num, repo_url) = pending_repo;
+    
+    print('');
+    print("Processing repository " + str(repo_num) + " of " + str(num_repos) + "...");
+    print("URL: " + str(repo_url));
+    if (args.jobs == 1): # (Spans nest, so repos retrieved at once cannot each have their own.)
+        spans[repo_url] = instrument.start_span('collector.repo', url=repo_url);
+
+
+# Add local paths of finished repo retrievals (by repo number; None if no path, e.g., if retrieval failed) to download
+# paths and output file in input order: as far as every earlier repo has finished (repos retrieved at once finish in any order).
+def flush_repo_paths(finished_paths, download_paths):
+    
+    global next_repo_num;
+    
+    while (next_repo_num in finished_paths):
+        repo_local_path = finished_paths.pop(next_repo_num);
+        if (repo_local_path is not None):
+            if (args.outfile):
+                append_repo_path_to_file(repo_local_path, not download_paths);
+            download_paths.append(repo_local_path);
+        next_repo_num = next_repo_num + 1;
+
+
+# Record repo retrieval as it ends: in journal, and (unless it failed or was skipped) in heads table and output file.
+def finish_repo_retrieval(pending_repo, num_repos, result, spans, finished_paths, download_paths):
+    
+    (repo_num, repo_url) = pending_repo;
+    (repo_local_path, status) = result;
+    
+    if (status == 'unchanged'): # Not pushed to since last retrieval...
+        print("Repo is unchanged since last retrieval; skipping.");
+    if (args.jobs > 1): # (Output of repos retrieved at once is interleaved.)
+        print("Repository " + str(repo_num) + " of " + str(num_repos) + " " + status + ": " + str(repo_url));
+    
+    span = spans.pop(repo_url, None);
+    instrument.set_attrs(span, status=status);
+    instrument.end_span(span);
+    journal.record_repo(args.journal, repo_url, status, repo_local_path);
+    
+    if (status in ['cloned', 'updated']):
+        if (heads_conn is not None):
+            record_repo_head(repo_url);
+        finished_paths[repo_num] = repo_local_path;
+    else:
+        finished_paths[repo_num] = None;
+    flush_repo_paths(finished_paths, download_paths);
 
 
 # Driver for collector.
@@ -487,8 +758,10 @@ def main():
 
     global args;
     global github_api_url;
+    global github_graphql_url;
 
     args = process_args();
+    profiling.start(args.profile, args.profile_memory);
 
     print('');
     check_args();
@@ -498,8 +771,14 @@ def main():
     repo_urls = list();
 
     if (args.host):
-        user_repos_api_url = build_user_repos_api_url(github_api_url);
-        repo_urls = get_user_repo_html_urls(user_repos_api_url);
+        span = instrument.start_span('collector.enumerate', graphql=args.graphql);
+        if (args.graphql):
+            repo_urls = get_user_repo_html_urls_graphql(github_graphql_url);
+        else:
+            user_repos_api_url = build_user_repos_api_url(github_api_url);
+            repo_urls = get_user_repo_html_urls(user_repos_api_url);
+        instrument.add_counts(span, rows=len(repo_urls));
+        instrument.end_span(span);
     
     repo_urls = repo_urls + args.sources;
     if (args.query):
@@ -510,20 +789,44 @@ def main():
         
         if (args.retrieve):
             
-            download_paths = list();
+            done_repos = dict();
+            if (args.resume):
+                done_repos = journal.get_done_repos(args.journal);
+                print('');
+                print("Resuming: " + str(len(done_repos)) + " repo(s) already retrieved according to \'" + args.journal + "\'.");
+            else:
+                journal.start_run(args.journal);
+            
             num_repos = len(repo_urls);
-            for i in range(0, len(repo_urls)):
-               
-                repo_url = repo_urls[i]
+            finished_paths = dict([(i+1, done_repos[repo_urls[i]]) for i in range(0, num_repos) if repo_urls[i] in done_repos]); # (Local paths of repos already retrieved by interrupted run, in place.)
+            download_paths = list();
+            if (args.outfile):
+                write_repo_paths_to_file(download_paths);
+            flush_repo_paths(finished_paths, download_paths);
+            
+            pending_repos = [(i+1, repo_urls[i]) for i in range(0, num_repos) if repo_urls[i] not in done_repos]; # (Not already retrieved by interrupted run.)
+            spans = dict();
+            try:
+                span = instrument.start_span('collector.retrieve', jobs=args.jobs, rows=len(pending_repos));
+                tasks = [(get_repo_host(repo_url), retrieve_repo_task(repo_url)) for (_, repo_url) in pending_repos];
+                results = gitloop.run_tasks(tasks, args.jobs, args.jobs_per_host,
+                                            lambda task_index: start_repo_retrieval(pending_repos[task_index], num_repos, spans),
+                                            lambda task_index, result: finish_repo_retrieval(pending_repos[task_index], num_repos, result, spans, finished_paths, download_paths));
+                instrument.end_span(span);
+                num_unchanged = len([status for (_, status) in results if (status == 'unchanged')]); # Number of repos skipped as unchanged since last retrieval.
+            except KeyboardInterrupt:
+                print('');
+                print("Interrupted! Re-run with \'--resume\' to pick up where this run left off.");
+                pseudonyms.close_table();
+                sys.exit(1);
+            
+            if (heads_conn is not None):
                 print('');
-                print("Processing repository " + str(i+1) + " of " + str(num_repos) + "...");
-                print("URL: " + str(repo_url));
-                repo_local_path = update_local_repo(repo_url);
-                download_paths.append(repo_local_path);
+                print("Skipped " + str(num_unchanged) + " unchanged repo(s) (of " + str(num_repos) + ").");
 
             if (args.outfile):
                 print('');
-                write_repo_paths_to_file(download_paths);
+                print("List of repo local paths saved to \'" + args.outfile + "\'.");
 
         elif (repo_urls):
             
@@ -536,14 +839,28 @@ def main():
     #    print("(No repos found containing \'" + query + "\')");
 
     scrub_credentials_info();
+    pseudonyms.close_table();
+    if (heads_conn is not None):
+        heads.close_heads(heads_conn);
+    instrument.close_trace();
+    
+    report_paths = profiling.stop(os.path.join(args.directory, 'collector'));
+    if (report_paths):
+        print('');
+        print("PROFILE_PATH:");
+        for report_path in report_paths:
+            print("-> " + report_path);
     
     end = datetime.datetime.now();
     elapsed_time = end - start;
     print('');
+    if (api.num_requests > 0):
+        print(api.get_stats_str());
     print("Elapsed Time: " + str(elapsed_time));
     print("Execution Complete.");
     
     return;
 
 
-main();
+if (__name__ == '__main__'):
+    main();
@@ -0,0 +1,101 @@
+#!/usr/bin/python
+
+
+import hashlib; # Cache keys.
+import json; # Cached record format.
+import sqlite3; # Cache database.
+import time; # Record access times.
+
+
+# Version of cached record layout; bumping it makes older cache entries unreachable (and eventually evicted).
+FORMAT_VERSION = 1;
+
+MAX_QUERY_KEYS = 500; # Number of keys looked up per query (below SQLite's limit on query parameters).
+
+
+# Get content-addressed cache key of parsed records of a commit (under options that affect parsing).
+def get_key(commit_hash, options):
+
+    key_str = '\x00'.join([str(FORMAT_VERSION), commit_hash] + list(options));
+
+    return hashlib.sha1(key_str.encode('utf-8')).hexdigest();
+
+
+# Open cache database (creating it if needed).
+def open_cache(path_to_cache):
+
+    conn = sqlite3.connect(path_to_cache);
+    conn.execute('CREATE TABLE IF NOT EXISTS records (key TEXT PRIMARY KEY, record TEXT NOT NULL, size INTEGER NOT NULL, last_access REAL NOT NULL);');
+    conn.execute('CREATE INDEX IF NOT EXISTS records_last_access ON records (last_access);');
+    conn.commit();
+
+    return conn;
+
+
+# Close cache database.
+def close_cache(conn):
+
+    conn.close();
+
+
+# Get dict of cached records by key (for keys that are in cache), marking them as recently used.
+def get_records(conn, keys):
+
+    records = dict();
+
+    for i in range(0, len(keys), MAX_QUERY_KEYS):
+
+        chunk = keys[i:i+MAX_QUERY_KEYS];
+        query = 'SELECT key, record FROM records WHERE key IN (' + ','.join(['?'] * len(chunk)) + ');';
+        for (key, record) in conn.execute(query, chunk):
+            records[key] = json.loads(record);
+
+    now = time.time();
+    conn.executemany('UPDATE records SET last_access = ? WHERE key = ?;', [(now, key) for key in records]);
+    conn.commit();
+
+    return records;
+
+
+# Store records (list of (key, record) pairs) in cache, then evict least recently used records beyond size bound.
+def put_records(conn, keyed_records, max_size):
+
+    now = time.time();
+
+    rows = list();
+    for (key, record) in keyed_records:
+        record_str = json.dumps(record, sort_keys=True);
+        rows.append((key, record_str, len(record_str), now));
+
+    conn.executemany('INSERT OR REPLACE INTO records (key, record, size, last_access) VALUES (?, ?, ?, ?);', rows);
+    num_evicted = evict(conn, max_size);
+    conn.commit();
+
+    return num_evicted;
+
+
+# Evict least recently used records until total size of records (in bytes) is within bound.
+def evict(conn, max_size):
+
+    total_size = conn.execute('SELECT COALESCE(SUM(size), 0) FROM records;').fetchone()[0];
+    if (total_size <= max_size):
+        return 0;
+
+    stale_keys = list();
+    for (key, size) in conn.execute('SELECT key, size FROM records ORDER BY last_access, rowid;').fetchall():
+        if (total_size <= max_size):
+            break;
+        stale_keys.append((key,));
+        total_size = total_size - size;
+
+    conn.executemany('DELETE FROM records WHERE key = ?;', stale_keys);
+
+    return len(stale_keys);
+
+
+# Get number of records in cache and their total size (in bytes).
+def get_stats(conn):
+
+    (num_records, total_size) = conn.execute('SELECT COUNT(*), COALESCE(SUM(size), 0) FROM records;').fetchone();
+
+    return num_records, total_size;
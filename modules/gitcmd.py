@@ -0,0 +1,227 @@
+#!/usr/bin/python
+
+
+import os; # File, directory handling.
+import re; # Regular expressions.
+import subprocess; # Git commands.
+
+
+# Global variables.
+
+config_cache = dict(); # Parsed config of each repo (by config file path), along with its mtime.
+
+
+# Formulate text string from git output (which is bytes under Python 3).
+def to_str(output):
+
+    if (not isinstance(output, str)):
+        output = output.decode('utf-8', 'replace');
+
+    return output;
+
+
+# Get git directory of repo.
+def get_git_dir(path_to_repo):
+
+    return os.path.join(path_to_repo, '.git');
+
+
+# Start git command (argument list; no shell), with its output (and errors) piped, and its input too if requested.
+def start_git_cmd(git_args, with_stdin=False):
+
+    cmd = ['git', '-c', 'color.ui=false'] + git_args;
+
+    return subprocess.Popen(cmd,
+                            stdin=(subprocess.PIPE if (with_stdin) else None),
+                            stdout=subprocess.PIPE,
+                            stderr=subprocess.STDOUT);
+
+
+# Run git command (argument list; no shell) and return its exit status and output.
+def run_git_cmd(git_args):
+
+    sp = start_git_cmd(git_args);
+
+    (output, _) = sp.communicate();
+
+    return sp.returncode, to_str(output);
+
+
+# Get git arguments selecting some repo (its git dir, and its work tree if requested).
+def get_repo_args(path_to_repo, with_work_tree=False):
+
+    repo_args = ['--git-dir=' + get_git_dir(path_to_repo)];
+    if (with_work_tree):
+        repo_args.append('--work-tree=' + path_to_repo);
+
+    return repo_args;
+
+
+# Start git command against some repo (e.g., to stream its output, or feed it input).
+def start_git(path_to_repo, git_args, with_work_tree=False, with_stdin=False):
+
+    return start_git_cmd(get_repo_args(path_to_repo, with_work_tree) + git_args, with_stdin);
+
+
+# Run git command against some repo.
+def run_git(path_to_repo, git_args, with_work_tree=False):
+
+    return run_git_cmd(get_repo_args(path_to_repo, with_work_tree) + git_args);
+
+
+# Parse git config value (strip quotes and resolve escapes).
+def parse_config_value(raw_value):
+
+    value = '';
+    in_quotes = False;
+    i = 0;
+    while (i < len(raw_value)):
+
+        c = raw_value[i];
+        if (c == '"'):
+            in_quotes = not in_quotes;
+        elif (c == '\\' and i+1 < len(raw_value)):
+            i = i + 1;
+            value = value + {'n': '\n', 't': '\t', 'b': '\b'}.get(raw_value[i], raw_value[i]);
+        elif (c in '#;' and not in_quotes): # Comment...
+            break;
+        else:
+            value = value + c;
+        i = i + 1;
+
+    return value.strip();
+
+
+# Parse git config file into dict of 'section[.subsection].key' names and values.
+def parse_config_file(path_to_config):
+
+    config = dict();
+
+    section = '';
+    config_file = open(path_to_config, 'r');
+    for line in config_file:
+
+        line = to_str(line).strip();
+        if (not line or line[0] in '#;'):
+            continue;
+
+        section_match = re.match(r'^\[\s*([^\s\]"]+)(?:\s+"((?:[^"\\]|\\.)*)")?\s*\](.*)$', line);
+        if (section_match):
+            (name, subsection, line) = section_match.groups();
+            section = name.lower();
+            if (subsection is not None):
+                section = section + '.' + re.sub(r'\\(.)', r'\1', subsection);
+            line = line.strip();
+            if (not line):
+                continue;
+
+        if ('=' in line):
+            (key, raw_value) = line.split('=', 1);
+            value = parse_config_value(raw_value);
+        else:
+            (key, value) = (line, 'true'); # Key without value is boolean 'true'.
+
+        config[section + '.' + key.strip().lower()] = value;
+
+    config_file.close();
+
+    return config;
+
+
+# Get parsed config of repo (re-parsing the config file only when it changes).
+def get_config(path_to_repo):
+
+    path_to_config = os.path.join(get_git_dir(path_to_repo), 'config');
+
+    try:
+        mtime = os.path.getmtime(path_to_config);
+    except OSError:
+        return None;
+
+    if (path_to_config not in config_cache or config_cache[path_to_config][0] != mtime):
+        config_cache[path_to_config] = (mtime, parse_config_file(path_to_config));
+
+    return config_cache[path_to_config][1];
+
+
+# Get value of repo config key (read directly from config file where possible).
+def get_config_value(path_to_repo, key):
+
+    config = get_config(path_to_repo);
+    if (config is not None):
+        if (key in config):
+            return config[key];
+        if (not any(k.startswith('include') for k in config)): # No included config files could hold key...
+            return '';
+
+    (returncode, output) = run_git(path_to_repo, ['config', '--get', key]);
+
+    return output.strip('\n') if (returncode == 0) else '';
+
+
+# Determine whether or not repo is bare.
+def is_bare_repo(path_to_repo):
+
+    return (get_config_value(path_to_repo, 'core.bare').lower() == 'true');
+
+
+# Read (first line of) some file in git dir.
+def read_git_file(path_to_repo, filename):
+
+    try:
+        git_file = open(os.path.join(get_git_dir(path_to_repo), filename), 'r');
+        line = to_str(git_file.readline()).strip();
+        git_file.close();
+        return line;
+    except IOError:
+        return None;
+
+
+# Resolve ref (e.g., 'HEAD', 'refs/heads/master') to an object name, reading refs directly from git dir.
+def resolve_ref(path_to_repo, ref):
+
+    for i in range(0, 10): # Follow (a bounded number of) symbolic refs...
+
+        value = read_git_file(path_to_repo, ref);
+        if (value is None or not value.startswith('ref:')):
+            break;
+        ref = value[len('ref:'):].strip();
+
+    if (value and re.match(r'^[0-9a-f]{40}$', value)): # Loose ref...
+        return value;
+
+    try: # Packed ref...
+        packed_refs_file = open(os.path.join(get_git_dir(path_to_repo), 'packed-refs'), 'r');
+    except IOError:
+        return None;
+
+    sha = None;
+    for line in packed_refs_file:
+        line = to_str(line).strip();
+        if (line.endswith(' ' + ref)):
+            sha = line.split(' ', 1)[0];
+            break;
+    packed_refs_file.close();
+
+    return sha;
+
+
+# Check if repo HEAD refers to an existing commit (HEAD is read from git dir; only the object lookup runs git).
+def has_commits(path_to_repo):
+
+    sha = resolve_ref(path_to_repo, 'HEAD');
+    if (sha is None): # Unborn branch...
+        return False;
+
+    (returncode, _) = run_git(path_to_repo, ['cat-file', '-e', sha + '^{commit}']);
+
+    return (returncode == 0);
+
+
+# Check if commit is an ancestor of (or the same as) another commit of repo.
+def is_ancestor(path_to_repo, ancestor, rev):
+
+    (returncode, _) = run_git(path_to_repo, ['merge-base', '--is-ancestor', ancestor, rev]);
+
+    return (returncode == 0);
+
@@ -0,0 +1,202 @@
+#!/usr/bin/python
+
+
+import modules.lazy as lazy; # Heavy dependencies imported on first use.
+import sys; # Progress output.
+import time; # Backoff and latency timing.
+
+requests = lazy.import_lazily('requests', ['adapters']); # HTTP requests, connection pooling.
+
+
+# Global variables.
+
+session = None; # Pooled keep-alive session (shared by every GitHub API request).
+
+POOL_CONNECTIONS = 10; # Number of per-host connection pools kept alive.
+POOL_MAXSIZE = 10; # Max number of keep-alive connections per host pool.
+MAX_RETRIES = 6; # Max number of backoff retries for a single request.
+MAX_BACKOFF = 60.0; # Max number of seconds between exponential backoff retries.
+RATE_LOW_WATER = 0.1; # Fraction of rate limit below which requests get paced.
+
+# Rate limit budget (as last reported by the GitHub API).
+rate_limit = None; # X-RateLimit-Limit.
+rate_remaining = None; # X-RateLimit-Remaining.
+rate_reset = None; # X-RateLimit-Reset (UNIX epoch).
+
+# Request statistics.
+num_requests = 0; # Number of HTTP requests sent.
+num_retries = 0; # Number of HTTP requests re-sent after backoff.
+latencies = list(); # Seconds per HTTP request.
+wait_time = 0.0; # Seconds spent waiting on rate limit budget.
+
+
+# Get pooled HTTP session, creating it on first use.
+def get_session():
+
+    global session;
+
+    if (session is None):
+        session = requests.Session();
+        adapter = requests.adapters.HTTPAdapter(pool_connections=POOL_CONNECTIONS,
+                                                pool_maxsize=POOL_MAXSIZE);
+        session.mount('https://', adapter);
+        session.mount('http://', adapter);
+
+    return session;
+
+
+# Authenticate session using GitHub username and password.
+def set_basic_auth(username, password):
+
+    get_session().auth = (username, password);
+
+
+# Authenticate session using GitHub personal access token.
+def set_token_auth(access_token):
+
+    get_session().headers.update({'Authorization': 'token %s' % access_token});
+
+
+# Reset session authentication (and close pooled connections).
+def clear_auth():
+
+    global session;
+
+    if (session is not None):
+        session.close();
+    session = None;
+
+
+# Sleep for some number of seconds, keeping track of time spent waiting.
+def wait(seconds, reason):
+
+    global wait_time;
+
+    if (seconds <= 0):
+        return;
+
+    if (seconds >= 1):
+        sys.stdout.write("[api] " + reason + ": waiting " + str(int(round(seconds))) + "s...\n");
+        sys.stdout.flush();
+
+    time.sleep(seconds);
+    wait_time = wait_time + seconds;
+
+
+# Update rate limit budget from response headers.
+def update_rate_budget(response):
+
+    global rate_limit;
+    global rate_remaining;
+    global rate_reset;
+
+    headers = response.headers;
+    try:
+        if ('X-RateLimit-Limit' in headers):
+            rate_limit = int(headers['X-RateLimit-Limit']);
+        if ('X-RateLimit-Remaining' in headers):
+            rate_remaining = int(headers['X-RateLimit-Remaining']);
+        if ('X-RateLimit-Reset' in headers):
+            rate_reset = float(headers['X-RateLimit-Reset']);
+    except ValueError:
+        pass;
+
+
+# Schedule next request against remaining rate limit budget.
+def wait_for_rate_budget():
+
+    if (rate_remaining is None or rate_reset is None):
+        return; # Budget unknown (or API does not rate limit)...
+
+    seconds_to_reset = rate_reset - time.time();
+    if (seconds_to_reset <= 0):
+        return; # Budget has been replenished...
+
+    if (rate_remaining <= 0): # Budget exhausted...
+        wait(seconds_to_reset + 1, "Rate limit exhausted");
+    elif (rate_limit and rate_remaining < (rate_limit * RATE_LOW_WATER)): # Budget running low...
+        wait(seconds_to_reset / float(rate_remaining), "Rate limit running low");
+
+
+# Determine how long to back off before re-sending request (None if request should not be retried).
+def get_backoff_seconds(response, attempt):
+
+    if (response.status_code not in (403, 429)):
+        return None;
+
+    retry_after = response.headers.get('Retry-After');
+    if (retry_after):
+        try:
+            return float(retry_after);
+        except ValueError:
+            pass;
+
+    if (response.headers.get('X-RateLimit-Remaining') == '0' and rate_reset is not None):
+        return max(rate_reset - time.time(), 0) + 1;
+
+    if (response.status_code == 403 and 'rate limit' not in response.text.lower()):
+        return None; # Plain permission error...
+
+    return min(2 ** attempt, MAX_BACKOFF);
+
+
+# Send request to GitHub API, backing off on rate limit responses.
+def send(method, url, **kwargs):
+
+    global num_requests;
+    global num_retries;
+
+    s = get_session();
+
+    attempt = 0;
+    while (True):
+
+        wait_for_rate_budget();
+
+        t1 = time.time();
+        response = s.request(method, url, **kwargs);
+        latencies.append(time.time() - t1);
+        num_requests = num_requests + 1;
+
+        update_rate_budget(response);
+
+        backoff = get_backoff_seconds(response, attempt);
+        if (backoff is None or attempt >= MAX_RETRIES):
+            return response;
+
+        wait(backoff, "HTTP " + str(response.status_code));
+        attempt = attempt + 1;
+        num_retries = num_retries + 1;
+
+
+# Send GET request to GitHub API.
+def get(url, params=None, auth=None, headers=None):
+
+    return send('GET', url, params=params, auth=auth, headers=headers);
+
+
+# Send POST request with JSON body to GitHub API (e.g., a GraphQL query).
+def post_json(url, body):
+
+    return send('POST', url, json=body);
+
+
+# Formulate request count and latency statistics string.
+def get_stats_str():
+
+    if (not latencies):
+        return "API requests: 0";
+
+    sorted_latencies = sorted(latencies);
+    n = len(sorted_latencies);
+    mean = sum(sorted_latencies) / float(n);
+    median = sorted_latencies[n // 2];
+    p95 = sorted_latencies[min(n - 1, int(n * 0.95))];
+
+    stats_str = "API requests: " + str(num_requests) + " (" + str(num_retries) + " retried)";
+    stats_str = stats_str + "; latency mean/median/p95/max: %.3fs/%.3fs/%.3fs/%.3fs" % (mean, median, p95, sorted_latencies[-1]);
+    stats_str = stats_str + "; rate limit wait: %.1fs" % wait_time;
+    if (rate_remaining is not None):
+        stats_str = stats_str + "; rate limit remaining: " + str(rate_remaining);
+
+    return stats_str;
@@ -0,0 +1,118 @@
+#!/usr/bin/python
+
+
+import collections; # Running tasks per host.
+import modules.gitcmd as gitcmd; # Git commands.
+import os; # Pipe reads.
+import select; # Waiting on git processes.
+
+
+# Event loop running tasks concurrently on a single thread, without threads or one process per task: each task is a
+# generator that yields git commands (argument lists) and is sent back each command's exit status and output once it
+# exits, then yields its result (anything but a list). Tasks run interleaved while their git commands are in flight.
+
+READ_SIZE = 65536; # Bytes read from git output at once.
+
+
+# Start (or resume) task with value sent to it, until it yields a git command (then started) or its result.
+def step_task(loop, task_index, value):
+
+    (host, task) = loop['tasks'][task_index];
+
+    try:
+        yielded = task.send(value);
+    except StopIteration: # (Task ended without yielding a result.)
+        yielded = None;
+
+    if (isinstance(yielded, list)): # Git command...
+        sp = gitcmd.start_git_cmd(yielded);
+        fd = sp.stdout.fileno();
+        loop['running'][fd] = (task_index, sp, list());
+        loop['poller'].register(fd, select.POLLIN | select.POLLHUP | select.POLLERR);
+        return;
+
+    task.close();
+    loop['host_counts'][host] = loop['host_counts'][host] - 1;
+    loop['results'][task_index] = yielded;
+    if (loop['on_done'] is not None):
+        loop['on_done'](task_index, yielded);
+
+
+# Start tasks waiting to run (in order, skipping those of hosts at their limit) while slots are free.
+def start_waiting_tasks(loop):
+
+    i = 0;
+    while (i < len(loop['waiting']) and len(loop['running']) < loop['max_running']):
+
+        task_index = loop['waiting'][i];
+        host = loop['tasks'][task_index][0];
+        if (loop['host_counts'][host] >= loop['max_per_host']):
+            i = i + 1;
+            continue;
+
+        del loop['waiting'][i];
+        loop['host_counts'][host] = loop['host_counts'][host] + 1;
+        if (loop['on_start'] is not None):
+            loop['on_start'](task_index);
+        step_task(loop, task_index, None);
+
+
+# Read available output of git command; once it is all read, resume its task with its exit status and output.
+def read_git_output(loop, fd):
+
+    (task_index, sp, chunks) = loop['running'][fd];
+
+    data = os.read(fd, READ_SIZE);
+    if (data):
+        chunks.append(data);
+        return;
+
+    loop['poller'].unregister(fd);
+    del loop['running'][fd];
+    sp.stdout.close();
+    returncode = sp.wait();
+
+    step_task(loop, task_index, (returncode, gitcmd.to_str(''.join(chunks))));
+
+
+# Run tasks ((host, generator) pairs, e.g., with remote hostname): at most 'max_running' at once, and at most
+# 'max_per_host' of the same host, each holding its slot until it yields its result; 'on_start' and 'on_done' (if any)
+# are called with the index of each task as it gets its slot, and with its index and result as it yields it, respectively.
+# Get results of tasks (in task order).
+# (With a single slot, tasks run one after another, in order.)
+def run_tasks(tasks, max_running=1, max_per_host=1, on_start=None, on_done=None):
+
+    loop = {'tasks' : tasks,
+            'max_running' : max(1, max_running),
+            'max_per_host' : max(1, max_per_host),
+            'on_start' : on_start,
+            'on_done' : on_done,
+            'waiting' : list(range(len(tasks))), # Tasks not started yet.
+            'running' : dict(), # Git command in flight (task index, process, output chunks) of each running task, by output file descriptor.
+            'host_counts' : collections.defaultdict(int), # Number of running tasks of each host.
+            'results' : [None] * len(tasks),
+            'poller' : select.poll()};
+
+    try:
+        start_waiting_tasks(loop);
+        while (loop['running']):
+
+            for (fd, _) in loop['poller'].poll():
+                if (fd in loop['running']):
+                    read_git_output(loop, fd);
+
+            start_waiting_tasks(loop);
+    finally: # (E.g., on Ctrl-C, git commands in flight are stopped along with their tasks.)
+        for (task_index, sp, _) in loop['running'].values():
+            if (sp.poll() is None):
+                sp.kill();
+            sp.wait();
+            loop['tasks'][task_index][1].close();
+
+    return loop['results'];
+
+
+# Run single task (to its result).
+def run_task(task):
+
+    return run_tasks([('', task)])[0];
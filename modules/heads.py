@@ -0,0 +1,46 @@
+#!/usr/bin/python
+
+
+import datetime; # Record timestamps.
+import hashlib; # Keys.
+import sqlite3; # Heads table database.
+
+
+# Get key of recorded head (e.g., of repo URL for collector, or of repo path, data store and options for scraper).
+def get_key(parts):
+
+    key_str = '\x00'.join([part if (isinstance(part, unicode)) else str(part).decode('utf-8', 'replace') for part in parts]);
+
+    return hashlib.sha1(key_str.encode('utf-8')).hexdigest();
+
+
+# Open heads table (creating it if needed), shared by collector and scraper runs.
+def open_heads(path_to_heads):
+
+    conn = sqlite3.connect(path_to_heads, timeout=60);
+    conn.execute('CREATE TABLE IF NOT EXISTS heads (key TEXT PRIMARY KEY, head TEXT NOT NULL, recorded_at TEXT NOT NULL);');
+    conn.commit();
+
+    return conn;
+
+
+# Close heads table.
+def close_heads(conn):
+
+    conn.close();
+
+
+# Get head recorded under key (None if none is).
+def get_head(conn, key):
+
+    row = conn.execute('SELECT head FROM heads WHERE key = ?;', (key,)).fetchone();
+
+    return row[0] if (row) else None;
+
+
+# Record heads (list of (key, head) pairs).
+def set_heads(conn, keyed_heads):
+
+    recorded_at = datetime.datetime.utcnow().strftime('%Y-%m-%dT%H:%M:%SZ');
+    conn.executemany('INSERT OR REPLACE INTO heads (key, head, recorded_at) VALUES (?, ?, ?);', [(key, head, recorded_at) for (key, head) in keyed_heads]);
+    conn.commit();
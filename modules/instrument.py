@@ -0,0 +1,174 @@
+#!/usr/bin/python
+
+
+import json; # Trace formats.
+import os; # Process ID.
+import resource; # CPU time, peak memory.
+import time; # Wall time.
+
+
+# Trace formats (by trace file extension): JSON lines, one span per line as it ends (default), or Chrome trace-event file.
+TRACE_FORMAT_JSON_LINES = 'jsonl';
+TRACE_FORMAT_CHROME = 'chrome';
+
+
+# Global variables.
+
+trace_file = None; # Open trace file, or None when tracing is off.
+trace_format = TRACE_FORMAT_JSON_LINES;
+trace_origin = 0.0; # Wall time trace was opened at (span start times are relative to it).
+
+boundary_hook = None; # Function called at each span start and end (with 'start'/'end' and span name), e.g., for memory snapshots.
+
+open_spans = list(); # Stack of spans that have started but not ended yet (innermost last).
+chrome_events = list(); # Ended spans as trace events (written when trace is closed).
+
+
+# Open trace file (spans are only recorded while a trace is open).
+def open_trace(path_to_trace):
+
+    global trace_file;
+    global trace_format;
+    global trace_origin;
+
+    trace_format = TRACE_FORMAT_CHROME if (path_to_trace.endswith('.json')) else TRACE_FORMAT_JSON_LINES;
+    trace_file = open(path_to_trace, 'w');
+    trace_origin = time.time();
+    del open_spans[:];
+    del chrome_events[:];
+
+
+# Close trace file (ending any spans left open).
+def close_trace():
+
+    global trace_file;
+
+    if (trace_file is None):
+        return;
+
+    while (open_spans):
+        end_span(open_spans[-1]);
+
+    if (trace_format == TRACE_FORMAT_CHROME):
+        json.dump({'traceEvents' : chrome_events, 'displayTimeUnit' : 'ms'}, trace_file);
+        del chrome_events[:];
+
+    trace_file.close();
+    trace_file = None;
+
+
+# Forget trace (and open spans) inherited from parent process, e.g., in worker processes, without writing to it.
+def forget_trace():
+
+    global trace_file;
+
+    trace_file = None;
+    del open_spans[:];
+    del chrome_events[:];
+
+
+# Set function called at each span start and end (spans are kept, even when not tracing, while one is set).
+def set_boundary_hook(hook):
+
+    global boundary_hook;
+
+    boundary_hook = hook;
+
+
+# Get CPU time (user + system, in seconds) used so far by this process and by its (finished) child processes, respectively.
+def get_cpu_times():
+
+    self_usage = resource.getrusage(resource.RUSAGE_SELF);
+    children_usage = resource.getrusage(resource.RUSAGE_CHILDREN);
+
+    return (self_usage.ru_utime + self_usage.ru_stime), (children_usage.ru_utime + children_usage.ru_stime);
+
+
+# Start named span (e.g., a pipeline stage), nested in the innermost open span; attributes are recorded along with it.
+# (Returns None when neither tracing nor hooked; other span functions then do nothing.)
+def start_span(name, **attrs):
+
+    if (trace_file is None and boundary_hook is None):
+        return None;
+
+    if (boundary_hook is not None):
+        boundary_hook('start', name);
+
+    (cpu_time, children_cpu_time) = get_cpu_times();
+
+    span = {'span' : name,
+            'parent' : open_spans[-1]['span'] if (open_spans) else None,
+            'depth' : len(open_spans),
+            'attrs' : attrs,
+            'bytes_read' : 0,
+            'rows' : 0,
+            'wall_start' : time.time(),
+            'cpu_start' : cpu_time,
+            'children_cpu_start' : children_cpu_time};
+    open_spans.append(span);
+
+    return span;
+
+
+# Add to counts of bytes read (e.g., from git) and rows processed by span.
+def add_counts(span, bytes_read=0, rows=0):
+
+    if (span is None):
+        return;
+
+    span['bytes_read'] = span['bytes_read'] + bytes_read;
+    span['rows'] = span['rows'] + rows;
+
+
+# Set attributes recorded along with span (e.g., outcome of stage).
+def set_attrs(span, **attrs):
+
+    if (span is None):
+        return;
+
+    span['attrs'].update(attrs);
+
+
+# End span, and record its wall time, CPU time (own and of child processes, e.g., git), peak RSS so far, and counts.
+def end_span(span):
+
+    if (span is None or not any(open_span is span for open_span in open_spans)): # (Already ended, e.g., along with its parent.)
+        return;
+
+    wall_end = time.time();
+    (cpu_time, children_cpu_time) = get_cpu_times();
+
+    while (open_spans[-1] is not span): # (Spans left open by inner stages end along with this one.)
+        end_span(open_spans[-1]);
+    open_spans.pop();
+
+    if (boundary_hook is not None):
+        boundary_hook('end', span['span']);
+
+    if (trace_file is None):
+        return;
+
+    record = {'span' : span['span'],
+              'parent' : span['parent'],
+              'depth' : span['depth'],
+              'start' : round(span['wall_start'] - trace_origin, 6),
+              'wall_s' : round(wall_end - span['wall_start'], 6),
+              'cpu_s' : round(cpu_time - span['cpu_start'], 6),
+              'children_cpu_s' : round(children_cpu_time - span['children_cpu_start'], 6),
+              'peak_rss_kb' : resource.getrusage(resource.RUSAGE_SELF).ru_maxrss, # (Peak of whole process so far; Linux reports KB.)
+              'children_peak_rss_kb' : resource.getrusage(resource.RUSAGE_CHILDREN).ru_maxrss,
+              'bytes_read' : span['bytes_read'],
+              'rows' : span['rows']};
+    record.update(span['attrs']);
+
+    if (trace_format == TRACE_FORMAT_CHROME):
+        chrome_events.append({'name' : record['span'],
+                              'ph' : 'X',
+                              'ts' : int(record['start'] * 1e6),
+                              'dur' : int(record['wall_s'] * 1e6),
+                              'pid' : os.getpid(),
+                              'tid' : 0,
+                              'args' : record});
+    else:
+        trace_file.write(json.dumps(record, sort_keys=True) + '\n');
+        trace_file.flush(); # (So that long runs can be followed as they go.)
@@ -0,0 +1,84 @@
+#!/usr/bin/python
+
+
+import datetime; # Timestamp handling.
+import json; # Journal entry format.
+import os; # File handling.
+
+
+# Journal entry statuses which indicate a repo has been processed successfully.
+DONE_STATUSES = ['cloned', 'updated'];
+
+
+# Get UTC now timestamp (with microseconds, to order journal entries).
+def get_timestamp_str():
+
+    return datetime.datetime.utcnow().strftime('%Y-%m-%dT%H:%M:%S.%fZ');
+
+
+# Append entry to journal file (one JSON object per line), flushing it to disk right away.
+def append_to_journal(path_to_journal, entry):
+
+    journal_file = open(path_to_journal, 'a');
+    journal_file.write(json.dumps(entry, sort_keys=True) + '\n');
+    journal_file.flush();
+    os.fsync(journal_file.fileno());
+    journal_file.close();
+
+
+# Record the beginning of a new run in journal file.
+def start_run(path_to_journal):
+
+    append_to_journal(path_to_journal, {'run_start': get_timestamp_str()});
+
+
+# Record status of a single repo in journal file.
+def record_repo(path_to_journal, repo_url, status, path_to_repo):
+
+    entry = {'url': repo_url,
+             'status': status,
+             'timestamp': get_timestamp_str(),
+             'path': path_to_repo};
+
+    append_to_journal(path_to_journal, entry);
+
+
+# Load latest journal entry for each repo URL recorded during the most recent run.
+def load_last_run(path_to_journal):
+
+    entries = dict();
+
+    if (not os.path.isfile(path_to_journal)):
+        return entries;
+
+    journal_file = open(path_to_journal, 'r');
+    for line in journal_file:
+
+        try:
+            entry = json.loads(line);
+        except ValueError: # Partially-written line (e.g., run was killed mid-write)...
+            continue;
+
+        if ('run_start' in entry): # New run; forget about entries of previous runs...
+            entries = dict();
+        elif ('url' in entry):
+            entries[entry['url']] = entry;
+
+    journal_file.close();
+
+    return entries;
+
+
+# Get dict of repo URL and local path for each repo processed successfully during the most recent run.
+def get_done_repos(path_to_journal):
+
+    done_repos = dict();
+
+    entries = load_last_run(path_to_journal);
+    for repo_url in entries:
+
+        entry = entries[repo_url];
+        if (entry['status'] in DONE_STATUSES):
+            done_repos[repo_url] = entry['path'];
+
+    return done_repos;
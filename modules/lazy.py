@@ -0,0 +1,36 @@
+#!/usr/bin/python
+
+
+import importlib; # Deferred module imports.
+import sys; # Loaded modules.
+import types; # Module type.
+
+
+# Module standing in for another one until it is first used: first attribute access imports it (along with some of its
+# submodules), then takes on its attributes, so later attribute accesses cost as much as with the module itself.
+class LazyModule(types.ModuleType):
+
+    # Set module to import (and its submodules to import along with it, e.g., 'plotting' of 'bokeh').
+    def __init__(self, name, submodules):
+
+        types.ModuleType.__init__(self, name);
+        self.__dict__['lazy_submodules'] = submodules;
+
+    # Import module and get attribute (only called for attributes not taken on yet).
+    def __getattr__(self, attr):
+
+        module = importlib.import_module(self.__name__);
+        for submodule in self.lazy_submodules:
+            importlib.import_module(self.__name__ + '.' + submodule);
+        self.__dict__.update(module.__dict__);
+
+        return getattr(module, attr);
+
+
+# Get module (with some of its submodules), imported on first use (or right away, if it already has been imported).
+def import_lazily(name, submodules=()):
+
+    if (all([(name + '.' + submodule) in sys.modules for submodule in submodules]) and name in sys.modules):
+        return sys.modules[name];
+
+    return LazyModule(name, submodules);
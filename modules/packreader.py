@@ -0,0 +1,674 @@
+#!/usr/bin/python
+
+
+import binascii; # Object name conversions.
+import heapq; # Commit date priority queue.
+import mmap; # Memory-mapped pack and index files.
+import os; # File, directory handling.
+import re; # Regular expressions.
+import struct; # Binary pack index parsing.
+import zlib; # Object decompression.
+
+import modules.gitcmd as gitcmd; # Ref resolution.
+
+
+# Pack object type codes.
+OBJ_COMMIT = 1;
+OBJ_TREE = 2;
+OBJ_BLOB = 3;
+OBJ_TAG = 4;
+OBJ_OFS_DELTA = 6;
+OBJ_REF_DELTA = 7;
+
+OBJ_TYPE_NAMES = {OBJ_COMMIT: 'commit',
+                  OBJ_TREE: 'tree',
+                  OBJ_BLOB: 'blob',
+                  OBJ_TAG: 'tag'};
+
+TREE_MODE = b'40000'; # Git tree entry mode of a subdirectory.
+
+MAX_CACHED_OBJECTS = 1024; # Number of (delta base) objects kept in memory per repo.
+MAX_CACHED_TREES = 4096; # Number of parsed trees kept in memory per repo.
+
+# Rename detection, as 'git log' does it by default (diffcore-rename): similarity scores range up to MAX_SCORE, and a
+# deleted and an added file are a rename from 50% similarity (75% when paired up by their unique basename first).
+MAX_SCORE = 60000;
+MIN_RENAME_SCORE = 30000;
+MIN_BASENAME_SCORE = MIN_RENAME_SCORE + (MAX_SCORE - MIN_RENAME_SCORE) // 2;
+RENAME_LIMIT = 1000; # Similarity is only estimated if (deleted files) x (added files) is at most this squared (git's 'diff.renameLimit').
+NUM_CANDIDATES_PER_DST = 4; # Best rename sources kept per added file.
+SPAN_HASH_BASE = 107927; # Span hashes modulus.
+MAX_SPAN_BYTES = 64; # Spans end at a newline, or at this many bytes.
+BINARY_CHECK_BYTES = 8000; # Data holding a NUL byte in its first bytes is binary.
+
+
+# Open repo for in-process object reading (memory-maps every pack file in repo).
+def open_repo(path_to_repo):
+
+    objects_dir = os.path.join(gitcmd.get_git_dir(path_to_repo), 'objects');
+    pack_dir = os.path.join(objects_dir, 'pack');
+
+    packs = list();
+    if (os.path.isdir(pack_dir)):
+        for filename in sorted(os.listdir(pack_dir)):
+            if (filename.endswith('.idx') and os.path.exists(os.path.join(pack_dir, filename[:-4] + '.pack'))):
+                packs.append(open_pack(os.path.join(pack_dir, filename[:-4])));
+
+    repo = {'path': path_to_repo,
+            'objects_dir': objects_dir,
+            'packs': packs,
+            'cache': dict(),
+            'tree_cache': dict(),
+            'bytes_read': 0};
+
+    return repo;
+
+
+# Release memory-mapped pack files of repo.
+def close_repo(repo):
+
+    for pack in repo['packs']:
+        pack['idx'].close();
+        pack['pack'].close();
+
+    repo['packs'] = list();
+    repo['cache'] = dict();
+    repo['tree_cache'] = dict();
+
+
+# Memory-map pack (version 2 index and its pack file).
+def open_pack(path_to_pack):
+
+    idx_file = open(path_to_pack + '.idx', 'rb');
+    idx = mmap.mmap(idx_file.fileno(), 0, access=mmap.ACCESS_READ);
+    idx_file.close();
+
+    pack_file = open(path_to_pack + '.pack', 'rb');
+    pack = mmap.mmap(pack_file.fileno(), 0, access=mmap.ACCESS_READ);
+    pack_file.close();
+
+    if (idx[0:8] != b'\xfftOc\x00\x00\x00\x02'):
+        raise ValueError("Unsupported pack index version \'" + path_to_pack + ".idx\'");
+
+    fanout = struct.unpack('>256I', idx[8:8+1024]);
+    num_objects = fanout[255];
+
+    return {'idx': idx,
+            'pack': pack,
+            'fanout': fanout,
+            'num_objects': num_objects,
+            'names_offset': 8 + 1024,
+            'offsets_offset': 8 + 1024 + (24 * num_objects),
+            'large_offsets_offset': 8 + 1024 + (28 * num_objects)};
+
+
+# Find offset of object in pack (binary search of pack index), or None if object is not in pack.
+def find_pack_offset(pack, binsha):
+
+    idx = pack['idx'];
+    first_byte = ord(binsha[0:1]);
+
+    lo = pack['fanout'][first_byte-1] if (first_byte > 0) else 0;
+    hi = pack['fanout'][first_byte];
+    names_offset = pack['names_offset'];
+
+    while (lo < hi):
+
+        mid = (lo + hi) // 2;
+        name = idx[names_offset + (20 * mid):names_offset + (20 * mid) + 20];
+        if (name < binsha):
+            lo = mid + 1;
+        elif (name > binsha):
+            hi = mid;
+        else:
+            (offset,) = struct.unpack('>I', idx[pack['offsets_offset'] + (4 * mid):pack['offsets_offset'] + (4 * mid) + 4]);
+            if (offset & 0x80000000): # Offset is index into table of 64-bit offsets...
+                i = pack['large_offsets_offset'] + (8 * (offset & 0x7fffffff));
+                (offset,) = struct.unpack('>Q', idx[i:i+8]);
+            return offset;
+
+    return None;
+
+
+# Inflate zlib stream at offset of buffer, given its inflated size.
+def inflate(buf, offset, size):
+
+    d = zlib.decompressobj();
+
+    chunks = list();
+    num_inflated = 0;
+    chunk_size = max(4096, size + 64);
+    while (num_inflated < size or not chunks):
+
+        chunk = buf[offset:offset+chunk_size];
+        if (not chunk):
+            break;
+        data = d.decompress(chunk);
+        chunks.append(data);
+        num_inflated = num_inflated + len(data);
+        offset = offset + chunk_size;
+        if (d.unused_data):
+            break;
+
+    return b''.join(chunks);
+
+
+# Apply delta instructions to base object data.
+def apply_delta(base, delta):
+
+    # Delta starts with base size and result size (as little-endian base-128 varints).
+    i = 0;
+    for j in range(0, 2):
+        shift = 0;
+        size = 0;
+        while (True):
+            c = ord(delta[i:i+1]);
+            i = i + 1;
+            size = size | ((c & 0x7f) << shift);
+            shift = shift + 7;
+            if (not (c & 0x80)):
+                break;
+    result_size = size;
+
+    chunks = list();
+    delta_size = len(delta);
+    while (i < delta_size):
+
+        op = ord(delta[i:i+1]);
+        i = i + 1;
+
+        if (op & 0x80): # Copy from base...
+            copy_offset = 0;
+            copy_size = 0;
+            for bit in range(0, 4):
+                if (op & (1 << bit)):
+                    copy_offset = copy_offset | (ord(delta[i:i+1]) << (8 * bit));
+                    i = i + 1;
+            for bit in range(0, 3):
+                if (op & (1 << (4 + bit))):
+                    copy_size = copy_size | (ord(delta[i:i+1]) << (8 * bit));
+                    i = i + 1;
+            if (copy_size == 0):
+                copy_size = 0x10000;
+            chunks.append(base[copy_offset:copy_offset+copy_size]);
+        elif (op): # Insert literal data...
+            chunks.append(delta[i:i+op]);
+            i = i + op;
+        else:
+            raise ValueError("Bad delta opcode");
+
+    result = b''.join(chunks);
+    if (len(result) != result_size):
+        raise ValueError("Bad delta result size");
+
+    return result;
+
+
+# Read (type, data) of object at offset of pack.
+def read_pack_object(repo, pack, offset):
+
+    key = (id(pack), offset);
+    if (key in repo['cache']):
+        return repo['cache'][key];
+
+    buf = pack['pack'];
+
+    # Object header: type and inflated size (as a base-128 varint).
+    c = ord(buf[offset:offset+1]);
+    obj_type = (c >> 4) & 0x7;
+    size = c & 0x0f;
+    shift = 4;
+    i = offset + 1;
+    while (c & 0x80):
+        c = ord(buf[i:i+1]);
+        i = i + 1;
+        size = size | ((c & 0x7f) << shift);
+        shift = shift + 7;
+
+    if (obj_type == OBJ_OFS_DELTA): # Base object is at (negative) offset within same pack...
+        c = ord(buf[i:i+1]);
+        i = i + 1;
+        base_distance = c & 0x7f;
+        while (c & 0x80):
+            c = ord(buf[i:i+1]);
+            i = i + 1;
+            base_distance = ((base_distance + 1) << 7) | (c & 0x7f);
+        (base_type, base_data) = read_pack_object(repo, pack, offset - base_distance);
+        delta = inflate(buf, i, size);
+        (obj_type, data) = (base_type, apply_delta(base_data, delta));
+    elif (obj_type == OBJ_REF_DELTA): # Base object is referred to by name...
+        base_binsha = buf[i:i+20];
+        i = i + 20;
+        (base_type, base_data) = read_object_bin(repo, base_binsha);
+        delta = inflate(buf, i, size);
+        (obj_type, data) = (base_type, apply_delta(base_data, delta));
+    else:
+        data = inflate(buf, i, size);
+
+    repo['bytes_read'] = repo['bytes_read'] + len(data);
+
+    if (len(repo['cache']) >= MAX_CACHED_OBJECTS):
+        repo['cache'].clear();
+    repo['cache'][key] = (obj_type, data);
+
+    return (obj_type, data);
+
+
+# Read (type, data) of loose object, or None if there is no such loose object.
+def read_loose_object(repo, hexsha):
+
+    path_to_object = os.path.join(repo['objects_dir'], hexsha[:2], hexsha[2:]);
+    if (not os.path.isfile(path_to_object)):
+        return None;
+
+    object_file = open(path_to_object, 'rb');
+    raw = zlib.decompress(object_file.read());
+    object_file.close();
+
+    repo['bytes_read'] = repo['bytes_read'] + len(raw);
+
+    (header, data) = raw.split(b'\x00', 1);
+    type_name = header.split(b' ')[0].decode('ascii');
+    for obj_type in OBJ_TYPE_NAMES:
+        if (OBJ_TYPE_NAMES[obj_type] == type_name):
+            return (obj_type, data);
+
+    return None;
+
+
+# Read (type, data) of object by (binary) name.
+def read_object_bin(repo, binsha):
+
+    for pack in repo['packs']:
+        offset = find_pack_offset(pack, binsha);
+        if (offset is not None):
+            return read_pack_object(repo, pack, offset);
+
+    hexsha = binascii.hexlify(binsha).decode('ascii');
+    obj = read_loose_object(repo, hexsha);
+    if (obj is None):
+        raise KeyError("No such object \'" + hexsha + "\'");
+
+    return obj;
+
+
+# Read (type, data) of object by (hex) name.
+def read_object(repo, hexsha):
+
+    return read_object_bin(repo, binascii.unhexlify(hexsha));
+
+
+# Parse git ident ('Name <email> epoch tz') into (name, email, epoch).
+def parse_ident(ident):
+
+    lt = ident.find(b'<');
+    gt = ident.rfind(b'>');
+
+    name = ident[:lt].strip();
+    email = ident[lt+1:gt];
+    rest = ident[gt+1:].split();
+    epoch = int(rest[0]) if (rest) else 0;
+
+    return (name, email, epoch);
+
+
+# Formulate commit subject (first paragraph of commit message, on a single line) as git-log '%s' does.
+def get_subject(message):
+
+    lines = message.split(b'\n');
+
+    i = 0;
+    while (i < len(lines) and not lines[i].strip()): # Skip leading blank lines...
+        i = i + 1;
+
+    subject_lines = list();
+    while (i < len(lines) and lines[i].strip()):
+        subject_lines.append(lines[i].rstrip());
+        i = i + 1;
+
+    return b' '.join(subject_lines);
+
+
+# Parse commit object data into dict of its fields (names and messages are still undecoded).
+def parse_commit(data):
+
+    (headers, _, message) = data.partition(b'\n\n');
+
+    commit = {'tree': None,
+              'parents': list(),
+              'encoding': 'utf-8'};
+
+    for line in headers.split(b'\n'):
+
+        if (line.startswith(b' ')): # Continuation of multi-line header (e.g., 'gpgsig')...
+            continue;
+
+        (key, _, value) = line.partition(b' ');
+        if (key == b'tree'):
+            commit['tree'] = value.decode('ascii');
+        elif (key == b'parent'):
+            commit['parents'].append(value.decode('ascii'));
+        elif (key == b'author'):
+            commit['author'] = parse_ident(value);
+        elif (key == b'committer'):
+            commit['committer'] = parse_ident(value);
+        elif (key == b'encoding'):
+            commit['encoding'] = value.decode('ascii');
+
+    commit['subject'] = get_subject(message);
+
+    return commit;
+
+
+# Parse tree object data into dict of entry names and their (mode, binary name).
+def parse_tree(data):
+
+    entries = dict();
+
+    i = 0;
+    size = len(data);
+    while (i < size):
+
+        space = data.index(b' ', i);
+        nul = data.index(b'\x00', space);
+        entries[data[space+1:nul]] = (data[i:space], data[nul+1:nul+21]);
+        i = nul + 21;
+
+    return entries;
+
+
+# Get tree entries of tree object (by binary name).
+def read_tree(repo, tree_binsha):
+
+    tree_cache = repo['tree_cache'];
+    if (tree_binsha in tree_cache):
+        return tree_cache[tree_binsha];
+
+    (_, data) = read_object_bin(repo, tree_binsha);
+    entries = parse_tree(data);
+
+    if (len(tree_cache) >= MAX_CACHED_TREES):
+        tree_cache.clear();
+    tree_cache[tree_binsha] = entries;
+
+    return entries;
+
+
+# Get (mode, binary name) of entry at path (list of path components) of tree, or None if there is no such entry.
+def get_path_entry(repo, tree_hexsha, path_components):
+
+    entry = (TREE_MODE, binascii.unhexlify(tree_hexsha));
+    for component in path_components:
+
+        if (entry[0] != TREE_MODE):
+            return None;
+        entry = read_tree(repo, entry[1]).get(component);
+        if (entry is None):
+            return None;
+
+    return entry;
+
+
+# Collect added, deleted and modified files between two tree entries (either of which may be None).
+def diff_entries(repo, old_entry, new_entry, path, changes):
+
+    if (old_entry == new_entry):
+        return;
+
+    old_is_tree = (old_entry is not None and old_entry[0] == TREE_MODE);
+    new_is_tree = (new_entry is not None and new_entry[0] == TREE_MODE);
+
+    if (old_is_tree or new_is_tree):
+
+        old_tree = read_tree(repo, old_entry[1]) if (old_is_tree) else dict();
+        new_tree = read_tree(repo, new_entry[1]) if (new_is_tree) else dict();
+
+        for name in new_tree:
+            old_tree_entry = old_tree.get(name);
+            if (old_tree_entry != new_tree[name]): # (Skip unchanged entries without recursing.)
+                diff_entries(repo, old_tree_entry, new_tree[name], path + [name], changes);
+        for name in old_tree:
+            if (name not in new_tree):
+                diff_entries(repo, old_tree[name], None, path + [name], changes);
+
+        old_entry = None if (old_is_tree) else old_entry;
+        new_entry = None if (new_is_tree) else new_entry;
+
+    if (old_entry is not None and new_entry is not None):
+        changes['modified'].append(path);
+    elif (old_entry is not None):
+        changes['deleted'].append((path, old_entry));
+    elif (new_entry is not None):
+        changes['added'].append((path, new_entry));
+
+
+# Get span hashes of blob data as git estimates similarity with them: number of bytes of each hash of spans of data
+# (spans end at a newline, or at 64 bytes; the '\r' of a '\r\n' is left out of text, and so is an unterminated last span).
+def get_span_hashes(data):
+
+    data = bytearray(data);
+    size = len(data);
+    is_text = (0 not in data[:BINARY_CHECK_BYTES]);
+
+    span_hashes = dict();
+    accum1 = 0;
+    accum2 = 0;
+    n = 0;
+    for i in range(0, size):
+
+        c = data[i];
+        if (is_text and c == 13 and i+1 < size and data[i+1] == 10):
+            continue;
+
+        old_1 = accum1; # (Unsigned 32-bit arithmetic, as in git.)
+        accum1 = ((accum1 << 7) ^ (accum2 >> 25)) & 0xffffffff;
+        accum2 = ((accum2 << 7) ^ (old_1 >> 25)) & 0xffffffff;
+        accum1 = (accum1 + c) & 0xffffffff;
+        n = n + 1;
+        if (n < MAX_SPAN_BYTES and c != 10):
+            continue;
+
+        hashval = ((accum1 + accum2 * 0x61) & 0xffffffff) % SPAN_HASH_BASE;
+        span_hashes[hashval] = span_hashes.get(hashval, 0) + n;
+        accum1 = 0;
+        accum2 = 0;
+        n = 0;
+
+    return span_hashes;
+
+
+# Get size and span hashes of file (dict of its path and tree entry; both are read on first use, and kept in it).
+def get_file_spans(repo, changed_file):
+
+    if ('span_hashes' not in changed_file):
+        (_, data) = read_object_bin(repo, changed_file['entry'][1]);
+        changed_file['size'] = len(data);
+        changed_file['span_hashes'] = get_span_hashes(data);
+
+    return changed_file['size'], changed_file['span_hashes'];
+
+
+# Estimate similarity score of added file to deleted file (0 unless both are regular files of similar enough sizes).
+def estimate_similarity(repo, src, dst, min_score):
+
+    if (not src['entry'][0].startswith(b'100') or not dst['entry'][0].startswith(b'100')): # (Symlinks and submodules are only renamed as is.)
+        return 0;
+
+    (src_size, src_span_hashes) = get_file_spans(repo, src);
+    (dst_size, dst_span_hashes) = get_file_spans(repo, dst);
+
+    max_size = max(src_size, dst_size);
+    delta_size = max_size - min(src_size, dst_size);
+    if (max_size * (MAX_SCORE - min_score) < delta_size * MAX_SCORE): # Cannot possibly be similar enough...
+        return 0;
+    if (dst_size == 0):
+        return 0;
+
+    src_copied = 0;
+    for (hashval, count) in dst_span_hashes.items():
+        src_copied = src_copied + min(count, src_span_hashes.get(hashval, 0));
+
+    return src_copied * MAX_SCORE // max_size;
+
+
+# Get basename of file path (path components).
+def get_basename(path):
+
+    return path[-1] if (path) else b'';
+
+
+# Pair up deleted files with added files of similar contents (renames with edits), as git does by default: first files
+# whose basename is unique among both, then the most similar pairs; get indices of deleted files paired up.
+def get_similar_renames(repo, deleted_files, added_files):
+
+    srcs = sorted([{'index' : i, 'path' : deleted_files[i][0], 'entry' : deleted_files[i][1]} for i in range(0, len(deleted_files))], key=lambda src: src['path']);
+    dsts = sorted([{'path' : path, 'entry' : entry} for (path, entry) in added_files], key=lambda dst: dst['path']);
+
+    renamed = set(); # Indices of deleted files (sources) renamed.
+    renamed_dsts = set();
+
+    # Unique basenames first...
+    src_basenames = dict();
+    for src in srcs:
+        basename = get_basename(src['path']);
+        src_basenames[basename] = None if (basename in src_basenames) else src;
+    dst_basenames = dict();
+    for j in range(0, len(dsts)):
+        basename = get_basename(dsts[j]['path']);
+        dst_basenames[basename] = None if (basename in dst_basenames) else j;
+    for src in srcs:
+        basename = get_basename(src['path']);
+        j = dst_basenames.get(basename);
+        if (src_basenames[basename] is None or j is None):
+            continue;
+        if (estimate_similarity(repo, src, dsts[j], MIN_BASENAME_SCORE) >= MIN_BASENAME_SCORE):
+            renamed.add(src['index']);
+            renamed_dsts.add(j);
+
+    srcs = [src for src in srcs if (src['index'] not in renamed)];
+    dst_indices = [j for j in range(0, len(dsts)) if (j not in renamed_dsts)];
+    if (not srcs or not dst_indices or len(srcs) * len(dst_indices) > RENAME_LIMIT * RENAME_LIMIT):
+        return renamed;
+
+    # Then most similar pairs (best few sources of each added file)...
+    candidates = list();
+    for j in dst_indices:
+        dst_candidates = list();
+        for src in srcs:
+            score = estimate_similarity(repo, src, dsts[j], MIN_RENAME_SCORE);
+            if (score >= MIN_RENAME_SCORE):
+                dst_candidates.append((score, int(get_basename(src['path']) == get_basename(dsts[j]['path'])), j, src['index']));
+        dst_candidates.sort(key=lambda candidate: (-candidate[0], -candidate[1])); # (Stable: earlier sources win ties.)
+        candidates.extend(dst_candidates[:NUM_CANDIDATES_PER_DST]);
+    candidates.sort(key=lambda candidate: (-candidate[0], -candidate[1]));
+
+    for (score, name_score, j, i) in candidates:
+        if (j in renamed_dsts or i in renamed):
+            continue;
+        renamed.add(i);
+        renamed_dsts.add(j);
+
+    return renamed;
+
+
+# Get paths (lists of path components) of files changed between two tree entries, as listed by 'git log --stat'
+# (a rename, exact or with edits, is listed once, under its new path).
+def get_changed_files(repo, old_entry, new_entry):
+
+    changes = {'added': list(), 'deleted': list(), 'modified': list()};
+    diff_entries(repo, old_entry, new_entry, list(), changes);
+
+    deleted_blobs = dict();
+    for (path, entry) in changes['deleted']:
+        deleted_blobs.setdefault(entry[1], list()).append((path, entry));
+
+    changed_files = list(changes['modified']);
+    added_files = list(); # (Not renamed as is.)
+    for (path, entry) in changes['added']:
+        changed_files.append(path);
+        if (deleted_blobs.get(entry[1])): # Pair up with a deleted file of the same contents...
+            deleted_blobs[entry[1]].pop();
+        else:
+            added_files.append((path, entry));
+
+    deleted_files = [deleted_file for binsha in deleted_blobs for deleted_file in deleted_blobs[binsha]];
+    renamed = get_similar_renames(repo, deleted_files, added_files) if (deleted_files and added_files) else set();
+    changed_files.extend([deleted_files[i][0] for i in range(0, len(deleted_files)) if (i not in renamed)]);
+
+    return changed_files;
+
+
+# Get number of files changed between two tree entries, as reported by 'git log --stat' (renames count once).
+def get_num_files_changed(repo, old_entry, new_entry):
+
+    return len(get_changed_files(repo, old_entry, new_entry));
+
+
+# Split path in repo into list of path components ('.' refers to the whole repo).
+def get_path_components(path_in_repo):
+
+    components = [c.encode('utf-8') if (not isinstance(c, bytes)) else c for c in re.split(r'/+', path_in_repo) if (c and c != '.')];
+
+    return components;
+
+
+# Walk commit history from HEAD (newest commits first, like 'git log --full-history -- path_in_repo'),
+# yielding a commit dict (including the files it changed) for each commit that touches path in repo.
+def walk_commits(repo, path_in_repo, since_epoch, until_epoch):
+
+    head = gitcmd.resolve_ref(repo['path'], 'HEAD');
+    if (head is None):
+        return;
+
+    path_components = get_path_components(path_in_repo);
+
+    queue = list();
+    seen = set([head]);
+    counter = 0;
+
+    (_, data) = read_object(repo, head);
+    commit = parse_commit(data);
+    heapq.heappush(queue, (-commit['committer'][2], counter, head, commit));
+
+    while (queue):
+
+        (_, _, hexsha, commit) = heapq.heappop(queue);
+        committer_epoch = commit['committer'][2];
+
+        if (since_epoch is not None and committer_epoch < since_epoch): # Too old (and so are its ancestors)...
+            continue;
+
+        parent_commits = list();
+        for parent in commit['parents']:
+            try:
+                (_, data) = read_object(repo, parent);
+            except KeyError: # Missing parent (e.g., shallow clone)...
+                continue;
+            parent_commit = parse_commit(data);
+            parent_commits.append(parent_commit);
+            if (parent not in seen):
+                seen.add(parent);
+                counter = counter + 1;
+                heapq.heappush(queue, (-parent_commit['committer'][2], counter, parent, parent_commit));
+
+        if (until_epoch is not None and committer_epoch > until_epoch): # Too new (but its ancestors may not be)...
+            continue;
+
+        entry = get_path_entry(repo, commit['tree'], path_components);
+        parent_entries = [get_path_entry(repo, p['tree'], path_components) for p in parent_commits];
+
+        if (len(parent_entries) > 1): # Merge (hidden only if it does not differ from any parent; no files listed)...
+            if (path_components and all(entry == parent_entry for parent_entry in parent_entries)):
+                continue;
+            changed_files = list();
+        else:
+            parent_entry = parent_entries[0] if (parent_entries) else None;
+            if (path_components and entry == parent_entry):
+                continue;
+            changed_files = get_changed_files(repo, parent_entry, entry);
+
+        commit['commit_hash'] = hexsha;
+        commit['changed_files'] = [b'/'.join(path_components + path) for path in changed_files];
+        commit['num_files_changed'] = len(changed_files);
+
+        yield commit;
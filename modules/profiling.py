@@ -0,0 +1,200 @@
+#!/usr/bin/python
+
+
+import cProfile; # Deterministic profiler.
+import collections; # Sample and object counts.
+import gc; # Live objects (memory snapshots without tracemalloc).
+import json; # Memory snapshots format.
+import modules.instrument as instrument; # Stage boundaries (spans).
+import os; # File handling.
+import pstats; # Profile reports.
+import resource; # Peak memory.
+import signal; # Sampling timer.
+import time; # Snapshot times.
+
+try:
+    import tracemalloc; # Allocation tracing (Python 3, or patched Python 2 with 'pytracemalloc').
+except ImportError:
+    tracemalloc = None;
+
+
+PROFILE_MODES = ['cprofile', 'sample']; # Recognized profilers.
+
+SAMPLE_INTERVAL = 0.005; # CPU time (in seconds) between stack samples.
+NUM_REPORTED_FUNCTIONS = 40; # Functions listed in profile reports.
+NUM_REPORTED_ALLOCATIONS = 10; # Allocation sites (or object types) listed in each memory snapshot.
+TRACEMALLOC_FRAMES = 10; # Frames kept for each traced allocation.
+
+
+# Global variables.
+
+profile_mode = None; # Running profiler ('cprofile' or 'sample'), or None.
+profiler = None; # cProfile profiler.
+stack_samples = collections.Counter(); # Number of samples of each stack (tuple of frames, outermost first).
+num_samples = 0;
+
+memory_snapshots = list(); # Memory snapshot records, taken at stage boundaries.
+last_tracemalloc_snapshot = None;
+
+
+# Get frame label (function, file and line where function is defined).
+def get_frame_label(frame):
+
+    code = frame.f_code;
+
+    return code.co_name + ' (' + os.path.basename(code.co_filename) + ':' + str(code.co_firstlineno) + ')';
+
+
+# Record stack of interrupted frame (sampling timer signal handler).
+def sample_stack(signum, frame):
+
+    global num_samples;
+
+    stack = list();
+    while (frame is not None):
+        stack.append(get_frame_label(frame));
+        frame = frame.f_back;
+    stack.reverse();
+
+    stack_samples[tuple(stack)] += 1;
+    num_samples = num_samples + 1;
+
+
+# Get current and peak resident set size (in KB) of process (current one is None where it cannot be read).
+def get_rss_kb():
+
+    rss_kb = None;
+    try:
+        statm_file = open('/proc/self/statm');
+        rss_kb = int(statm_file.read().split()[1]) * resource.getpagesize() // 1024;
+        statm_file.close();
+    except (IOError, IndexError, ValueError):
+        pass;
+
+    return rss_kb, resource.getrusage(resource.RUSAGE_SELF).ru_maxrss;
+
+
+# Take memory snapshot (at stage boundary): largest allocation sites with tracemalloc, else most numerous object types.
+def take_memory_snapshot(boundary, span_name):
+
+    global last_tracemalloc_snapshot;
+
+    (rss_kb, peak_rss_kb) = get_rss_kb();
+    record = {'boundary' : boundary,
+              'span' : span_name,
+              'time' : time.time(),
+              'rss_kb' : rss_kb,
+              'peak_rss_kb' : peak_rss_kb};
+
+    if (tracemalloc is not None):
+        snapshot = tracemalloc.take_snapshot();
+        record['top_allocations'] = [str(stat) for stat in snapshot.statistics('lineno')[:NUM_REPORTED_ALLOCATIONS]];
+        if (last_tracemalloc_snapshot is not None):
+            record['top_allocation_changes'] = [str(stat) for stat in snapshot.compare_to(last_tracemalloc_snapshot, 'lineno')[:NUM_REPORTED_ALLOCATIONS]];
+        last_tracemalloc_snapshot = snapshot;
+    else: # (Only objects tracked by the garbage collector, i.e., containers, are counted.)
+        type_counts = collections.Counter([type(obj).__name__ for obj in gc.get_objects()]);
+        record['top_object_types'] = type_counts.most_common(NUM_REPORTED_ALLOCATIONS);
+
+    memory_snapshots.append(record);
+
+
+# Start profiling run: with profiler ('cprofile' or 'sample', or None), and/or with memory snapshots at stage boundaries.
+def start(mode, with_memory_snapshots):
+
+    global profile_mode;
+    global profiler;
+
+    if (with_memory_snapshots):
+        if (tracemalloc is not None):
+            tracemalloc.start(TRACEMALLOC_FRAMES);
+        instrument.set_boundary_hook(take_memory_snapshot);
+        take_memory_snapshot('start', None);
+
+    profile_mode = mode;
+    if (mode == 'cprofile'):
+        profiler = cProfile.Profile();
+        profiler.enable();
+    elif (mode == 'sample'): # Sample stack every so often (of CPU time, so time blocked on git is not sampled)...
+        signal.signal(signal.SIGPROF, sample_stack);
+        signal.siginterrupt(signal.SIGPROF, False); # (Restart system calls, e.g., reads from git, interrupted by timer.)
+        signal.setitimer(signal.ITIMER_PROF, SAMPLE_INTERVAL, SAMPLE_INTERVAL);
+
+
+# Write sampling profile reports: stacks in collapsed ("folded") format for flame graphs, and functions by samples.
+def write_sample_reports(path_prefix):
+
+    folded_path = path_prefix + '-profile.folded';
+    folded_file = open(folded_path, 'w');
+    for (stack, count) in sorted(stack_samples.items()):
+        folded_file.write(';'.join(stack) + ' ' + str(count) + '\n');
+    folded_file.close();
+
+    self_counts = collections.Counter();
+    total_counts = collections.Counter();
+    for (stack, count) in stack_samples.items():
+        self_counts[stack[-1]] += count;
+        for frame_label in set(stack): # (Recursive functions count once per sample.)
+            total_counts[frame_label] += count;
+
+    report_path = path_prefix + '-profile.txt';
+    report_file = open(report_path, 'w');
+    report_file.write("Samples: " + str(num_samples) + " (every " + str(SAMPLE_INTERVAL) + "s of CPU time)\n");
+    for (title, counts) in [("Functions by own samples", self_counts), ("Functions by total samples (including callees)", total_counts)]:
+        report_file.write('\n' + title + ':\n');
+        for (frame_label, count) in counts.most_common(NUM_REPORTED_FUNCTIONS):
+            report_file.write(("{0:>8} {1:>6.1f}%  {2}\n").format(count, 100.0 * count / max(num_samples, 1), frame_label));
+    report_file.close();
+
+    return [report_path, folded_path];
+
+
+# Write cProfile reports: raw stats (for 'pstats'/'snakeviz' and the like), and functions by total and own time.
+def write_cprofile_reports(path_prefix):
+
+    stats_path = path_prefix + '-profile.pstats';
+    profiler.dump_stats(stats_path);
+
+    report_path = path_prefix + '-profile.txt';
+    report_file = open(report_path, 'w');
+    stats = pstats.Stats(profiler, stream=report_file);
+    stats.sort_stats('cumulative').print_stats(NUM_REPORTED_FUNCTIONS);
+    stats.sort_stats('tottime').print_stats(NUM_REPORTED_FUNCTIONS);
+    report_file.close();
+
+    return [report_path, stats_path];
+
+
+# Stop profiling run, and write its reports (paths starting with prefix, e.g., that of outputs); get paths of reports.
+def stop(path_prefix):
+
+    global profile_mode;
+    global last_tracemalloc_snapshot;
+
+    report_paths = list();
+
+    if (profile_mode == 'cprofile'):
+        profiler.disable();
+        report_paths = report_paths + write_cprofile_reports(path_prefix);
+    elif (profile_mode == 'sample'):
+        signal.setitimer(signal.ITIMER_PROF, 0, 0);
+        signal.signal(signal.SIGPROF, signal.SIG_DFL);
+        report_paths = report_paths + write_sample_reports(path_prefix);
+    profile_mode = None;
+
+    if (instrument.boundary_hook is take_memory_snapshot):
+        take_memory_snapshot('end', None);
+        instrument.set_boundary_hook(None);
+        if (tracemalloc is not None):
+            tracemalloc.stop();
+        last_tracemalloc_snapshot = None;
+
+        memory_path = path_prefix + '-memory.jsonl';
+        memory_file = open(memory_path, 'w');
+        for record in memory_snapshots:
+            memory_file.write(json.dumps(record, sort_keys=True) + '\n');
+        memory_file.close();
+        del memory_snapshots[:];
+        report_paths.append(memory_path);
+
+    return report_paths;
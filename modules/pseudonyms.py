@@ -0,0 +1,118 @@
+#!/usr/bin/python
+
+
+import hashlib; # Unkeyed (SHA-1) pseudonyms, key fingerprints.
+import hmac; # Keyed pseudonyms.
+import os; # Environment variables.
+import sqlite3; # Persistent pseudonyms table.
+
+
+# Environment variable holding anonymization key (when not given as script argument).
+KEY_ENV_VAR = 'GITRHIG_ANONYMIZE_KEY';
+
+UNKEYED_NAMESPACE = 'sha1'; # Namespace of unkeyed pseudonyms (plain SHA-1, as produced by 'sh.get_hash_str').
+
+
+# Global variables.
+
+hmac_key = None; # Anonymization key (bytes), or None for unkeyed pseudonyms.
+namespace = UNKEYED_NAMESPACE; # Pseudonyms of different keys never mix; table rows are namespaced by key fingerprint.
+
+memo = dict(); # Pseudonym of each value seen so far (by value).
+pending = list(); # New (value, pseudonym) pairs not yet written to table.
+
+table_conn = None; # Persistent pseudonyms table database.
+
+
+# Set anonymization key (from argument, else from environment; no key means unkeyed SHA-1 pseudonyms).
+def set_key(key_str):
+
+    global hmac_key;
+    global namespace;
+
+    if (not key_str):
+        key_str = os.environ.get(KEY_ENV_VAR, '');
+
+    if (key_str):
+        hmac_key = key_str.encode('utf-8') if (not isinstance(key_str, bytes)) else key_str;
+        namespace = 'hmac-sha256:' + hashlib.sha256(b'gitRHIG key fingerprint\x00' + hmac_key).hexdigest()[:16];
+    else:
+        hmac_key = None;
+        namespace = UNKEYED_NAMESPACE;
+
+    memo.clear();
+    del pending[:];
+    if (table_conn is not None):
+        load_table();
+
+
+# Check whether pseudonyms are keyed.
+def is_keyed():
+
+    return (hmac_key is not None);
+
+
+# Compute pseudonym of value (no memoization).
+def compute_pseudonym(value):
+
+    value_bytes = value.encode('utf-8', 'replace');
+
+    if (hmac_key is None):
+        return str(hashlib.sha1(value_bytes).hexdigest());
+
+    return str(hmac.new(hmac_key, value_bytes, hashlib.sha256).hexdigest());
+
+
+# Get pseudonym of value (e.g., an identity), computing it only the first time value is seen.
+def get_pseudonym(value):
+
+    pseudonym = memo.get(value);
+    if (pseudonym is None):
+        pseudonym = compute_pseudonym(value);
+        memo[value] = pseudonym;
+        if (table_conn is not None):
+            pending.append((namespace, value, pseudonym));
+
+    return pseudonym;
+
+
+# Load pseudonyms of current namespace from persistent table into memo.
+def load_table():
+
+    for (value, pseudonym) in table_conn.execute('SELECT value, pseudonym FROM pseudonyms WHERE namespace = ?;', (namespace,)):
+        memo[value] = pseudonym;
+
+
+# Open persistent pseudonyms table (creating it if needed), shared by runs and processes.
+# (NOTE: Table maps values back to their pseudonyms; protect it as the source data itself.)
+def open_table(path_to_table):
+
+    global table_conn;
+
+    table_conn = sqlite3.connect(path_to_table, timeout=60);
+    table_conn.execute('CREATE TABLE IF NOT EXISTS pseudonyms (namespace TEXT NOT NULL, value TEXT NOT NULL, pseudonym TEXT NOT NULL, PRIMARY KEY (namespace, value));');
+    table_conn.commit();
+
+    load_table();
+
+
+# Write new pseudonyms to persistent table.
+def flush_table():
+
+    if (table_conn is None or not pending):
+        return;
+
+    table_conn.executemany('INSERT OR IGNORE INTO pseudonyms (namespace, value, pseudonym) VALUES (?, ?, ?);', pending); # (Other processes may have added same values; pseudonyms are deterministic.)
+    table_conn.commit();
+    del pending[:];
+
+
+# Write new pseudonyms to and close persistent table.
+def close_table():
+
+    global table_conn;
+
+    if (table_conn is not None):
+        flush_table();
+        table_conn.close();
+        table_conn = None;
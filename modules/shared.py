@@ -2,17 +2,99 @@
 
 
 import ast;
-import chardet; # Detect string encoding.
+import collections; # Rollups of each repo (in order).
 import datetime; # Datetime handling.
-import dateutil.parser as dtparser;
 import hashlib; # Generate hash from string.
+import modules.gitcmd as gitcmd; # Git commands.
+import modules.lazy as lazy; # Heavy dependencies imported on first use.
 import os; # File, directory handling.
-import pandas; # DataFrame handling.
-import subprocess; # Git commands.
 import urlparse; # URI parsing.
 import re; # Regular expressions.
-import requests; # HTTP requests.
+import shutil; # Partitioned data store replacement.
 import sqlite3; # Database processing.
+import time; # Local timezone.
+
+# (Imported on first use, so that importing this module, e.g., to check script arguments, stays fast.)
+chardet = lazy.import_lazily('chardet'); # Detect string encoding.
+dtparser = lazy.import_lazily('dateutil.parser');
+numpy = lazy.import_lazily('numpy'); # Label lookups.
+pandas = lazy.import_lazily('pandas'); # DataFrame handling.
+requests = lazy.import_lazily('requests'); # HTTP requests.
+xlsxwriter = lazy.import_lazily('xlsxwriter'); # Streaming spreadsheet writer.
+
+
+# Commit record columns holding few distinct values (repeated across many rows); kept dictionary-encoded (categorical) in memory.
+CATEGORICAL_COLUMN_LABELS = ['repo_remote_hostname', 'repo_owner', 'repo_name',
+                             'path_in_repo',
+                             'author_name', 'author_email',
+                             'committer_name', 'committer_email'];
+
+LOAD_CHUNK_SIZE = 100000; # Number of commit records read from database at a time.
+
+# Indexes (name, table, columns) of database data store: date window, project, and label lookups.
+DATA_STORE_INDEXES = [('commits_author_epoch', 'commits', ['author_epoch']),
+                      ('commits_committer_epoch', 'commits', ['committer_epoch']),
+                      ('commits_project', 'commits', ['repo_remote_hostname', 'repo_owner', 'repo_name', 'path_in_repo']),
+                      ('commits_label_set_id', 'commits', ['label_set_id']),
+                      ('labels_label', 'labels', ['label']),
+                      ('label_sets_label_id', 'label_sets', ['label_id'])];
+
+# Time-range partitionings of Parquet data store (a directory of partitions by committer date, so that date windows
+# only read the partitions they overlap): partition key (partition directories are named '<key>=<value>'), and date
+# format of partition values.
+DATA_STORE_PARTITIONINGS = {'month' : ('committer_month', '%Y-%m'),
+                            'year' : ('committer_year', '%Y')};
+
+PARTITION_FILENAME = 'part-0.parquet'; # Commit records file of each partition.
+PARTITION_ROW_COLUMN = 'data_store_row'; # Column of partitions holding position of each commit record in data store (so that loading partitions restores data store order).
+
+# Format (xlsxwriter) of header cells of spreadsheet sheets (as written by 'pandas.DataFrame.to_excel').
+XLSX_HEADER_FORMAT = {'bold' : True,
+                      'top' : 1, 'right' : 1, 'bottom' : 1, 'left' : 1,
+                      'align' : 'center', 'valign' : 'top'};
+
+XLSX_DATETIME_FORMAT = {'num_format' : 'YYYY-MM-DD HH:MM:SS'}; # Format (xlsxwriter) of datetime cells.
+XLSX_DATE_FORMAT = {'num_format' : 'YYYY-MM-DD'}; # Format (xlsxwriter) of date cells.
+
+# Dict of each export format of DataFrames (sheets) and its file extension.
+EXPORT_FORMAT_EXTS = {'xlsx' : '.xlsx',
+                      'csv' : '.csv',
+                      'tsv' : '.tsv',
+                      'parquet' : '.parquet'};
+
+# Dict of each datetime delta and its corresponding named unit.
+DTDELTA_LABELS = {'Y' : 'total_num_years_active',
+                  'm' : 'total_num_months_active',
+                  'd' : 'total_num_days_active',
+                  'H' : 'total_num_hours_active',
+                  'M' : 'total_num_minutes_active',
+                  'S' : 'total_num_seconds_active'};
+
+# Dict of each datetime delta and strftime-like format of its time buckets (as in analyzer's 'get_dtdelta_dt_str'; also understood by SQLite).
+DTDELTA_BUCKET_FORMATS = {'Y' : '%Y',
+                          'm' : '%Y-%m',
+                          'd' : '%Y-%m-%d',
+                          'H' : '%Y-%m-%d %H:00:00',
+                          'M' : '%Y-%m-%d %H:%M:00',
+                          'S' : '%Y-%m-%d %H:%M:%S'};
+
+# Columns of per-project rollups of data store (one row per repo, with no 'path_in_repo', and one per path of each repo):
+# project ID, position in data store of first commit record and number of commit records, distinct paths (as a tuple
+# string), commit count, line sums, first and last (author or committer) epochs, distinct time buckets per datetime
+# delta (in local time), and local timezone these were computed in.
+ROLLUP_COLUMN_LABELS = (['repo_remote_hostname', 'repo_owner', 'repo_name', 'path_in_repo',
+                         'first_row', 'num_records',
+                         'paths_in_repo',
+                         'total_num_commits',
+                         'total_num_lines_changed', 'total_num_lines_inserted', 'total_num_lines_deleted', 'total_num_lines_modified',
+                         'first_epoch', 'last_epoch'] +
+                        [DTDELTA_LABELS[dtdelta_code] for dtdelta_code in ['Y', 'm', 'd', 'H', 'M', 'S']] +
+                        ['timezone']);
+
+ROLLUPS_TABLE = 'rollups'; # Rollups table of database data store.
+ROLLUPS_FILENAME = '_rollups.parquet'; # Rollups file of partitioned data store (other Parquet data stores have a '-rollups.parquet' file next to them).
+
+labels_memo = dict(); # Parsed labels tuple of each labels string (so rows with the same labels share one tuple).
 
 
 # Update basepath in URI path.
@@ -44,19 +126,9 @@ def is_url(uri):
 # Check if URL refers to a GitHub repository.
 def is_repo_url(url):
 
-    config = '-c color.ui=\'false\'';
+    (returncode, _) = gitcmd.run_git_cmd(['ls-remote', url]);
     
-    cmd_str = 'git %s ls-remote %s' % (config,url);
-    #print(cmd_str);
-
-    sp = subprocess.Popen(cmd_str,
-                          stdout=subprocess.PIPE,
-                          stderr=subprocess.STDOUT,
-                          shell=True);
-    
-    sp.communicate();
-    
-    if (sp.returncode == 0):
+    if (returncode == 0):
         return True;
     else:
         return False;
@@ -71,25 +143,13 @@ def is_local_path(uri):
         return False;
 
 
-# Check if local repository is corrupt.
+# Check if local repository is corrupt (i.e., its HEAD does not refer to any commit).
 def is_corrupt_repo(path_to_repo):
     
-    config = '-c color.ui=\'false\'';
-    gd = '--git-dir=\'' + path_to_repo + '/.git/\'';
-    wt = '--work-tree=\'' + path_to_repo + '\'';
-    
-    cmd_str = 'git %s %s %s log' % (config,gd,wt);
-    #print(cmd_str);
-    
-    sp = subprocess.Popen(cmd_str,
-                          stdout=subprocess.PIPE,
-                          stderr=subprocess.STDOUT,
-                          shell=True);
-    
-    (gitlog_str, _) = sp.communicate();
+    if (gitcmd.read_git_file(path_to_repo, 'HEAD') is None): # Not a repository at all...
+        return False;
     
-    if (gitlog_str == "fatal: bad default revision \'HEAD\'\n" or
-        gitlog_str == "fatal: your current branch \'master\' does not have any commits yet\n"):
+    if (not gitcmd.has_commits(path_to_repo)):
         return True;
     else:
         return False;
@@ -180,13 +240,13 @@ def can_overwrite_file(dest):
         return False;
 
 
-# Check if outfile is writable.
-def is_writable_file(dest):
+# Check if outfile is writable (asking before overwriting an existing outfile, unless not to prompt).
+def is_writable_file(dest, prompt=True):
     
     # Case: Destination already exists.
     if (os.path.exists(dest)):
         
-        if (not can_overwrite_file(dest)):
+        if (prompt and not can_overwrite_file(dest)):
             print("Not overwriting.");
             return False;
     
@@ -200,7 +260,7 @@ def is_writable_file(dest):
             return False;
     
     # Case: Destination is a directory.
-    if (os.path.isdir(dest) or dest.endswith('/')): # Destination is a directory (existing or not existing)...
+    if ((os.path.isdir(dest) and not is_partitioned_data_store(dest)) or dest.endswith('/')): # Destination is a directory (existing or not existing)...
         
         abspath_to_dest = os.path.abspath(dest);
         print("Not a file \'" + abspath_to_dest + "\'.");
@@ -225,23 +285,7 @@ def get_hash_str(in_str):
 # Get repo remote origin URL.
 def get_remote_origin_url(path_to_repo):
     
-    config = '-c color.ui=\'false\'';
-    gd = '--git-dir=\'' + path_to_repo + '/.git/\'';
-    wt = '--work-tree=\'' + path_to_repo + '\'';
-    
-    wd = '--word-diff';
-    
-    cmd_str = 'git %s %s %s config --get remote.origin.url' % (config,gd,wt);
-    #print(cmd_str);
-    
-    sp = subprocess.Popen(cmd_str,
-                          stdout=subprocess.PIPE,
-                          stderr=subprocess.STDOUT,
-                          shell=True);
-    
-    (remote_origin_url, _) = sp.communicate();
-    
-    remote_origin_url = remote_origin_url.strip('\n'); # Remove newline '\n'.
+    remote_origin_url = gitcmd.get_config_value(path_to_repo, 'remote.origin.url');
     
     return remote_origin_url;
 
@@ -520,18 +564,126 @@ def get_repo_urls(sources_str):
     return repo_urls;
                 
 
-# Write DataFrame to file.
+# Write float to spreadsheet cell (missing value left blank; infinities as strings, as 'pandas.DataFrame.to_excel' does).
+def write_xlsx_float(worksheet, row, col, value):
+
+    if (value != value):
+        return;
+
+    if (value in (float('inf'), float('-inf'))):
+        worksheet.write_string(row, col, str(value));
+    else:
+        worksheet.write_number(row, col, value);
+
+
+# Write value of any type to spreadsheet cell (converted as 'pandas.DataFrame.to_excel' does).
+def write_xlsx_value(worksheet, row, col, value, formats):
+
+    if (value is None or value is pandas.NaT or (isinstance(value, basestring) and value == '')):
+        return;
+
+    if (isinstance(value, (bool, numpy.bool_))):
+        worksheet.write_boolean(row, col, bool(value));
+    elif (isinstance(value, (int, long, numpy.integer))):
+        worksheet.write_number(row, col, int(value));
+    elif (isinstance(value, (float, numpy.floating))):
+        write_xlsx_float(worksheet, row, col, float(value));
+    elif (isinstance(value, datetime.datetime)):
+        worksheet.write_datetime(row, col, value, formats['datetime']);
+    elif (isinstance(value, datetime.date)):
+        worksheet.write_datetime(row, col, value, formats['date']);
+    else:
+        worksheet.write_string(row, col, value if (isinstance(value, basestring)) else str(value));
+
+
+# Get cell values of DataFrame column and function writing each of them to spreadsheet cell (picked once per column by dtype).
+def get_xlsx_column_writer(worksheet, column, formats):
+
+    if (pandas.api.types.is_bool_dtype(column.dtype)):
+        return column.tolist(), worksheet.write_boolean;
+
+    if (pandas.api.types.is_integer_dtype(column.dtype)):
+        return column.tolist(), worksheet.write_number;
+
+    if (pandas.api.types.is_float_dtype(column.dtype)):
+        return column.tolist(), lambda row, col, value: write_xlsx_float(worksheet, row, col, value);
+
+    return column.astype(object).tolist(), lambda row, col, value: write_xlsx_value(worksheet, row, col, value, formats);
+
+
+# Write DataFrames (list of (df, sheet name, index) tuples) to spreadsheet file, row by row in streaming (constant memory) mode.
 def write_dfs_to_file(dfs, destination):
     
-    df_writer = pandas.ExcelWriter(destination, engine='xlsxwriter');
+    workbook = xlsxwriter.Workbook(destination, {'constant_memory' : True});
+    formats = {'header' : workbook.add_format(XLSX_HEADER_FORMAT),
+               'datetime' : workbook.add_format(XLSX_DATETIME_FORMAT),
+               'date' : workbook.add_format(XLSX_DATE_FORMAT)};
 
     num_dfs = len(dfs);
     for i in range(0, num_dfs):
 
         (df, sheet_name, index) = dfs[i];
-        df.to_excel(df_writer, sheet_name, index=index);
+        if (index):
+            df = df.reset_index();
+        
+        worksheet = workbook.add_worksheet(sheet_name);
+        
+        num_columns = len(df.columns);
+        column_writers = list();
+        for j in range(0, num_columns):
+            
+            worksheet.write(0, j, df.columns[j], formats['header']);
+            column_writers.append(get_xlsx_column_writer(worksheet, df.iloc[:, j], formats));
+
+        num_rows = len(df.index);
+        for k in range(0, num_rows): # (Rows must be written in order; each finished row is flushed to disk.)
+            for j in range(0, num_columns):
+                (values, write_cell) = column_writers[j];
+                write_cell(k + 1, j, values[k]);
     
-    df_writer.save();
+    workbook.close();
+
+
+# Get copy of DataFrame holding only scalar values (values of other types, e.g., tuples, as strings, as in spreadsheet files).
+def get_flat_df(df):
+
+    df = df.infer_objects();
+    for column_label in df.columns:
+        if (df[column_label].dtype == object):
+            df[column_label] = [value if (value is None or isinstance(value, basestring)) else (None if (isinstance(value, float) and value != value) else str(value)) for value in df[column_label].tolist()];
+
+    return df;
+
+
+# Get path of file holding one sheet (DataFrame), given base path (without extension) and export format.
+def get_sheet_file_path(pathstr, sheet_name, export_format):
+
+    return pathstr + '-' + sheet_name + EXPORT_FORMAT_EXTS[export_format];
+
+
+# Export DataFrames (list of (df, sheet name, index) tuples) as one spreadsheet file, or as one delimited text/Parquet file per sheet; get paths of written files.
+def export_dfs(dfs, pathstr, export_format):
+
+    if (export_format == 'xlsx'):
+        destination = pathstr + EXPORT_FORMAT_EXTS[export_format];
+        write_dfs_to_file(dfs, destination);
+        return [destination];
+
+    destinations = list();
+    
+    num_dfs = len(dfs);
+    for i in range(0, num_dfs):
+
+        (df, sheet_name, index) = dfs[i];
+        destination = get_sheet_file_path(pathstr, sheet_name, export_format);
+        df = get_flat_df(df.reset_index() if (index) else df);
+        if (export_format == 'parquet'):
+            df.to_parquet(destination, index=False);
+        else:
+            df.to_csv(destination, sep=('\t' if (export_format == 'tsv') else ','), index=False, encoding='utf-8');
+        destinations.append(destination);
+
+    return destinations;
 
 
 # Get data store DataFrame.
@@ -563,7 +715,7 @@ def load_commits_data_store(data_store):
         return None;
 
 
-# Load data store from spreadsheet file.
+# Load per-file data store (spreadsheet file, Parquet file, or database).
 def load_repo_files_data_store(data_store):
     
     COLUMN_LABELS = ['repo_owner', 'repo_name',
@@ -576,34 +728,452 @@ def load_repo_files_data_store(data_store):
     
     try:
         
-        ds_xlsx = pandas.ExcelFile(data_store); # Load spreadsheet file.
-        ds_df = ds_xlsx.parse(); # Import spreadsheet file to DataFrame.
+        if (data_store.endswith('.parquet')):
+            
+            ds_df = pandas.read_parquet(data_store, engine='pyarrow');
+            ds_df['labels'] = ds_df['labels'].map(parse_labels_str);
+            
+        elif (data_store.endswith('.db')):
+            
+            db_conn = sqlite3.connect(data_store);
+            ds_df = pandas.read_sql_query('SELECT commit_files.*, filenames.filename FROM commit_files JOIN filenames USING (filename_id) ORDER BY commit_files.rowid;', db_conn);
+            db_conn.close();
+            ds_df['filename'] = ds_df['filename'].astype('category');
+            ds_df['labels'] = ds_df['labels'].map(parse_labels_str);
+            
+        else: # Consider this as a spreadshet file...
+            
+            ds_xlsx = pandas.ExcelFile(data_store); # Load spreadsheet file.
+            ds_df = ds_xlsx.parse(); # Import spreadsheet file to DataFrame.
         
         for column_label in COLUMN_LABELS:
             
             if (column_label not in ds_df.columns):
                 return None;
             
-        return ds_df;
+        return ds_df[COLUMN_LABELS];
     
     except:
         return None;
 
 
-# Export data store DataFrame to object on disk.
-def push_to_data_store(df, sheet_name, index, destination, db_conn):
+# Export per-file data store DataFrame to object on disk (with file paths dictionary-encoded, other than in spreadsheets).
+def push_to_files_data_store(df, destination):
+    
+    if (destination.endswith('.parquet')): # Columnar file; categorical column is written as a Parquet dictionary column...
+        
+        df = df.copy();
+        df['labels'] = df['labels'].astype('str'); # Because Parquet does not support tuples.
+        df['filename'] = df['filename'].astype('category');
+        df.to_parquet(destination, engine='pyarrow', index=False, row_group_size=LOAD_CHUNK_SIZE); # (Bounded row groups, so file can be read chunk by chunk.)
+        
+    elif (destination.endswith('.db')): # File paths go to their own table, referenced by id...
+        
+        (filename_ids, filenames) = pandas.factorize(df['filename']);
+        
+        filenames_df = pandas.DataFrame({'filename_id': range(0, len(filenames)), 'filename': filenames},
+                                        columns=['filename_id', 'filename']);
+        files_df = df.drop('filename', axis=1);
+        files_df.insert(list(df.columns).index('filename'), 'filename_id', filename_ids);
+        files_df['labels'] = files_df['labels'].astype('str'); # Because sqlite3 does not support tuples.
+        
+        db_conn = sqlite3.connect(destination);
+        filenames_df.to_sql('filenames', db_conn, if_exists='replace', index=False);
+        files_df.to_sql('commit_files', db_conn, if_exists='replace', index=False);
+        db_conn.close();
+        
+    else: # Consider this as a spreadshet file...
+        write_dfs_to_file([(df, 'files', False)], destination);
+
+
+# Parse labels string (e.g., "('a', 'b')") into tuple, parsing each distinct string only once.
+def parse_labels_str(labels_str):
+    
+    labels = labels_memo.get(labels_str);
+    if (labels is None):
+        labels = ast.literal_eval(labels_str);
+        labels_memo[labels_str] = labels;
+    
+    return labels;
+
+
+# Dictionary-encode (in place) commit record columns with repeated values.
+def categorize_commits_df(df):
+    
+    for column_label in CATEGORICAL_COLUMN_LABELS:
+        if (column_label in df.columns and not pandas.api.types.is_categorical_dtype(df[column_label])):
+            df[column_label] = df[column_label].astype('category');
+    
+    return df;
+
+
+# Concatenate commit records DataFrames, keeping columns dictionary-encoded (by first unifying their categories).
+def concat_commits_dfs(dfs):
+    
+    dfs = [categorize_commits_df(df) for df in dfs if (not df.empty)];
+    if (not dfs):
+        return pandas.DataFrame();
+    
+    for column_label in CATEGORICAL_COLUMN_LABELS:
+        if (all(column_label in df.columns for df in dfs)):
+            categories = dfs[0][column_label].cat.categories.append([df[column_label].cat.categories for df in dfs[1:]]).unique();
+            for df in dfs:
+                df[column_label] = df[column_label].cat.set_categories(categories);
+    
+    return pandas.concat(dfs, ignore_index=True);
+
+
+# Export data store DataFrame to object on disk (a Parquet data store is partitioned by committer date, if partitioning is given).
+def push_to_data_store(df, sheet_name, index, destination, db_conn, partitioning=None):
 
     if (destination.endswith('.xlsx')): # Consider this as a spreadshet file...
         write_dfs_to_file([(df, sheet_name, index)], destination);
-    elif (destination.endswith('.db')):
+    elif (destination.endswith('.db')): # Labels go to their own tables (sqlite3 does not support tuples); commit records reference their label set by id...
         db_conn = sqlite3.connect(destination);
-        df['labels']= df['labels'].astype('str'); # Because sqlite3 does not support tuples.
+        labels = df['labels'];
+        labels_position = list(df.columns).index('labels');
+        (label_set_ids, label_sets) = pandas.factorize(labels); # (Distinct labels tuples.)
+        (labels_df, label_sets_df) = get_label_set_dfs(label_sets);
+        del df['labels'];
+        df.insert(labels_position, 'label_set_id', label_set_ids);
         df.to_sql('commits', db_conn, if_exists='replace', index=False);
+        labels_df.to_sql('labels', db_conn, if_exists='replace', index=False);
+        label_sets_df.to_sql('label_sets', db_conn, if_exists='replace', index=False);
+        create_data_store_indexes(db_conn); # (Replacing tables drops their indexes.)
+        del df['label_set_id'];
+        df.insert(labels_position, 'labels', labels);
+        db_conn.close();
+    elif (destination.endswith('.parquet')): # Columnar file; categorical columns are written as Parquet dictionary columns...
+        labels = df['labels'];
+        df['labels'] = labels.astype('str'); # Because Parquet does not support tuples.
+        if (partitioning):
+            push_to_partitioned_data_store(df, destination, partitioning);
+        else:
+            df.to_parquet(destination, engine='pyarrow', index=False, row_group_size=LOAD_CHUNK_SIZE); # (Bounded row groups, so file can be read chunk by chunk.)
+        df['labels'] = labels;
+
+
+
+# Check whether data store is a partitioned (Parquet) data store, i.e., a directory of partitions.
+def is_partitioned_data_store(data_store):
+    
+    return (data_store.endswith('.parquet') and os.path.isdir(data_store));
+
+
+# Get partitioning ('month' or 'year') of partitioned data store (None if it has no partitions).
+def get_data_store_partitioning(data_store):
+    
+    for partition_dir_name in sorted(os.listdir(data_store)):
+        for (partitioning, (partition_key, _)) in DATA_STORE_PARTITIONINGS.items():
+            if (partition_dir_name.startswith(partition_key + '=')):
+                return partitioning;
+    
+    return None;
+
+
+# Get first and last committer epochs covered by partition (None if not a partition directory name).
+def get_partition_epoch_range(partition_dir_name):
+    
+    for (partition_key, dt_format) in DATA_STORE_PARTITIONINGS.values():
+        
+        if (partition_dir_name.startswith(partition_key + '=')):
+            
+            try:
+                begin_dt = datetime.datetime.strptime(partition_dir_name[len(partition_key)+1:], dt_format);
+            except ValueError:
+                return None;
+            
+            if (dt_format == '%Y'):
+                end_dt = begin_dt.replace(year=begin_dt.year+1);
+            else:
+                end_dt = (begin_dt + datetime.timedelta(days=32)).replace(day=1); # (First day of next month.)
+            
+            epoch_dt = datetime.datetime(1970,1,1);
+            return (begin_dt - epoch_dt).total_seconds(), (end_dt - epoch_dt).total_seconds() - 1;
+    
+    return None;
+
+
+# Get Parquet files of data store: data store itself, or files of its partitions overlapping 'since'/'until' epochs (in partition order).
+def get_data_store_parquet_files(source, since_epoch=None, until_epoch=None):
+    
+    if (not os.path.isdir(source)):
+        return [source];
+    
+    parquet_paths = list();
+    for partition_dir_name in sorted(os.listdir(source)):
+        
+        epoch_range = get_partition_epoch_range(partition_dir_name);
+        if (epoch_range is None): # Not a partition...
+            continue;
+        
+        if ((since_epoch is not None and epoch_range[1] < since_epoch) or (until_epoch is not None and epoch_range[0] > until_epoch)): # Whole partition is outside window...
+            continue;
+        
+        parquet_path = os.path.join(source, partition_dir_name, PARTITION_FILENAME);
+        if (os.path.isfile(parquet_path)):
+            parquet_paths.append(parquet_path);
+    
+    return parquet_paths;
+
+
+# Check whether row group of Parquet file may hold commit records with author and committer dates within epochs (by its min/max statistics, if written).
+def is_row_group_in_window(parquet_metadata, row_group_index, since_epoch, until_epoch):
+    
+    row_group = parquet_metadata.row_group(row_group_index);
+    for i in range(0, row_group.num_columns):
+        
+        column = row_group.column(i);
+        if (column.path_in_schema not in ['author_epoch', 'committer_epoch'] or not column.is_stats_set or not column.statistics.has_min_max):
+            continue;
+        
+        if ((since_epoch is not None and column.statistics.max < since_epoch) or (until_epoch is not None and column.statistics.min > until_epoch)):
+            return False;
+    
+    return True;
+
+
+# Export data store DataFrame to partitioned (Parquet) data store, partitioned by committer month or year; each partition
+# holds its commit records in data store order. (Partitions are written to a new directory, which then replaces data store.)
+def push_to_partitioned_data_store(df, destination, partitioning):
+    
+    import pyarrow.parquet; # Parquet file handling (partition by partition).
+    (partition_key, dt_format) = DATA_STORE_PARTITIONINGS[partitioning];
+    partition_values = pandas.to_datetime(df['committer_epoch'], unit='s').dt.strftime(dt_format).values;
+    
+    tmp_destination = destination + '.tmp-' + str(os.getpid());
+    os.makedirs(tmp_destination);
+    df[PARTITION_ROW_COLUMN] = numpy.arange(0, len(df.index));
+    for (partition_value, partition_df) in df.groupby(partition_values, sort=True):
+        path_to_partition = os.path.join(tmp_destination, partition_key + '=' + partition_value);
+        os.makedirs(path_to_partition);
+        partition_table = pyarrow.Table.from_pandas(partition_df, preserve_index=False); # (Column names may mix byte and unicode strings, which 'pandas.DataFrame.to_parquet' rejects.)
+        pyarrow.parquet.write_table(partition_table, os.path.join(path_to_partition, PARTITION_FILENAME), row_group_size=LOAD_CHUNK_SIZE);
+    del df[PARTITION_ROW_COLUMN];
+    
+    if (os.path.isdir(destination)):
+        old_destination = destination + '.old-' + str(os.getpid());
+        os.rename(destination, old_destination);
+        os.rename(tmp_destination, destination);
+        shutil.rmtree(old_destination);
+    else:
+        if (os.path.exists(destination)): # (Unpartitioned data store, whose commit records are in DataFrame.)
+            os.remove(destination);
+        os.rename(tmp_destination, destination);
+
+    
+# Get names of columns of database table (none if no such table).
+def get_table_columns(db_conn, table_name):
+    
+    return [row[1] for row in db_conn.execute('PRAGMA table_info(' + table_name + ');')];
+
+
+# Create (missing) indexes of database data store (of tables and columns it has).
+def create_data_store_indexes(db_conn):
+    
+    table_columns = dict();
+    for (index_name, table_name, column_labels) in DATA_STORE_INDEXES:
+        if (table_name not in table_columns):
+            table_columns[table_name] = get_table_columns(db_conn, table_name);
+        if (all([(column_label in table_columns[table_name]) for column_label in column_labels])):
+            db_conn.execute('CREATE INDEX IF NOT EXISTS ' + index_name + ' ON ' + table_name + ' (' + ', '.join(column_labels) + ');');
+    db_conn.commit();
+
+
+# Update database data store in place with commit records of some projects (list of (repo hostname, owner, name, path
+# in repo, commit hashes) tuples): commit records of each project are deleted (all of them, or only those of its commit
+# hashes, if given), then commit records are appended (along with any new labels and label sets); other commit records
+# are left alone. (A data store without commits table is written whole.)
+def update_data_store_db(df, destination, projects):
+    
+    db_conn = sqlite3.connect(destination);
+    
+    if (not get_table_columns(db_conn, 'commits')): # New data store...
+        db_conn.close();
+        push_to_data_store(df, 'commits', False, destination, None);
+        return;
+    
+    try:
+        
+        PROJECT_SQL = 'repo_remote_hostname = ? AND repo_owner = ? AND repo_name = ? AND path_in_repo = ?';
+        for (hostname, owner, name, path, commit_hashes) in projects:
+            if (commit_hashes is None):
+                db_conn.execute('DELETE FROM commits WHERE ' + PROJECT_SQL + ';', (hostname, owner, name, path));
+            else:
+                db_conn.executemany('DELETE FROM commits WHERE ' + PROJECT_SQL + ' AND commit_hash = ?;', [(hostname, owner, name, path, commit_hash) for commit_hash in commit_hashes]);
+        
+        # Label set ids of labels tuples (new ones are added to label tables).
+        label_set_ids = dict([(label_set, label_set_id) for (label_set_id, label_set) in get_label_sets(db_conn).items()]);
+        label_ids = dict([(label.encode('utf-8'), int(label_id)) for (label_id, label) in db_conn.execute('SELECT label_id, label FROM labels;')]); # (Label tables written without rows have text columns.)
+        next_label_id = max(label_ids.values()) + 1 if (label_ids) else 0;
+        next_label_set_id = max([db_conn.execute('SELECT MAX(CAST(label_set_id AS INTEGER)) FROM ' + table_name + ';').fetchone()[0] for table_name in ['label_sets', 'commits']] + [-1]) + 1; # (Label sets without labels are only in commits table.)
+        labels = df['labels'];
+        for label_set in pandas.unique(labels):
+            if (isinstance(label_set, basestring)): # (Labels string, e.g., as loaded from spreadsheet file.)
+                label_set = parse_labels_str(label_set);
+            if (label_set in label_set_ids):
+                continue;
+            for (position, label) in enumerate(label_set):
+                if (label not in label_ids):
+                    label_ids[label] = next_label_id;
+                    next_label_id = next_label_id + 1;
+                    db_conn.execute('INSERT INTO labels (label_id, label) VALUES (?, ?);', (label_ids[label], label if (isinstance(label, unicode)) else label.decode('utf-8', 'replace')));
+                db_conn.execute('INSERT INTO label_sets (label_set_id, position, label_id) VALUES (?, ?, ?);', (next_label_set_id, position, label_ids[label]));
+            label_set_ids[label_set] = next_label_set_id;
+            next_label_set_id = next_label_set_id + 1;
+        
+        labels_position = list(df.columns).index('labels');
+        del df['labels'];
+        df.insert(labels_position, 'label_set_id', [label_set_ids[parse_labels_str(label_set) if (isinstance(label_set, basestring)) else label_set] for label_set in labels]);
+        df.to_sql('commits', db_conn, if_exists='append', index=False); # (Appended after existing commit records.)
+        del df['label_set_id'];
+        df.insert(labels_position, 'labels', labels);
+        
+        db_conn.commit();
+    
+    finally:
         db_conn.close();
 
+
+# Get commit records of some repos (list of repo IDs, i.e., hostname, owner and name; all repos if None) of database
+# data store, with columns rolled up (see 'get_rollup'), indexed by their positions in data store (in data store order).
+def load_data_store_repos(source, repo_ids=None):
+    
+    COLUMN_LABELS = ['repo_remote_hostname', 'repo_owner', 'repo_name',
+                     'path_in_repo',
+                     'commit_hash',
+                     'author_epoch', 'committer_epoch',
+                     'num_lines_changed', 'num_lines_inserted', 'num_lines_deleted', 'num_lines_modified'];
+    
+    query = 'SELECT rowid - 1 AS data_store_row, ' + ', '.join(COLUMN_LABELS) + ' FROM commits';
+    
+    db_conn = sqlite3.connect(source);
+    if (repo_ids is None):
+        repos_df = pandas.read_sql_query(query + ' ORDER BY rowid;', db_conn);
+    else:
+        repo_dfs = [pandas.read_sql_query(query + ' WHERE repo_remote_hostname = ? AND repo_owner = ? AND repo_name = ? ORDER BY rowid;', db_conn, params=list(repo_id)) for repo_id in repo_ids];
+        repos_df = pandas.concat(repo_dfs) if (repo_dfs) else pandas.DataFrame(columns=['data_store_row'] + COLUMN_LABELS);
+    db_conn.close();
+    
+    return repos_df.set_index('data_store_row');
+
+
+# Get side tables of distinct labels tuples ("label sets"): labels (label_id, label), and labels of each label set (label_set_id, position, label_id).
+def get_label_set_dfs(label_sets):
+    
+    label_ids = dict();
+    labels_rows = list();
+    label_sets_rows = list();
+    
+    for (label_set_id, label_set) in enumerate(label_sets):
+        
+        if (isinstance(label_set, basestring)): # (Labels string, e.g., as loaded from spreadsheet file.)
+            label_set = parse_labels_str(label_set);
+        
+        for (position, label) in enumerate(label_set):
+            if (label not in label_ids):
+                label_ids[label] = len(label_ids);
+                labels_rows.append([label_ids[label], label if (isinstance(label, unicode)) else label.decode('utf-8', 'replace')]);
+            label_sets_rows.append([label_set_id, position, label_ids[label]]);
+    
+    labels_df = pandas.DataFrame(labels_rows, columns=['label_id', 'label']);
+    label_sets_df = pandas.DataFrame(label_sets_rows, columns=['label_set_id', 'position', 'label_id']);
+    
+    return labels_df, label_sets_df;
+
+
+# Get labels tuple of each label set (by label set id) of database data store.
+def get_label_sets(db_conn):
+    
+    label_sets = dict();
+    
+    for (label_set_id, label) in db_conn.execute('SELECT label_set_id, label FROM label_sets JOIN labels USING (label_id) ORDER BY label_set_id, position;'):
+        label_set_id = int(label_set_id); # (Label tables written without rows have text columns.)
+        label_sets[label_set_id] = label_sets.get(label_set_id, tuple()) + (label.encode('utf-8'),);
+    
+    return label_sets;
+
+
+# Get labels column (tuples) from label set ids column (looking up each distinct label set once; label sets without labels are empty).
+def get_labels_column(label_set_ids, label_sets):
+    
+    (codes, distinct_label_set_ids) = pandas.factorize(label_set_ids);
+    
+    distinct_labels = numpy.empty(len(distinct_label_set_ids), dtype=object);
+    for (i, label_set_id) in enumerate(distinct_label_set_ids):
+        distinct_labels[i] = label_sets.get(label_set_id, tuple());
     
+    return distinct_labels[codes];
+
+
+# Get mask of commit records labelled with ANY of some labels (testing each distinct labels tuple once).
+def get_labels_mask(labels_column, labels):
+    
+    (codes, distinct_labels) = pandas.factorize(labels_column);
+    
+    is_labelled = numpy.array([any([(label in commit_labels) for label in labels]) for commit_labels in distinct_labels] + [False], dtype=bool); # (Last for missing labels.)
+    
+    return is_labelled[codes];
+
+
+# Check whether commit record (labels string) is labelled with ANY of some labels.
+# (For database data stores from before labels had their own tables.)
+def has_any_label(labels_str, labels):
+    
+    if (labels_str is None):
+        return False;
+    
+    commit_labels = parse_labels_str(labels_str);
+    
+    return any([(label in commit_labels) for label in labels]);
+
+
+# Connect to database data store, indexing it (if possible) and defining SQL function 'has_any_label(labels)' for some labels.
+def connect_data_store_db(source, labels):
+    
+    db_conn = sqlite3.connect(source);
+    
+    try:
+        create_data_store_indexes(db_conn);
+    except sqlite3.Error: # (E.g., read-only data store; queries work as well, only slower.)
+        pass;
+    
+    db_conn.create_function('has_any_label', 1, lambda labels_str: has_any_label(labels_str, labels));
+    
+    return db_conn;
+
+
+# Get SQL condition (and its parameters) selecting commit records whose author and committer dates are within epochs, and labelled with ANY of labels (if any).
+# (NOTE: For data stores without label tables, label condition uses SQL function defined by 'connect_data_store_db'.)
+def get_commits_filter_sql(db_conn, since_epoch, until_epoch, labels):
+    
+    conditions = list();
+    params = list();
+    
+    if (since_epoch is not None):
+        conditions = conditions + ['author_epoch >= ?', 'committer_epoch >= ?'];
+        params = params + [since_epoch, since_epoch];
+    
+    if (until_epoch is not None):
+        conditions = conditions + ['author_epoch <= ?', 'committer_epoch <= ?'];
+        params = params + [until_epoch, until_epoch];
+    
+    if (labels):
+        if ('label_set_id' in get_table_columns(db_conn, 'commits')):
+            conditions.append('label_set_id IN (SELECT label_set_id FROM label_sets JOIN labels USING (label_id) WHERE label IN (' + ', '.join(['?'] * len(labels)) + '))');
+            params = params + [label if (isinstance(label, unicode)) else label.decode('utf-8', 'replace') for label in labels];
+        else:
+            conditions.append('has_any_label(labels)');
+    
+    filter_sql = ' AND '.join(conditions) if (conditions) else '1';
+    
+    return filter_sql, params;
+
+
 # Get data store DataFrame from data store object on disk.
-def load_from_data_store(source):
+# (Database data stores only return commit records within 'since'/'until' epochs and labelled with ANY of labels, if given;
+# Parquet data stores skip partitions and row groups wholly outside epochs; other data stores return all.)
+def load_from_data_store(source, since_epoch=None, until_epoch=None, labels=None):
 
     COLUMN_LABELS = ['repo_remote_hostname', 'repo_owner', 'repo_name',
                      'path_in_repo',
@@ -623,14 +1193,21 @@ def load_from_data_store(source):
         
             xlsx = pandas.ExcelFile(source); # Load spreadsheet file.
             ds_df = xlsx.parse(); # Import data store to DataFrame.
+            ds_df = categorize_commits_df(ds_df);
             
         elif (source.endswith('.db')):
             
-            db_conn = sqlite3.connect(source);
-            ds_df = pandas.read_sql_query('SELECT * FROM commits;', db_conn);
-            ds_df['labels'] = ds_df['labels'].apply(lambda l: ast.literal_eval(l));
+            ds_dfs = list(iter_data_store_chunks(source, LOAD_CHUNK_SIZE, since_epoch, until_epoch, labels)); # (Encode chunk by chunk, to keep memory low.)
+            ds_df = concat_commits_dfs(ds_dfs) if (len(ds_dfs) > 1) else ds_dfs[0]; # (Single chunk may be empty, yet have columns.)
             #print ds_df
             #print ds_df['labels'];
+            
+        elif (source.endswith('.parquet')):
+            
+            ds_dfs = list(iter_parquet_data_store_chunks(source, LOAD_CHUNK_SIZE, since_epoch, until_epoch));
+            ds_df = concat_commits_dfs(ds_dfs) if (len(ds_dfs) > 1) else ds_dfs[0];
+            if (PARTITION_ROW_COLUMN in ds_df.columns): # Partitioned data store...
+                ds_df = ds_df.sort_values(by=PARTITION_ROW_COLUMN).drop(PARTITION_ROW_COLUMN, axis=1).reset_index(drop=True);
         
         for column_label in COLUMN_LABELS: # Ensure each column name in DataFrame is what is expected in commits data store...
             
@@ -644,6 +1221,249 @@ def load_from_data_store(source):
         return ds_df;
 
 
+# Get data store commit records chunk by chunk (DataFrames of at most 'chunk_size' records), without loading whole data store.
+# (Database and Parquet data stores only return commit records as 'load_from_data_store' does; there is always at least one chunk.)
+# (NOTE: Partitioned data stores are streamed partition by partition; their chunks also hold the position of each commit record in data store.)
+# (NOTE: Spreadsheet files cannot be read partially; they are loaded whole, then chunked.)
+def iter_data_store_chunks(source, chunk_size, since_epoch=None, until_epoch=None, labels=None):
+
+    if (source.endswith('.xlsx')): # Consider this as a spreadshet file...
+        
+        xlsx = pandas.ExcelFile(source);
+        ds_df = xlsx.parse();
+        for i in range(0, ds_df.shape[0], chunk_size):
+            yield categorize_commits_df(ds_df.iloc[i:i+chunk_size].reset_index(drop=True));
+    
+    elif (source.endswith('.db')):
+        
+        db_conn = connect_data_store_db(source, labels);
+        try:
+            (filter_sql, params) = get_commits_filter_sql(db_conn, since_epoch, until_epoch, labels);
+            label_sets = get_label_sets(db_conn) if ('label_set_id' in get_table_columns(db_conn, 'commits')) else None;
+            query = 'SELECT * FROM commits WHERE ' + filter_sql + ' ORDER BY rowid;'; # (Keep data store order, whichever index is used.)
+            num_chunks = 0;
+            for chunk_df in pandas.read_sql_query(query, db_conn, params=params, chunksize=chunk_size):
+                if (label_sets is not None): # Labels from label tables...
+                    labels_position = list(chunk_df.columns).index('label_set_id');
+                    labels_column = get_labels_column(chunk_df.pop('label_set_id'), label_sets);
+                    chunk_df.insert(labels_position, 'labels', labels_column);
+                else: # Labels strings (from before labels had their own tables)...
+                    chunk_df['labels'] = chunk_df['labels'].map(parse_labels_str);
+                num_chunks = num_chunks + 1;
+                yield categorize_commits_df(chunk_df);
+            if (num_chunks == 0): # No commit records selected...
+                chunk_df = pandas.read_sql_query('SELECT * FROM commits LIMIT 0;', db_conn);
+                yield chunk_df.rename(columns={'label_set_id' : 'labels'});
+        finally:
+            db_conn.close();
+    
+    elif (source.endswith('.parquet')):
+        
+        for chunk_df in iter_parquet_data_store_chunks(source, chunk_size, since_epoch, until_epoch):
+            yield chunk_df;
+
+
+# Get Parquet data store commit records chunk by chunk, skipping partitions and row groups wholly outside epochs (there is
+# always at least one chunk, if data store has any Parquet file).
+# (NOTE: Chunks of partitioned data store also hold position of each commit record in data store.)
+def iter_parquet_data_store_chunks(source, chunk_size, since_epoch=None, until_epoch=None):
+    
+    import pyarrow.parquet; # Parquet file handling (row group by row group).
+    parquet_paths = get_data_store_parquet_files(source, since_epoch, until_epoch);
+    num_chunks = 0;
+    for parquet_path in parquet_paths:
+        parquet_file = pyarrow.parquet.ParquetFile(parquet_path);
+        for i in range(0, parquet_file.num_row_groups):
+            if (not is_row_group_in_window(parquet_file.metadata, i, since_epoch, until_epoch)): # No commit records within epochs...
+                continue;
+            table = parquet_file.read_row_group(i);
+            for j in range(0, table.num_rows, chunk_size):
+                chunk_df = table.slice(j, chunk_size).to_pandas();
+                chunk_df['labels'] = chunk_df['labels'].map(parse_labels_str);
+                num_chunks = num_chunks + 1;
+                yield categorize_commits_df(chunk_df);
+    if (num_chunks == 0): # No commit records selected (columns are those of any Parquet file of data store)...
+        parquet_paths = get_data_store_parquet_files(source);
+        if (parquet_paths):
+            parquet_file = pyarrow.parquet.ParquetFile(parquet_paths[0]);
+            if (parquet_file.num_row_groups > 0):
+                yield categorize_commits_df(parquet_file.read_row_group(0).slice(0, 0).to_pandas());
+            else:
+                yield pandas.DataFrame(columns=parquet_file.schema.names);
+
+
+# Get local timezone (as rollups record it; time buckets of rollups only hold in the timezone they were computed in).
+def get_local_timezone_str():
+    
+    return ','.join(time.tzname) + ',' + str(time.timezone) + ',' + str(time.altzone);
+
+
+# Get rollup (dict) of commit records of a project: repo (no 'path_in_repo') or path of repo (as 'ROLLUP_COLUMN_LABELS').
+def get_rollup(records_df, first_row, path_in_repo):
+    
+    epochs = set(records_df['author_epoch'].tolist() + records_df['committer_epoch'].tolist());
+    dts = [datetime.datetime.fromtimestamp(float(epoch)) for epoch in epochs];
+    
+    paths_in_repo = list();
+    for path in records_df['path_in_repo'].unique(): # (In order of appearance.)
+        paths_in_repo.append(str(path));
+    
+    rollup = {'path_in_repo' : decode_str(path_in_repo) if (isinstance(path_in_repo, str)) else path_in_repo, # (As loaded rollups hold them.)
+              'first_row' : first_row,
+              'num_records' : len(records_df.index),
+              'paths_in_repo' : str(tuple(paths_in_repo)),
+              'total_num_commits' : len(set(records_df['commit_hash'].tolist())),
+              'first_epoch' : min(epochs),
+              'last_epoch' : max(epochs),
+              'timezone' : get_local_timezone_str()};
+    for column_label in ['repo_remote_hostname', 'repo_owner', 'repo_name']:
+        value = records_df[column_label].iat[0];
+        rollup[column_label] = decode_str(value) if (isinstance(value, str)) else value;
+    for column_label in ['num_lines_changed', 'num_lines_inserted', 'num_lines_deleted', 'num_lines_modified']:
+        rollup['total_' + column_label] = records_df[column_label].sum(skipna=False); # (A missing line count makes sum missing.)
+    for (dtdelta_code, dtdelta_label) in DTDELTA_LABELS.items():
+        rollup[dtdelta_label] = len(set([dt.strftime(DTDELTA_BUCKET_FORMATS[dtdelta_code]) for dt in dts]));
+    
+    return rollup;
+
+
+# Get rollups (list) of repo commit records: repo rollup, then rollup of each of its paths (positions in data store of
+# commit records are those of DataFrame index).
+def get_repo_rollups(repo_df):
+    
+    rollups = [get_rollup(repo_df, repo_df.index[0], None)];
+    for (path, path_rows) in repo_df.groupby('path_in_repo', sort=False, observed=True).indices.items():
+        rollups.append(get_rollup(repo_df.iloc[path_rows], repo_df.index[path_rows[0]], path));
+    
+    return rollups;
+
+
+# Get rollups DataFrame from rollups (list), in data store order.
+def get_rollups_df(rollups):
+    
+    rollups_df = pandas.DataFrame(rollups, columns=ROLLUP_COLUMN_LABELS);
+    rollups_df = rollups_df.sort_values(by='first_row', kind='mergesort').reset_index(drop=True); # (Stable, so that each repo stays before its first path.)
+    
+    return rollups_df;
+
+
+# Update per-project rollups of (whole) data store DataFrame: only repos with new commit records (list of repo IDs,
+# i.e., hostname, owner and name) are rolled up again, along with any repo not rolled up yet; other repos keep their
+# rollups (with positions of their first commit records brought up to date). (With no rollups yet, every repo is rolled up.)
+def update_rollups(rollups_df, ds_df, repo_ids):
+    
+    REPO_ID = ['repo_remote_hostname', 'repo_owner', 'repo_name'];
+    
+    repo_rows = ds_df.groupby(REPO_ID, sort=False, observed=True).indices; # Row positions of each repo.
+    repo_ids = set([tuple(repo_id) for repo_id in repo_ids]);
+    
+    rollups = list();
+    kept_repo_ids = set();
+    if (rollups_df is not None and not rollups_df.empty):
+        project_rows = ds_df.groupby(REPO_ID + ['path_in_repo'], sort=False, observed=True).indices; # Row positions of each path of each repo.
+        repo_rollups = collections.OrderedDict();
+        for rollup in rollups_df.to_dict('records'):
+            repo_id = tuple([rollup[column_label] for column_label in REPO_ID]);
+            repo_rollups[repo_id] = repo_rollups.get(repo_id, list()) + [rollup];
+        for (repo_id, kept_rollups) in repo_rollups.items():
+            if (repo_id not in repo_rows or repo_id in repo_ids): # (Repos gone from data store are dropped.)
+                continue;
+            project_ids = [repo_id + (rollup['path_in_repo'],) for rollup in kept_rollups if (rollup['path_in_repo'] is not None)];
+            if (not all([(project_id in project_rows) for project_id in project_ids])): # (Rolled up again.)
+                continue;
+            for rollup in kept_rollups:
+                rows = repo_rows[repo_id] if (rollup['path_in_repo'] is None) else project_rows[repo_id + (rollup['path_in_repo'],)];
+                rollup['first_row'] = ds_df.index[rows[0]];
+            rollups = rollups + kept_rollups;
+            kept_repo_ids.add(repo_id);
+    
+    for (repo_id, rows) in repo_rows.items():
+        if (repo_id not in kept_repo_ids):
+            rollups = rollups + get_repo_rollups(ds_df.iloc[rows]);
+    
+    return get_rollups_df(rollups);
+
+
+# Replace per-project rollups of repos with rollups of their commit records (DataFrame of all commit records of these
+# repos, indexed by their positions in data store); other repos keep their rollups. (E.g., after updating them in place.)
+def replace_rollups(rollups_df, repos_df):
+    
+    REPO_ID = ['repo_remote_hostname', 'repo_owner', 'repo_name'];
+    
+    repo_rows = repos_df.groupby(REPO_ID, sort=False, observed=True).indices; # Row positions of each repo.
+    
+    rollups = list();
+    if (rollups_df is not None):
+        for rollup in rollups_df.to_dict('records'):
+            if (tuple([rollup[column_label] for column_label in REPO_ID]) not in repo_rows):
+                rollups.append(rollup);
+    
+    for rows in repo_rows.values():
+        rollups = rollups + get_repo_rollups(repos_df.iloc[rows]);
+    
+    return get_rollups_df(rollups);
+
+
+# Get path to rollups file of Parquet data store.
+def get_rollups_path(data_store):
+    
+    if (os.path.isdir(data_store)):
+        return os.path.join(data_store, ROLLUPS_FILENAME);
+    
+    return data_store[:-len('.parquet')] + '-rollups.parquet';
+
+
+# Get per-project rollups of data store (None if it has none, e.g., spreadsheet files).
+def load_rollups(data_store):
+    
+    rollups_df = None;
+    
+    try:
+        
+        if (data_store.endswith('.db')):
+            db_conn = sqlite3.connect(data_store);
+            if (get_table_columns(db_conn, ROLLUPS_TABLE)):
+                rollups_df = pandas.read_sql_query('SELECT * FROM ' + ROLLUPS_TABLE + ';', db_conn);
+            db_conn.close();
+        elif (data_store.endswith('.parquet') and os.path.isfile(get_rollups_path(data_store))):
+            rollups_df = pandas.read_parquet(get_rollups_path(data_store), engine='pyarrow');
+    
+    except:
+        
+        return None;
+    
+    if (rollups_df is None or list(rollups_df.columns) != ROLLUP_COLUMN_LABELS):
+        return None;
+    
+    return rollups_df;
+
+
+# Export per-project rollups to data store (written after data store itself; spreadsheet files keep none).
+def push_rollups(rollups_df, destination):
+    
+    if (destination.endswith('.db')):
+        db_conn = sqlite3.connect(destination);
+        rollups_df.to_sql(ROLLUPS_TABLE, db_conn, if_exists='replace', index=False);
+        db_conn.close();
+    elif (destination.endswith('.parquet')):
+        if (os.path.isdir(destination) and os.path.isfile(destination[:-len('.parquet')] + '-rollups.parquet')): # (Rollups of data store before it was partitioned.)
+            os.remove(destination[:-len('.parquet')] + '-rollups.parquet');
+        rollups_df.to_parquet(get_rollups_path(destination), engine='pyarrow', index=False);
+
+
+# Get number of commit records of database or Parquet data store (without loading them).
+def get_data_store_num_records(data_store):
+    
+    if (data_store.endswith('.db')):
+        db_conn = sqlite3.connect(data_store);
+        num_records = db_conn.execute('SELECT COUNT(*) FROM commits;').fetchone()[0];
+        db_conn.close();
+        return num_records;
+    
+    import pyarrow.parquet; # Parquet file metadata.
+    return sum([pyarrow.parquet.ParquetFile(parquet_path).metadata.num_rows for parquet_path in get_data_store_parquet_files(data_store)]);
+
+
 # Extract GitHub hostname, repo owner, and repo name from remote origin URL.
 def get_repo_id(remote_origin_url):
     
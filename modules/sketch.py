@@ -0,0 +1,117 @@
+#!/usr/bin/python
+
+
+import hashlib; # Value hashes.
+import math; # Precision, estimates.
+
+
+# HyperLogLog sketches of distinct counts (e.g., of time buckets): a sketch holds 2^precision small registers, whatever
+# the number of values added to it, and counts distinct values within a relative standard error of about
+# 1.04/sqrt(2^precision). Sketches of the same precision merge (e.g., across chunks, processes or runs) into the sketch
+# of all their values. Values are kept exactly (as hashes) until there are enough of them for registers to be smaller.
+
+MIN_PRECISION = 4;
+MAX_PRECISION = 18;
+
+HASH_BITS = 64; # Bits of value hashes.
+
+
+# Get precision (number of index bits) of sketches counting within relative standard error (e.g., 0.01).
+def get_precision(error):
+
+    precision = int(math.ceil(math.log((1.04 / error) ** 2, 2)));
+
+    return min(max(precision, MIN_PRECISION), MAX_PRECISION);
+
+
+# Get new (empty) sketch of precision.
+def new_sketch(precision):
+
+    return {'precision' : precision,
+            'hashes' : set(), # Hashes of values added so far (None once registers are used).
+            'registers' : None};
+
+
+# Get hash of value (as 64-bit integer; the same in every process).
+def get_hash(value):
+
+    if (isinstance(value, unicode)):
+        value = value.encode('utf-8');
+
+    return int(hashlib.md5(str(value)).hexdigest()[:HASH_BITS // 4], 16);
+
+
+# Add hash to registers of sketch: register indexed by its first bits keeps the highest rank (position of first 1-bit) of its other bits.
+def add_hash_to_registers(sketch, value_hash):
+
+    precision = sketch['precision'];
+    index = value_hash >> (HASH_BITS - precision);
+    rest = value_hash & ((1 << (HASH_BITS - precision)) - 1);
+    rank = (HASH_BITS - precision) - rest.bit_length() + 1;
+
+    if (rank > sketch['registers'][index]):
+        sketch['registers'][index] = rank;
+
+
+# Switch sketch from exact hashes to registers, once registers are smaller.
+def use_registers(sketch):
+
+    sketch['registers'] = bytearray(1 << sketch['precision']);
+    for value_hash in sketch['hashes']:
+        add_hash_to_registers(sketch, value_hash);
+    sketch['hashes'] = None;
+
+
+# Add value hashes to sketch.
+def add_hashes(sketch, value_hashes):
+
+    if (sketch['registers'] is None):
+        sketch['hashes'].update(value_hashes);
+        if (len(sketch['hashes']) > (1 << sketch['precision']) // 64): # (A hash kept in a set takes about 64 bytes; a register, one.)
+            use_registers(sketch);
+        return;
+
+    for value_hash in value_hashes:
+        add_hash_to_registers(sketch, value_hash);
+
+
+# Add values to sketch.
+def update(sketch, values):
+
+    add_hashes(sketch, [get_hash(value) for value in values]);
+
+
+# Merge other sketch (of same precision) into sketch.
+def merge(sketch, other_sketch):
+
+    if (other_sketch['registers'] is None):
+        add_hashes(sketch, other_sketch['hashes']);
+        return;
+
+    if (sketch['registers'] is None):
+        use_registers(sketch);
+
+    registers = sketch['registers'];
+    other_registers = other_sketch['registers'];
+    for i in range(0, len(registers)):
+        if (other_registers[i] > registers[i]):
+            registers[i] = other_registers[i];
+
+
+# Get (estimated) number of distinct values added to sketch: exact while sketch keeps hashes, else HyperLogLog estimate
+# (with linear counting for small counts).
+def count(sketch):
+
+    if (sketch['registers'] is None):
+        return len(sketch['hashes']);
+
+    registers = sketch['registers'];
+    m = float(len(registers));
+    alpha = 0.7213 / (1.0 + 1.079 / m);
+    estimate = alpha * m * m / sum([2.0 ** -register for register in registers]);
+
+    num_zeros = registers.count('\x00');
+    if (estimate <= 2.5 * m and num_zeros > 0):
+        estimate = m * math.log(m / num_zeros);
+
+    return int(round(estimate));
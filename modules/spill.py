@@ -0,0 +1,97 @@
+#!/usr/bin/python
+
+
+import atexit; # Remove spill files left open.
+import os; # Spill file removal.
+import sqlite3; # Spill database.
+import tempfile; # Spill file.
+
+
+# Spill database: temporary on-disk tables of per-project values that grow with the number of commit records (e.g., plot
+# points, distinct commit hashes and time buckets), so that streaming a data store keeps memory bounded. Each table
+# holds a 'project' (index) column; distinct values are kept in tables keyed by project and value. Plot point columns
+# are untyped, so values come back as they went in.
+
+TABLES = {'points' : 'project INTEGER NOT NULL, row INTEGER NOT NULL, repo_remote_hostname, repo_owner, repo_name, path_in_repo, committer_epoch, num_lines_changed, num_lines_inserted, num_lines_deleted, num_lines_modified',
+          'commit_hashes' : 'project INTEGER NOT NULL, commit_hash TEXT NOT NULL, PRIMARY KEY (project, commit_hash)',
+          'buckets' : 'project INTEGER NOT NULL, dtdelta_code TEXT NOT NULL, bucket TEXT NOT NULL, PRIMARY KEY (project, dtdelta_code, bucket)'};
+
+open_spills = list(); # Spill databases not closed yet (removed at exit, e.g., if analysis fails).
+
+
+# Open (new) spill database in directory (system temporary directory if None); it is removed when closed.
+def open_spill(directory=None):
+
+    (fd, path_to_spill) = tempfile.mkstemp(prefix='spill-', suffix='.db', dir=directory);
+    os.close(fd);
+
+    conn = sqlite3.connect(path_to_spill);
+    conn.execute('PRAGMA journal_mode = OFF;'); # (Throwaway data; no rollback journal or syncs needed.)
+    conn.execute('PRAGMA synchronous = OFF;');
+    for (table_name, columns_sql) in TABLES.items():
+        conn.execute('CREATE TABLE ' + table_name + ' (' + columns_sql + ');');
+    conn.commit();
+
+    spill = {'conn' : conn, 'path' : path_to_spill};
+    open_spills.append(spill);
+
+    return spill;
+
+
+# Close spill database and remove it.
+def close_spill(spill):
+
+    if (spill not in open_spills):
+        return;
+    open_spills.remove(spill);
+
+    spill['conn'].close();
+    try:
+        os.remove(spill['path']);
+    except OSError:
+        pass;
+
+
+# Close (and remove) all spill databases still open.
+def close_spills():
+
+    for spill in list(open_spills):
+        close_spill(spill);
+
+
+atexit.register(close_spills);
+
+
+# Add rows (tuples of column values, in table order; e.g., of a chunk of commit records) to spill table (distinct value
+# tables ignore values already in them).
+def add_rows(spill, table_name, rows):
+
+    if (len(rows) == 0):
+        return;
+
+    conn = spill['conn'];
+    conn.executemany('INSERT OR IGNORE INTO ' + table_name + ' VALUES (' + ','.join(['?'] * len(rows[0])) + ');', rows);
+    conn.commit();
+
+
+# Get number of distinct values of each project (by project index) in distinct value table, grouped by extra key columns (if any).
+def count_distinct(spill, table_name, key_columns=None):
+
+    group_sql = ', '.join(['project'] + (key_columns or []));
+
+    counts = dict();
+    for row in spill['conn'].execute('SELECT ' + group_sql + ', COUNT(*) FROM ' + table_name + ' GROUP BY ' + group_sql + ';'):
+        counts[tuple(row[:-1]) if (key_columns) else row[0]] = row[-1];
+
+    return counts;
+
+
+# Get plot points of project (rows of 'points' table, in data store order), as (column names, rows).
+def get_points(spill, project_index):
+
+    conn = spill['conn'];
+    conn.execute('CREATE INDEX IF NOT EXISTS points_project ON points (project, row);'); # (Once all points are in.)
+
+    cursor = conn.execute('SELECT * FROM points WHERE project = ? ORDER BY row;', (project_index,));
+
+    return [description[0] for description in cursor.description], cursor.fetchall();
@@ -0,0 +1,78 @@
+#!/usr/bin/python
+
+
+import datetime; # Job file names.
+import os; # File, directory handling.
+
+
+# Spool directory layout: job files are dropped in spool directory itself, claimed by moving them to 'work' subdirectory,
+# and moved to 'done' or 'failed' subdirectory once processed.
+WORK_DIR = 'work';
+DONE_DIR = 'done';
+FAILED_DIR = 'failed';
+
+JOB_EXT = '.job'; # Extension of job files (anything else in spool directory, e.g., files being written, is left alone).
+
+
+# Create spool directory (and its subdirectories) if needed.
+def open_spool(path_to_spool):
+
+    for dir_name in ['', WORK_DIR, DONE_DIR, FAILED_DIR]:
+        path = os.path.join(path_to_spool, dir_name);
+        if (not os.path.isdir(path)):
+            os.makedirs(path);
+
+
+# Submit job (sources string, as in scraper arguments) to spool directory; get path of job file.
+# (Job file is written under a temporary name, then renamed, so that it is never claimed half-written.)
+def submit_job(path_to_spool, sources_str):
+
+    job_name = datetime.datetime.now().strftime('%Y%m%d-%H%M%S%f') + '-' + str(os.getpid());
+    tmp_path = os.path.join(path_to_spool, '.' + job_name + '.tmp');
+    job_path = os.path.join(path_to_spool, job_name + JOB_EXT);
+
+    job_file = open(tmp_path, 'w');
+    job_file.write(sources_str);
+    job_file.close();
+    os.rename(tmp_path, job_path);
+
+    return job_path;
+
+
+# Claim jobs submitted to spool directory (oldest first); get paths of claimed job files.
+# (Jobs left claimed by a previous run, e.g., one that was killed, are claimed again first.)
+def claim_jobs(path_to_spool, reclaim=False):
+
+    path_to_work = os.path.join(path_to_spool, WORK_DIR);
+
+    job_paths = list();
+    if (reclaim):
+        job_paths = [os.path.join(path_to_work, job_name) for job_name in sorted(os.listdir(path_to_work)) if (job_name.endswith(JOB_EXT))];
+
+    for job_name in sorted(os.listdir(path_to_spool)): # (Job file names start with submission time.)
+        if (job_name.endswith(JOB_EXT) and not job_name.startswith('.')):
+            job_path = os.path.join(path_to_work, job_name);
+            try:
+                os.rename(os.path.join(path_to_spool, job_name), job_path);
+            except OSError: # Meaning job was claimed by another process...
+                continue;
+            job_paths.append(job_path);
+
+    return job_paths;
+
+
+# Get sources string of claimed job.
+def read_job(job_path):
+
+    job_file = open(job_path);
+    sources_str = job_file.read().strip();
+    job_file.close();
+
+    return sources_str;
+
+
+# Move claimed job to 'done' (or 'failed') subdirectory.
+def finish_job(job_path, failed=False):
+
+    path_to_spool = os.path.dirname(os.path.dirname(job_path));
+    os.rename(job_path, os.path.join(path_to_spool, FAILED_DIR if (failed) else DONE_DIR, os.path.basename(job_path)));
@@ -5,24 +5,44 @@ import argparse; # Script arguments.
 import datetime; # Datetime handling.
 import io; # File writing.
 import itertools; # To count items in gernator.
+import modules.cache as cache; # Parsed commit records cache.
+import modules.gitcmd as gitcmd; # Git commands (argument lists; no shell), repo HEAD (change detection).
+import modules.heads as heads; # Repo heads as of last scrape (change detection).
+import modules.instrument as instrument; # Per-stage timing spans.
+import modules.packreader as packreader; # In-process commit object reading.
+import modules.profiling as profiling; # Profiler hook.
+import modules.pseudonyms as pseudonyms; # Anonymization.
 import modules.shared as sh;
+import modules.spool as spool; # Daemon job queue (spool directory).
+import multiprocessing; # Daemon worker pool.
+import modules.lazy as lazy; # Heavy dependencies imported on first use.
 import os; # File system handling.
-import pandas; # DataFrame handling.
 import re; # Regular expressions.
-import subprocess; # Invoke git applications.
+import signal; # Daemon stop.
 import sys; # Script termination.
 import sqlite3; # Database processing.
 import time; # Ststem time.
+import traceback; # Daemon job errors.
+import urllib; # Job sources strings.
 import urlparse; # URL parsing.
 
+pandas = lazy.import_lazily('pandas'); # DataFrame handling.
+
 
 # Global variables.
 
 args = None; # For script arguments object.
 
-ds_df = pandas.DataFrame(); # Data store DataFrame.
+ds_df = None; # Data store DataFrame (None until loaded or written).
+files_ds_df = None; # Per-file data store DataFrame (None until loaded or written).
+rollups_df = None; # Per-project rollups of data store (None until loaded or written).
 
 db_conn = None;
+cache_conn = None; # Parsed commit records cache database.
+heads_conn = None; # Heads table database (repos as of their last scrape).
+until_is_now = False; # Whether 'until' date is now (rather than given), e.g., so that it is left out of heads table keys.
+updates_in_place = False; # Whether daemon updates database data store in place (rather than rewriting it whole from memory).
+base_commit = None; # Commit repository was scraped up to at its last scrape (then, only commits after it are scraped; None for whole history).
 
 path_to_repo = ''; # Local environment path to repository.
 
@@ -32,46 +52,154 @@ repo_name = ''; # Identifier for repository name.
 path_in_repo = ''; # Path in repository commit log refers to.
 labels_for_repo = None;
 
+repo_ids = dict(); # Identifiers (remote hostname, owner, name) of each repository processed so far (by local path).
+
+daemon_sources = dict(); # Validated sources of each daemon job sources string (so that repositories are only checked once).
+daemon_stop_requested = False; # Whether daemon should stop (once current batch is done).
+
+BACKENDS = ['git', 'pack']; # Ways of reading commit records: running git-log, or reading pack files in-process.
+
+DAEMON_BATCH_TIMEOUT = 86400; # Max number of seconds waited for worker pool to scrape a batch (waiting with a timeout keeps daemon responsive to signals).
+
+# Word-diff (colored) change markers.
+ADDITION_START = '\x1b[32m{+';
+ADDITION_END = '+}\x1b[m';
+REMOVAL_START = '\x1b[31m[-';
+REMOVAL_END = '-]\x1b[m';
+
+NON_WHITESPACE_REGEX = re.compile(ur'\S', re.UNICODE); # (Unicode whitespace semantics, as with the original change regexes.)
+
+STAT_WIDTH = 1000; # Length of git-log output. (Using insanely-high value to ensure "long" filenames are captured in their entirety.)
+WORD_DIFF_MODE = 'plain'; # git-log word diff mode (changed lines are classified from its markers).
+
+FILE_SECTION_SEPARATOR = '\n\x1b[1mdiff --git '; # Start of each file's section in (colored) git-log patch.
+
+# Per-file record fields.
+FILE_COLUMN_LABELS = ['repo_owner', 'repo_name',
+                      'path_in_repo', 'filename',
+                      'labels',
+                      'commit_hash',
+                      'author_name', 'author_email', 'author_epoch',
+                      'committer_name', 'committer_email', 'committer_epoch',
+                      'num_lines_changed', 'num_lines_inserted', 'num_lines_deleted', 'num_lines_modified'];
+
 
-# Process script arguments.
-def process_args():
+# Process script arguments (from command line, or from list of arguments).
+def process_args(argv=None):
     
     argparser = argparse.ArgumentParser();
     
     argparser.add_argument('-s','--sources', help="path to repository (relative to local working environment)", type=str);
     argparser.add_argument('-a','--anonymize', help="enforce anonymization on output commit records", action="store_true");
-    argparser.add_argument('--data-store', help="destination data store (XLSX file) for commit records", type=str);
+    argparser.add_argument('--anonymize-key', help="secret key for keyed (HMAC) pseudonyms (default: $" + pseudonyms.KEY_ENV_VAR + ", else plain SHA-1)", type=str);
+    argparser.add_argument('--pseudonyms', help="persistent pseudonyms table (DB file), shared across runs", type=str);
+    argparser.add_argument('--data-store', help="destination data store (XLSX, DB or Parquet file) for commit records", type=str);
+    argparser.add_argument('--partition-by', help="partition Parquet data store (then a directory) by committer month or year, so that date windows only read the partitions they overlap", choices=sorted(sh.DATA_STORE_PARTITIONINGS));
+    argparser.add_argument('--files-data-store', help="destination data store (XLSX, Parquet or DB file) for per-file commit records", type=str);
     argparser.add_argument('--paths', help="comma-separated string of repository subdirectories to process", type=str);
     argparser.add_argument('--labels', help="label commit records", type=str);
     argparser.add_argument('--since', help="scrape information about commits more recent than a specific date", type=str);
     argparser.add_argument('--until', help="scrape information about commits older than a specific date", type=str);
+    argparser.add_argument('--cache', help="cache database (DB file) of parsed commit records, reused across runs", type=str);
+    argparser.add_argument('--cache-size', help="maximum size (in MB) of parsed commit records in cache (least recently used ones are evicted)", type=int, default=512);
+    argparser.add_argument('--heads', help="heads table (DB file) of repos as of their last scrape, shared with collector; repos whose HEAD has not moved since are skipped", type=str);
+    argparser.add_argument('--backend', help="'git' (default) runs git-log; 'pack' reads commit metadata and file counts in-process (no line counts; renames are detected as git does by default, so file counts can differ under non-default git rename or diff settings)", choices=BACKENDS, default='git');
+    argparser.add_argument('-q', '--quiet', help="leave out progress output (of commit log retrieval, commit record generation and data store writes)", action="store_true");
+    argparser.add_argument('--trace', help="trace file of per-stage timing spans (JSON lines, or Chrome trace if '.json')", type=str);
+    argparser.add_argument('--profile', help="profile run with 'cprofile' (deterministic) or 'sample' (stack sampling); reports go next to data store", choices=profiling.PROFILE_MODES);
+    argparser.add_argument('--profile-memory', help="take memory snapshots at stage boundaries (tracemalloc if available); report goes next to data store", action="store_true");
+    argparser.add_argument('--daemon', help="run as daemon: scrape jobs submitted to spool directory, keeping data store in memory and writing it after each batch of jobs", type=str);
+    argparser.add_argument('--submit', help="submit sources as job to daemon's spool directory, then exit", type=str);
+    argparser.add_argument('-j', '--jobs', help="number of daemon worker processes scraping repository paths of a batch", type=int, default=1);
+    argparser.add_argument('--poll-interval', help="seconds between daemon checks for new jobs", type=float, default=0.2);
     
-    return argparser.parse_args();
+    return argparser.parse_args(argv);
 
 
 # Check script arguments.
 def check_args():
     
     global ds_df;
+    global files_ds_df;
+    global rollups_df;
     global db_conn;
+    global cache_conn;
+    global heads_conn;
+    global until_is_now;
+    global updates_in_place;
+    
+    # Trace file.
+    if (args.trace):
+        try:
+            instrument.open_trace(args.trace);
+        except IOError:
+            sys.exit('Bad trace file \'' + args.trace + '\'.');
+    
+    # Anonymization.
+    if (args.anonymize):
+        
+        pseudonyms.set_key(args.anonymize_key);
+        if (args.pseudonyms):
+            args.pseudonyms = os.path.abspath(args.pseudonyms);
+            try:
+                pseudonyms.open_table(args.pseudonyms);
+            except sqlite3.DatabaseError:
+                sys.exit('Bad pseudonyms table \'' + args.pseudonyms + '\'.');
     
     # Repo sources (URIs and corresponding paths).
     if (args.sources):
         args.sources = sh.get_repo_local_paths(args.sources);
-    if (not args.sources):
+    if (not args.sources and not args.daemon): # (Daemon gets its sources from jobs.)
         sys.exit("Must provide at least one valid repository URI.");
     
+    # Daemon.
+    if (args.daemon):
+        if (args.jobs < 1):
+            sys.exit("Number of jobs must be a positive number.");
+        if (args.poll_interval <= 0):
+            sys.exit("Poll interval must be a positive number of seconds.");
+        args.daemon = os.path.abspath(args.daemon);
+        try:
+            spool.open_spool(args.daemon);
+        except OSError:
+            sys.exit('Bad spool directory \'' + args.daemon + '\'.');
+    
     # Output data sore object.
     if (args.data_store):
        
         data_store = args.data_store;
-        if (sh.is_writable_file(data_store)): # If destination data store is cleared for writing...
+        if (data_store.endswith('.parquet')):
+            try:
+                import pyarrow; # Parquet file handling (through pandas).
+            except ImportError:
+                sys.exit("Parquet data store requires package 'pyarrow'.");
+        elif (args.partition_by):
+            sys.exit("Only Parquet data stores can be partitioned.");
+        
+        if (sh.is_writable_file(data_store, prompt=(not args.daemon))): # If destination data store is cleared for writing (daemon updates it without asking, e.g., when restarted unattended)...
            
+            if (args.daemon and data_store.endswith('.db')): # Database data store is updated in place, batch by batch (instead of kept in memory)...
+                
+                updates_in_place = True;
+                if (os.path.exists(data_store)):
+                    store_conn = sqlite3.connect(data_store);
+                    columns = sh.get_table_columns(store_conn, 'commits');
+                    store_conn.close();
+                    if (not columns):
+                        sys.exit('Bad data store source \'' + args.data_store + '\'.');
+                    updates_in_place = ('label_set_id' in columns); # (Not for labels strings, from before labels had their own tables.)
+            
             if (os.path.exists(data_store)):
                 
-                ds_df = sh.load_from_data_store(data_store);
-                if (ds_df.empty): # Meaning 'ds_df' is None...
-                    sys.exit('Bad data store source \'' + args.data_store + '\'.');
+                if (not updates_in_place):
+                    ds_df = sh.load_from_data_store(data_store);
+                    if (ds_df.empty): # Meaning 'ds_df' is None...
+                        sys.exit('Bad data store source \'' + args.data_store + '\'.');
+                
+                if (not args.partition_by and sh.is_partitioned_data_store(data_store)): # Keep partitioning of existing data store...
+                    args.partition_by = sh.get_data_store_partitioning(data_store);
+                
+                rollups_df = sh.load_rollups(data_store);
 
                 args.data_store = os.path.abspath(data_store);
         else:
@@ -80,6 +208,64 @@ def check_args():
     else: # Default output data store destination
         args.data_store = 'scraper-data_store-' + datetime.datetime.now().strftime('%Y%m%d-%H%M%S%f')[:-3] + '.xlsx';
     
+    # Output per-file data store object.
+    if (args.files_data_store):
+        
+        files_data_store = args.files_data_store;
+        if (not files_data_store.endswith(('.xlsx', '.parquet', '.db'))):
+            sys.exit("Per-file data store must be an XLSX, Parquet or DB file.");
+        if (files_data_store.endswith('.parquet')):
+            try:
+                import pyarrow; # Parquet file handling (through pandas).
+            except ImportError:
+                sys.exit("Per-file Parquet data store requires package 'pyarrow'.");
+        
+        if (sh.is_writable_file(files_data_store, prompt=(not args.daemon))): # If destination data store is cleared for writing...
+            
+            if (os.path.exists(files_data_store)):
+                
+                files_ds_df = sh.load_repo_files_data_store(files_data_store);
+                if (files_ds_df is None):
+                    sys.exit('Bad per-file data store source \'' + args.files_data_store + '\'.');
+            
+            args.files_data_store = os.path.abspath(files_data_store);
+        else:
+            sys.exit();
+    
+    # Parsed commit records cache.
+    if (args.cache):
+        
+        path_to_cache = os.path.dirname(args.cache);
+        if (path_to_cache and not os.path.isdir(path_to_cache)):
+            sys.exit("No such directory \'" + os.path.abspath(path_to_cache) + "\'.");
+        if (args.cache_size <= 0):
+            sys.exit("Cache size must be a positive number of MB.");
+        if (args.backend != 'git'):
+            print(sh.get_warning_str("Cache only applies to the \'git\' backend"));
+        
+        args.cache = os.path.abspath(args.cache);
+        try:
+            cache_conn = cache.open_cache(args.cache);
+        except sqlite3.DatabaseError:
+            sys.exit('Bad cache \'' + args.cache + '\'.');
+    
+    # Heads table.
+    if (args.heads):
+        args.heads = os.path.abspath(args.heads);
+        try:
+            heads_conn = heads.open_heads(args.heads);
+        except sqlite3.DatabaseError:
+            sys.exit('Bad heads table \'' + args.heads + '\'.');
+    
+    until_is_now = (not args.until); # (Jobs of daemon without 'until' date consider commits up to when they are processed.)
+    check_scrape_args();
+    
+    return;
+
+
+# Check script arguments that select commit records (also used by library entry point, which has no data stores).
+def check_scrape_args():
+    
     # Paths in repo.
     args.paths = sh.get_paths_in_repo(args.paths);
     
@@ -94,17 +280,35 @@ def check_args():
     until_dt_str = sh.get_until_dt_str(args.until);
     args.until = until_dt_str if until_dt_str else sh.get_utc_now_str();
     
+    return;
+
 
 # Print script argument configurations.
 def echo_args():
    
     arg_paths_in_repo = ", ".join(["\'" + p + "\'" for p in args.paths]) if (args.paths) else "\'.\'";
     
-    print("[global] Anonymize: " + str(args.anonymize));
+    print("[global] Anonymize: " + str(args.anonymize) + (" (keyed)" if (args.anonymize and pseudonyms.is_keyed()) else ""));
+    if (args.anonymize and args.pseudonyms):
+        print("[global] Pseudonyms: \'" + args.pseudonyms + '\'');
+    print("[global] Backend: " + args.backend);
+    if (args.cache):
+        print("[global] Cache: \'" + args.cache + "\' (" + str(args.cache_size) + " MB)");
+    if (args.heads):
+        print("[global] Heads: \'" + args.heads + '\'');
     print("[global] Data store: \'" + args.data_store + '\'');
+    if (args.partition_by):
+        print("[global] Partitioned by: committer " + args.partition_by);
+    if (args.files_data_store):
+        print("[global] Per-file data store: \'" + args.files_data_store + '\'');
     print("[global] Paths: " + arg_paths_in_repo);
     print("[global] Since: " + args.since);
     print("[global] Until: " + args.until);
+    if (args.trace):
+        print("[global] Trace: \'" + args.trace + '\'');
+    if (args.daemon):
+        print("[global] Daemon spool: \'" + args.daemon + '\'');
+        print("[global] Jobs: " + str(args.jobs));
 
 
 # Parse information on files affected in a single commit.
@@ -118,63 +322,121 @@ def get_commit_filenames(files_str):
     return filenames;
 
 
+# Iterate over lines of string (without building a list of all of them).
+def iter_lines(text):
+    
+    i = 0;
+    while (True):
+        j = text.find('\n', i);
+        if (j < 0):
+            yield text[i:];
+            return;
+        yield text[i:j];
+        i = j + 1;
+
+
+# Find word-diff change (e.g., '{+...+}') in line; return whether there is one, and whether it spans the whole line.
+# (Same as matching '<start>[\s\S]*[\S]+[\s\S]*<end>' anywhere, and anchored at both ends, but in linear time.)
+def find_word_diff_change(line, start_marker, end_marker):
+    
+    i = line.find(start_marker);
+    if (i < 0):
+        return (False, False);
+    
+    content_start = i + len(start_marker);
+    content_end = line.rfind(end_marker); # Widest span possible holds any non-whitespace that narrower ones do.
+    if (content_end < content_start or not NON_WHITESPACE_REGEX.search(line, content_start, content_end)):
+        return (False, False);
+    
+    return (True, (i == 0 and content_end == len(line) - len(end_marker)));
+
+
 # Calculate number of lines inserted, deleted, modified.
 def get_changed_lines_info(patch_str):
     
-    #ADDITION_REGEX = re.compile(ur'\x1B\x5B\x33\x32\x6D\x7B\x2B[\s\S]*[\S]+[\s\S]*\x2B\x7D\x1B\x5B\x6D',
-    #                            re.UNICODE);
-    #ADDITION_START_END_REGEX = re.compile(ur'^\x1B\x5B\x33\x32\x6D\x7B\x2B[\s\S]*[\S]+[\s\S]*\x2B\x7D\x1B\x5B\x6D$',
-    #                                      re.UNICODE);
-    #REMOVAL_REGEX = re.compile(ur'\x1B\x5B\x33\x31\x6D\x5B\x2D[\s\S]*[\S]+[\s\S]*\x2D\x5D\x1B\x5B\x6D',
-    #                           re.UNICODE);
-    #REMOVAL_START_END_REGEX = re.compile(ur'^\x1B\x5B\x33\x31\x6D\x5B\x2D[\s\S]*[\S]+[\s\S]*\x2D\x5D\x1B\x5B\x6D$',
-    #                                     re.UNICODE);
-    ADDITION_REGEX = re.compile(ur'\x1B\[32m\{\+[\s\S]*[\S]+[\s\S]*\+\}\x1B\[m',
-                                re.UNICODE);
-    ADDITION_START_END_REGEX = re.compile(ur'^\x1B\[32m\{\+[\s\S]*[\S]+[\s\S]*\+\}\x1B\[m$',
-                                          re.UNICODE);
-    REMOVAL_REGEX = re.compile(ur'\x1B\[31m\[-[\s\S]*[\S]+[\s\S]*-\]\x1B\[m',
-                               re.UNICODE);
-    REMOVAL_START_END_REGEX = re.compile(ur'^\x1B\[31m\[-[\s\S]*[\S]+[\s\S]*-\]\x1B\[m$',
-                                         re.UNICODE);
-    
     num_lines_inserted = 0;
     num_lines_deleted = 0;
     num_lines_modified = 0;
 
-    patch_str = patch_str.split('\n'); # Get string lines.
-
-    for line in patch_str:
+    for line in iter_lines(patch_str):
         
         line = line.strip();
+        if ('\x1b' not in line): # No (colored) changes in line...
+            continue;
 
-        additions = re.findall(ADDITION_REGEX, line);
-        removals = re.findall(REMOVAL_REGEX, line);
+        (has_additions, additions_span_line) = find_word_diff_change(line, ADDITION_START, ADDITION_END);
+        (has_removals, removals_span_line) = find_word_diff_change(line, REMOVAL_START, REMOVAL_END);
         
-        if (additions and not removals): # Additions ONLY...
-            if (ADDITION_START_END_REGEX.search(line)):
-                if (len(additions) > 1):
-                    num_lines_modified = num_lines_modified + 1;
-                else:
-                    num_lines_inserted = num_lines_inserted + 1;
+        if (has_additions and not has_removals): # Additions ONLY...
+            if (additions_span_line):
+                num_lines_inserted = num_lines_inserted + 1;
             else:
                 num_lines_modified = num_lines_modified + 1;
-        elif (removals and not additions): # Removals ONLY...
-            if (REMOVAL_START_END_REGEX.search(line)):
-                if (len(removals) > 1):
-                    num_lines_modified = num_lines_modified + 1;
-                else:
-                    num_lines_deleted = num_lines_deleted + 1;
+        elif (has_removals and not has_additions): # Removals ONLY...
+            if (removals_span_line):
+                num_lines_deleted = num_lines_deleted + 1;
             else:
                 num_lines_modified = num_lines_modified + 1;
-        elif (additions and removals): # Both additions AND removals...
+        elif (has_additions and has_removals): # Both additions AND removals...
             num_lines_modified = num_lines_modified + 1;
     
     return (num_lines_inserted, num_lines_deleted, num_lines_modified);
 
 
-# Get git-log output str for a particular repository.
-def get_gitlog_str():
+# Strip (ANSI) color codes around git-log meta line.
+def strip_line_color(line):
+    
+    if (line.startswith('\x1b[')):
+        line = line[line.find('m')+1:];
+    if (line.endswith('\x1b[m')):
+        line = line[:-len('\x1b[m')];
+    
+    return line;
+
+
+# Unquote path as quoted by git when it holds special characters (e.g., '"a/we\\"ird.txt"').
+def unquote_git_path(path):
+    
+    if (len(path) > 1 and path.startswith('"') and path.endswith('"')):
+        return path[1:-1].decode('string_escape');
+    
+    return path;
+
+
+# Get path of file a single file section of git-log patch refers to (the new path, unless file was deleted).
+def get_section_filename(section):
+    
+    old_filename = None;
+    renamed_filename = None;
+    
+    lines = iter_lines(section);
+    header = strip_line_color(next(lines).strip()); # 'a/<path> b/<path>' (the part after 'diff --git ').
+    
+    for line in lines:
+        
+        line = strip_line_color(line.strip());
+        if (line.startswith('@@ ')): # First hunk; no more meta lines...
+            break;
+        
+        if (line.startswith('+++ ') and line != '+++ /dev/null'):
+            return unquote_git_path(line[len('+++ '):])[len('b/'):];
+        elif (line.startswith('--- ') and line != '--- /dev/null'):
+            old_filename = unquote_git_path(line[len('--- '):])[len('a/'):];
+        elif (line.startswith('rename to ')):
+            renamed_filename = unquote_git_path(line[len('rename to '):]);
+    
+    if (renamed_filename is not None):
+        return renamed_filename;
+    if (old_filename is not None):
+        return old_filename;
+    
+    # No content changes (e.g., mode change, empty or binary file); both header paths are the same...
+    middle = len(header) // 2;
+    return unquote_git_path(header[middle+1:])[len('b/'):];
+
+
+# Get git-log output str for a particular repository (optionally, only for a given list of commits, in that order).
+def get_gitlog_str(commit_hashes=None):
     
     global path_to_repo;
     global path_in_repo;
@@ -187,36 +449,122 @@ def get_gitlog_str():
     
     gitlog_format = '\x1e\x1e\x1e' + '\x1f\x1f\x1f'.join(GITLOG_FIELDS) + '\x1f\x1f\x1f'; # Last '\x1f' accounts for files info field string.
     
-    config = '-c color.diff.plain=\'normal\' -c color.diff.meta=\'normal bold\' -c color.diff.old=\'red\' -c color.diff.new=\'green\' -c color.diff.whitespace=\'normal\' -c color.ui=\'always\'';
-    gd = '--git-dir=\'' + path_to_repo + '/.git/\'';
-    wt = '--work-tree=\'' + path_to_repo + '\'';
-    fh = '--full-history';
-    a = '--since=\'' + since_dt_str + '\'';
-    b = '--until=\'' + until_dt_str + '\'';
-    s = '--stat';
-    stat_width = 1000; # Length of git-log output. (Using insanely-high value to ensure "long" filenames are captured in their entirety.)
-    sw = '--stat-width=' + str(stat_width);
-    f = '--format=' + gitlog_format;
-    patch = '-p';
-    wd = '--word-diff=plain';
-    p = '-- \'' + path_in_repo + '\'';
-    
-    cmd_str = 'git %s %s %s log %s %s %s %s %s %s %s %s %s' % (config,gd,wt,fh,a,b,s,sw,f,patch,wd,p);
-    #print(cmd_str);
-
-    sp = subprocess.Popen(cmd_str,
-                          stdout=subprocess.PIPE,
-                          stderr=subprocess.STDOUT,
-                          shell=True);
-    
-    (gitlog_str, _) = sp.communicate();
+    config = ['-c', 'color.diff.plain=normal', '-c', 'color.diff.meta=normal bold', '-c', 'color.diff.old=red', '-c', 'color.diff.new=green', '-c', 'color.diff.whitespace=normal', '-c', 'color.ui=always'];
+    fh = ['--full-history'];
+    if (commit_hashes is None):
+        ab = ['--since=' + since_dt_str, '--until=' + until_dt_str];
+    else: # Read commits from stdin, and show them as given (without walking history)...
+        ab = ['--no-walk=unsorted', '--stdin'];
+    r = [base_commit + '..HEAD'] if (base_commit and commit_hashes is None) else []; # Only commits after last scrape...
+    s = ['--stat', '--stat-width=' + str(STAT_WIDTH)];
+    f = ['--format=' + gitlog_format];
+    patch = ['-p', '--word-diff=' + WORD_DIFF_MODE];
+    p = ['--', path_in_repo];
+    
+    git_args = config + ['log'] + fh + ab + s + f + patch + r + p; # (Argument list; no shell, so any path works.)
+
+    span = instrument.start_span('git.spawn');
+    sp = gitcmd.start_git(path_to_repo, git_args, with_work_tree=True, with_stdin=True);
+    instrument.end_span(span);
+    
+    span = instrument.start_span('git.read');
+    stdin_str = ''.join([commit_hash + '\n' for commit_hash in commit_hashes]) if (commit_hashes is not None) else '';
+    (gitlog_str, _) = sp.communicate(stdin_str);
+    instrument.add_counts(span, bytes_read=len(gitlog_str));
+    instrument.end_span(span);
     
     return gitlog_str;
 
 
-# Parse git-log output str and store info in DataFrame.
+# Get hashes of commits (in git-log order) for a particular repository.
+def get_commit_hashes():
+    
+    r = [base_commit + '..HEAD'] if (base_commit) else []; # Only commits after last scrape...
+    
+    git_args = ['log', '--full-history', '--since=' + since_dt_str, '--until=' + until_dt_str, '--format=%H'] + r + ['--', path_in_repo];
+    
+    span = instrument.start_span('git.list_commits');
+    (returncode, hashes_str) = gitcmd.run_git(path_to_repo, git_args);
+    commit_hashes = hashes_str.split() if (returncode == 0) else list(); # (Errors come back in output.)
+    instrument.add_counts(span, bytes_read=len(hashes_str), rows=len(commit_hashes));
+    instrument.end_span(span);
+    
+    return commit_hashes;
+
+
+# Get cache key of parsed records of a commit (considering options that affect parsing).
+def get_commit_cache_key(commit_hash):
+    
+    return cache.get_key(commit_hash, [path_in_repo, '--stat-width=' + str(STAT_WIDTH), '--word-diff=' + WORD_DIFF_MODE]);
+
+
+# Parse single commit group of git-log output into commit record (before anonymization), along with its per-file records.
+def parse_commit_group(commit_group, with_files):
+    
+    # Initial commit field names.
+    COMMIT_FIELD_NAMES = ['commit_hash',
+                          'author_name', 'author_email', 'author_epoch',
+                          'committer_name', 'committer_email', 'committer_epoch',
+                          'subject',
+                          'patch_str'];
+    
+    commit_fields = commit_group.split('\x1f\x1f\x1f');
+    commit = dict(zip(COMMIT_FIELD_NAMES, commit_fields)); # Make commit dict.
+    
+    record = {'commit_hash': commit['commit_hash'],
+              'author_name': sh.decode_str(commit['author_name']),
+              'author_email': sh.decode_str(commit['author_email']),
+              'author_epoch': float(commit['author_epoch']),
+              'committer_name': sh.decode_str(commit['committer_name']),
+              'committer_email': sh.decode_str(commit['committer_email']),
+              'committer_epoch': float(commit['committer_epoch']),
+              'subject': sh.decode_str(commit['subject']),
+              'files': list() if (with_files) else None};
+    
+    sections = commit['patch_str'].split(FILE_SECTION_SEPARATOR); # Stat lines, then a section per file.
+    files_str = sections[0];
+    
+    filenames = get_commit_filenames(files_str);
+    
+    (num_lines_inserted, num_lines_deleted, num_lines_modified) = get_changed_lines_info(files_str);
+    
+    for section in sections[1:]: # Per-file records (in the same pass)...
+        
+        file_lines_info = get_changed_lines_info(section);
+        num_lines_inserted = num_lines_inserted + file_lines_info[0];
+        num_lines_deleted = num_lines_deleted + file_lines_info[1];
+        num_lines_modified = num_lines_modified + file_lines_info[2];
+        
+        if (with_files):
+            filename = sh.decode_str(get_section_filename(section));
+            record['files'].append([filename, file_lines_info[0], file_lines_info[1], file_lines_info[2]]);
+    
+    record['num_files_changed'] = len(filenames);
+    record['num_lines_inserted'] = num_lines_inserted;
+    record['num_lines_deleted'] = num_lines_deleted;
+    record['num_lines_modified'] = num_lines_modified;
+    
+    return record;
+
+
+# Write progress line (over the current terminal line), and end it when done; nothing if quiet.
+def write_progress(progress_str, done=False):
+    
+    if (args.quiet):
+        return;
+    
+    sys.stdout.write("\r");
+    sys.stdout.write(progress_str);
+    if (done):
+        print('');
+    else:
+        sys.stdout.flush();
+
+
+# Parse git-log output str and store info in DataFrames (commit records, and per-file records if requested).
+# (With a cache, unless not to use it, commits whose records are already in it are not retrieved from git again.)
 # Inspired by a blog post by Steven Kryskalla: http://blog.lost-theory.org/post/how-to-parse-git-log-output/
-def get_commits_df():
+def get_commits_df(use_cache=True):
 
     global repo_remote_hostname;
     global repo_owner;
@@ -224,27 +572,48 @@ def get_commits_df():
     global path_in_repo;
     global labels_for_repo;
 
-    sys.stdout.write("\r");
-    sys.stdout.write("[git] Retrieving commit log: ...");
-    sys.stdout.flush();
-    t1 = datetime.datetime.now();
-    
-    gitlog_str = get_gitlog_str();
+    commit_hashes = None; # (Only listed beforehand when using cache.)
+    cache_keys = list();
+    cached_records = dict();
+    if (cache_conn is not None and use_cache):
+        
+        write_progress("[cache] Looking up commit records: ...");
+        t1 = datetime.datetime.now();
+        
+        commit_hashes = get_commit_hashes();
+        span = instrument.start_span('cache.lookup');
+        cache_keys = [get_commit_cache_key(commit_hash) for commit_hash in commit_hashes];
+        cached_records = cache.get_records(cache_conn, cache_keys);
+        instrument.add_counts(span, rows=len(cached_records));
+        instrument.end_span(span);
+        
+        t2 = datetime.datetime.now();
+        t = t2 - t1;
+        write_progress("[cache] Looking up commit records: " + str(len(cached_records)) + " of " + str(len(commit_hashes)) + " cached, done in {0}".format(t), done=True);
+
+    missing_hashes = [commit_hashes[i] for i in range(0, len(cache_keys)) if (cache_keys[i] not in cached_records)];
     
-    t2 = datetime.datetime.now();
-    t = t2 - t1;
-    sys.stdout.write("\r");
-    sys.stdout.write("[git] Retrieving commit log: done in {0}".format(t));
-    print('');
+    gitlog_str = '';
+    if (commit_hashes is None or missing_hashes):
+        
+        write_progress("[git] Retrieving commit log: ...");
+        t1 = datetime.datetime.now();
+        
+        gitlog_str = get_gitlog_str(missing_hashes if (commit_hashes is not None) else None);
+        
+        t2 = datetime.datetime.now();
+        t = t2 - t1;
+        write_progress("[git] Retrieving commit log: done in {0}".format(t), done=True);
 
-    if (gitlog_str):
+    if (gitlog_str or cached_records):
 
         commit_groups = (commit_group.strip('\x1e\x1e\x1e') for commit_group in gitlog_str.split('\n\x1e\x1e\x1e')); # Split commit records.
 
-        (commit_groups, count_commit_groups) = itertools.tee(commit_groups, 2);
-        num_commits = sum(1 for cg in count_commit_groups);
-        
-        ROW_LABELS = [r for r in range(0, num_commits)];
+        if (commit_hashes is None):
+            (commit_groups, count_commit_groups) = itertools.tee(commit_groups, 2);
+            num_commits = sum(1 for cg in count_commit_groups);
+        else:
+            num_commits = len(commit_hashes);
         
         COLUMN_LABELS = ['repo_remote_hostname', 'repo_owner', 'repo_name',
                          'path_in_repo',
@@ -256,89 +625,215 @@ def get_commits_df():
                          'num_files_changed',
                          'num_lines_changed', 'num_lines_inserted', 'num_lines_deleted', 'num_lines_modified'];
         
-        # Initial commit field names.
-        COMMIT_FIELD_NAMES = ['commit_hash',
-                              'author_name', 'author_email', 'author_epoch',
-                              'committer_name', 'committer_email', 'committer_epoch',
-                              'subject',
-                              'patch_str'];
+        with_files = (args.files_data_store or cache_conn is not None); # (Cached records always hold per-file records.)
         
-        commits_df = pandas.DataFrame(index=ROW_LABELS, columns=COLUMN_LABELS);
+        columns = dict([(column_label, list()) for column_label in COLUMN_LABELS]); # Commit records, column by column.
+        file_rows = list();
+        new_cache_records = list();
         
         t1 = datetime.datetime.now();
+        span = instrument.start_span('parse');
         j = 0; # Number records processed.
         k = 0.0; # Probability of records processed.
         for i in range(0, num_commits):
 
-            commit_group = commit_groups.next();
-            
-            commit_fields = commit_group.split('\x1f\x1f\x1f');
-            commit = dict(zip(COMMIT_FIELD_NAMES, commit_fields)); # Make commit dict.
-
-            author_name = sh.decode_str(commit['author_name']);
-            author_email = sh.decode_str(commit['author_email']);
-            author_epoch = float(commit['author_epoch']);
-            committer_name = sh.decode_str(commit['committer_name']);
-            committer_email = sh.decode_str(commit['committer_email']);
-            committer_epoch = float(commit['committer_epoch']);
-            subject = sh.decode_str(commit['subject']);
+            if (commit_hashes is not None and cache_keys[i] in cached_records):
+                record = cached_records[cache_keys[i]];
+            else:
+                record = parse_commit_group(commit_groups.next(), with_files);
+                if (commit_hashes is not None):
+                    if (record['commit_hash'] != commit_hashes[i]): # (E.g., repository changed between git-log runs.)
+                        instrument.end_span(span);
+                        write_progress('', done=True);
+                        print(sh.get_warning_str("Unexpected commit \'" + record['commit_hash'] + "\' in git-log output (retrieving commit log again, without cache)"));
+                        return get_commits_df(use_cache=False);
+                    new_cache_records.append((cache_keys[i], record));
+
+            author_name = record['author_name'];
+            author_email = record['author_email'];
+            author_epoch = record['author_epoch'];
+            committer_name = record['committer_name'];
+            committer_email = record['committer_email'];
+            committer_epoch = record['committer_epoch'];
+            subject = record['subject'];
             len_subject = len(subject);
             
             if (args.anonymize):
-                author_name = sh.get_hash_str(author_name);
-                author_email = sh.get_hash_str(author_email);
-                committer_name = sh.get_hash_str(committer_name);
-                committer_email = sh.get_hash_str(committer_email);
-                subject = sh.get_hash_str(subject);
+                author_name = pseudonyms.get_pseudonym(author_name);
+                author_email = pseudonyms.get_pseudonym(author_email);
+                committer_name = pseudonyms.get_pseudonym(committer_name);
+                committer_email = pseudonyms.get_pseudonym(committer_email);
+                subject = pseudonyms.compute_pseudonym(subject); # (Subjects hardly repeat; not memoized.)
             
-            patch_str = commit['patch_str'];
-            files_str = patch_str.split('diff --git a/')[0];
-            
-            filenames = get_commit_filenames(files_str);
-
-            (num_lines_inserted, num_lines_deleted, num_lines_modified) = get_changed_lines_info(patch_str);
+            num_lines_inserted = record['num_lines_inserted'];
+            num_lines_deleted = record['num_lines_deleted'];
+            num_lines_modified = record['num_lines_modified'];
             num_lines_changed = num_lines_inserted + num_lines_deleted + num_lines_modified;
+            
+            if (args.files_data_store):
+                for (filename, file_lines_inserted, file_lines_deleted, file_lines_modified) in record['files']:
+                    
+                    if (args.anonymize):
+                        filename = pseudonyms.get_pseudonym(filename);
+                    
+                    file_rows.append([repo_owner, repo_name,
+                                      path_in_repo, filename,
+                                      labels_for_repo,
+                                      record['commit_hash'],
+                                      author_name, author_email, author_epoch,
+                                      committer_name, committer_email, committer_epoch,
+                                      file_lines_inserted + file_lines_deleted + file_lines_modified,
+                                      file_lines_inserted, file_lines_deleted, file_lines_modified]);
         
-            row = commits_df.iloc[i];
-
-            row['repo_remote_hostname'] = repo_remote_hostname;
-            row['repo_owner'] = repo_owner;
-            row['repo_name'] = repo_name;
-            row['path_in_repo'] = path_in_repo;
-            row['labels'] = labels_for_repo;
-            row['commit_hash'] = commit['commit_hash'];
-            row['author_name'] = author_name;
-            row['author_email'] = author_email;
-            row['author_epoch'] = author_epoch;
-            row['committer_name'] = committer_name;
-            row['committer_email'] = committer_email;
-            row['committer_epoch'] = committer_epoch;
-            row['subject'] = subject;
-            row['len_subject'] = len_subject;
-            row['num_files_changed'] = len(filenames);
-            row['num_lines_changed'] = num_lines_changed;
-            row['num_lines_inserted'] = num_lines_inserted;
-            row['num_lines_deleted'] = num_lines_deleted;
-            row['num_lines_modified'] = num_lines_modified;
+            columns['commit_hash'].append(record['commit_hash']);
+            columns['author_name'].append(author_name);
+            columns['author_email'].append(author_email);
+            columns['author_epoch'].append(author_epoch);
+            columns['committer_name'].append(committer_name);
+            columns['committer_email'].append(committer_email);
+            columns['committer_epoch'].append(committer_epoch);
+            columns['subject'].append(subject);
+            columns['len_subject'].append(len_subject);
+            columns['num_files_changed'].append(record['num_files_changed']);
+            columns['num_lines_changed'].append(num_lines_changed);
+            columns['num_lines_inserted'].append(num_lines_inserted);
+            columns['num_lines_deleted'].append(num_lines_deleted);
+            columns['num_lines_modified'].append(num_lines_modified);
             
             j = j + 1;
             k = float(j) / float(num_commits);
-            sys.stdout.write("\r");
-            sys.stdout.write(("[git] Generating commit records: {0}% (" + str(j) + "/" + str(num_commits) + ")").format(int(100.0*k)));
-            sys.stdout.flush();
+            write_progress(("[git] Generating commit records: {0}% (" + str(j) + "/" + str(num_commits) + ")").format(int(100.0*k)));
         
+        instrument.add_counts(span, rows=num_commits);
+        instrument.end_span(span);
         t2 = datetime.datetime.now();
         t = t2 - t1;
-        sys.stdout.write("\r");
-        sys.stdout.write(("[git] Generating commit records: {0}% (" + str(j) + "/" + str(num_commits) + "), done in {1}").format(int(100.0*k), t));
+        write_progress(("[git] Generating commit records: {0}% (" + str(j) + "/" + str(num_commits) + "), done in {1}").format(int(100.0*k), t), done=True);
 
-        print('');
+        span = instrument.start_span('record_build');
+
+        # Same value in every row; dictionary-encoded from the start (labels tuple is shared by all rows).
+        columns['repo_remote_hostname'] = pandas.Categorical([repo_remote_hostname] * num_commits);
+        columns['repo_owner'] = pandas.Categorical([repo_owner] * num_commits);
+        columns['repo_name'] = pandas.Categorical([repo_name] * num_commits);
+        columns['path_in_repo'] = pandas.Categorical([path_in_repo] * num_commits);
+        columns['labels'] = [labels_for_repo] * num_commits;
+        
+        commits_df = sh.categorize_commits_df(pandas.DataFrame(columns, columns=COLUMN_LABELS));
+        files_df = pandas.DataFrame(file_rows, columns=FILE_COLUMN_LABELS);
+
+        instrument.add_counts(span, rows=num_commits);
+        instrument.end_span(span);
 
-        return commits_df;
+        if (new_cache_records):
+            span = instrument.start_span('cache.store');
+            num_evicted = cache.put_records(cache_conn, new_cache_records, args.cache_size * 1024 * 1024);
+            instrument.add_counts(span, rows=len(new_cache_records));
+            instrument.end_span(span);
+            print("[cache] Stored " + str(len(new_cache_records)) + " commit records (" + str(num_evicted) + " evicted)");
+
+        return commits_df, files_df;
 
     else:
 
-        return pandas.DataFrame();
+        return pandas.DataFrame(), pandas.DataFrame();
+
+
+# Formulate text string from commit object bytes (using the commit's own encoding).
+def decode_commit_str(text, encoding):
+    
+    try:
+        return text.decode(encoding, 'replace');
+    except LookupError: # Unknown encoding...
+        return sh.decode_str(text);
+
+
+# Read commit objects straight from repository's pack (and loose object) files and store their info in DataFrames.
+# (Same records as get_commits_df(), except that line counts are left empty.)
+def get_pack_commits_df():
+
+    global repo_remote_hostname;
+    global repo_owner;
+    global repo_name;
+    global path_in_repo;
+    global labels_for_repo;
+
+    COLUMN_LABELS = ['repo_remote_hostname', 'repo_owner', 'repo_name',
+                     'path_in_repo',
+                     'labels',
+                     'commit_hash',
+                     'author_name', 'author_email', 'author_epoch',
+                     'committer_name', 'committer_email', 'committer_epoch',
+                     'subject', 'len_subject',
+                     'num_files_changed',
+                     'num_lines_changed', 'num_lines_inserted', 'num_lines_deleted', 'num_lines_modified'];
+
+    write_progress("[pack] Reading commit objects: ...");
+    t1 = datetime.datetime.now();
+    span = instrument.start_span('pack.read');
+
+    since_epoch = sh.utc_str_to_epoch(since_dt_str);
+    until_epoch = sh.utc_str_to_epoch(until_dt_str);
+
+    repo = packreader.open_repo(path_to_repo);
+
+    rows = list();
+    file_rows = list();
+    for commit in packreader.walk_commits(repo, path_in_repo, since_epoch, until_epoch):
+
+        encoding = commit['encoding'];
+        (author_name, author_email, author_epoch) = commit['author'];
+        (committer_name, committer_email, committer_epoch) = commit['committer'];
+
+        author_name = decode_commit_str(author_name, encoding);
+        author_email = decode_commit_str(author_email, encoding);
+        committer_name = decode_commit_str(committer_name, encoding);
+        committer_email = decode_commit_str(committer_email, encoding);
+        subject = decode_commit_str(commit['subject'], encoding);
+        len_subject = len(subject);
+
+        if (args.anonymize):
+            author_name = pseudonyms.get_pseudonym(author_name);
+            author_email = pseudonyms.get_pseudonym(author_email);
+            committer_name = pseudonyms.get_pseudonym(committer_name);
+            committer_email = pseudonyms.get_pseudonym(committer_email);
+            subject = pseudonyms.compute_pseudonym(subject); # (Subjects hardly repeat; not memoized.)
+
+        rows.append([repo_remote_hostname, repo_owner, repo_name,
+                     path_in_repo,
+                     labels_for_repo,
+                     commit['commit_hash'],
+                     author_name, author_email, float(author_epoch),
+                     committer_name, committer_email, float(committer_epoch),
+                     subject, len_subject,
+                     commit['num_files_changed'],
+                     float('nan'), float('nan'), float('nan'), float('nan')]);
+
+        if (args.files_data_store):
+            for filename in commit['changed_files']:
+                filename = sh.decode_str(filename);
+                if (args.anonymize):
+                    filename = pseudonyms.get_pseudonym(filename);
+                file_rows.append([repo_owner, repo_name,
+                                  path_in_repo, filename,
+                                  labels_for_repo,
+                                  commit['commit_hash'],
+                                  author_name, author_email, float(author_epoch),
+                                  committer_name, committer_email, float(committer_epoch),
+                                  float('nan'), float('nan'), float('nan'), float('nan')]);
+
+    packreader.close_repo(repo);
+
+    instrument.add_counts(span, rows=len(rows));
+    instrument.end_span(span);
+    t2 = datetime.datetime.now();
+    t = t2 - t1;
+    write_progress("[pack] Reading commit objects: " + str(len(rows)) + " commits, done in {0}".format(t), done=True);
+
+    if (rows):
+        return sh.categorize_commits_df(pandas.DataFrame(rows, columns=COLUMN_LABELS)), pandas.DataFrame(file_rows, columns=FILE_COLUMN_LABELS);
+    else:
+        return pandas.DataFrame(), pandas.DataFrame();
 
 
 # Export DataFrame to file.
@@ -346,15 +841,53 @@ def push_commit_records(commits_df, title, destination):
     
     global ds_df;
     global db_conn;
+    global rollups_df;
 
-    if (not ds_df.empty): # If destination already exists...
-        ds_df = pandas.concat([ds_df, commits_df]); # Concatenate existing commits DataFrame (from data store) with commits DataFrame.
+    if (ds_df is not None and not ds_df.empty): # If destination already exists...
+        ds_df = sh.concat_commits_dfs([ds_df, commits_df]); # Concatenate existing commits DataFrame (from data store) with commits DataFrame (keeping it dictionary-encoded).
         ds_df = ds_df.drop_duplicates(); # Eliminate any duplicate DataFrame rows.
         ds_df = ds_df.reset_index(drop=True); # Reset DataFrame rows indices.
     else:
         ds_df = commits_df;
 
-    sh.push_to_data_store(ds_df, title, False, destination, db_conn);
+    sh.push_to_data_store(ds_df, title, False, destination, db_conn, args.partition_by);
+    
+    if (destination.endswith(('.db', '.parquet'))): # Roll up again repos with new commit records (after data store is written, which may replace Parquet data store directory)...
+        repo_ids = commits_df[['repo_remote_hostname', 'repo_owner', 'repo_name']].drop_duplicates().itertuples(index=False);
+        rollups_df = sh.update_rollups(rollups_df, ds_df, repo_ids);
+        sh.push_rollups(rollups_df, destination);
+    
+    return;
+
+
+# Update database data store in place with commit records of projects (replacing their previous commit records; see
+# 'sh.update_data_store_db'), then roll up again their repos.
+def update_commit_records(commits_df, replaced_projects, destination):
+    
+    global rollups_df;
+    
+    sh.update_data_store_db(commits_df, destination, replaced_projects);
+    
+    repo_ids = None if (rollups_df is None) else list(set([project[:3] for project in replaced_projects])); # (With no rollups yet, every repo is rolled up.)
+    rollups_df = sh.replace_rollups(rollups_df, sh.load_data_store_repos(destination, repo_ids));
+    sh.push_rollups(rollups_df, destination);
+    
+    return;
+
+
+# Export per-file DataFrame to file.
+def push_file_records(files_df, destination):
+    
+    global files_ds_df;
+
+    if (files_ds_df is not None and not files_ds_df.empty): # If destination already exists...
+        files_ds_df = pandas.concat([files_ds_df, files_df]);
+        files_ds_df = files_ds_df.drop_duplicates(); # Eliminate any duplicate DataFrame rows.
+        files_ds_df = files_ds_df.reset_index(drop=True); # Reset DataFrame rows indices.
+    else:
+        files_ds_df = files_df;
+
+    sh.push_to_files_data_store(files_ds_df, destination);
     
     return;
 
@@ -362,45 +895,418 @@ def push_commit_records(commits_df, title, destination):
 # Process info for single project.
 def process_project():
 
-    commits_df = get_commits_df();
+    project_span = instrument.start_span('scraper.project', repo=path_to_repo, path_in_repo=path_in_repo);
+
+    if (args.backend == 'pack'):
+        (commits_df, files_df) = get_pack_commits_df();
+    else:
+        (commits_df, files_df) = get_commits_df();
         
     if (not commits_df.empty):
 
-        sys.stdout.write("\r");
-        sys.stdout.write("[pandas] Importing commit records into data store: ...");
-        sys.stdout.flush();
+        write_progress("[pandas] Importing commit records into data store: ...");
         
         t1 = datetime.datetime.now();
         
+        span = instrument.start_span('store_write');
         push_commit_records(commits_df, 'commits', args.data_store);
+        instrument.add_counts(span, rows=len(ds_df.index));
+        instrument.end_span(span);
         
         t2 = datetime.datetime.now();
         t = t2 - t1;
-        sys.stdout.write("\r");
-        sys.stdout.write("[pandas] Importing commit records into data store: done in {0}".format(t));
-        print('');
+        write_progress("[pandas] Importing commit records into data store: done in {0}".format(t), done=True);
+        
+        pseudonyms.flush_table();
+        
+        if (args.files_data_store and not files_df.empty):
+            
+            write_progress("[pandas] Importing per-file records into data store: ...");
+            
+            t1 = datetime.datetime.now();
+            
+            span = instrument.start_span('store_write.files');
+            push_file_records(files_df, args.files_data_store);
+            instrument.add_counts(span, rows=len(files_ds_df.index));
+            instrument.end_span(span);
+            
+            t2 = datetime.datetime.now();
+            t = t2 - t1;
+            write_progress("[pandas] Importing per-file records into data store: done in {0}".format(t), done=True);
         
+        instrument.add_counts(project_span, rows=len(commits_df.index));
+        instrument.end_span(project_span);
         return True;    
 
     else: # Commits list is empty...
         print(sh.get_warning_str("No relevant commits found"));
+        instrument.end_span(project_span);
         return False;
 
 
-# Driver for scraper.
-def main():
+# Get paths in repo to process for source (as in script arguments).
+def get_source_paths(source):
+    
+    paths = args.paths + source['paths_in_repo'];
+    paths = list(set(paths)); # Eliminate any duplicates.
+    paths = paths if paths else ['.'];
+    
+    return paths;
+
+
+# Get key of source in heads table, and current HEAD of its repository (None if unborn).
+# (Key covers data stores and everything that selects commit records, so that other scrapes of same repository are kept apart.)
+def get_source_head(source):
+    
+    path = os.path.abspath(source['uri']);
+    
+    key_parts = ['scraper', os.path.abspath(args.data_store), args.files_data_store or '', path,
+                 ';'.join(sorted(get_source_paths(source))),
+                 ';'.join(sorted(set(args.labels + tuple(source['labels_for_repo'])))),
+                 ';'.join(source['since'] if (source['since']) else [args.since]),
+                 ';'.join(source['until'] if (source['until']) else ([] if (until_is_now) else [args.until])),
+                 pseudonyms.namespace if (args.anonymize) else '',
+                 args.backend];
+    
+    return heads.get_key(key_parts), gitcmd.resolve_ref(path, 'HEAD');
+
+
+# Check whether data stores keep commit records of last scrapes (e.g., they were not removed since).
+def is_data_store_kept():
+    
+    if (updates_in_place):
+        if (not os.path.exists(args.data_store)):
+            return False;
+    elif (ds_df is None or ds_df.empty):
+        return False;
+    if (args.files_data_store and (files_ds_df is None or files_ds_df.empty)):
+        return False;
+    
+    return True;
+
+
+# Check whether source's repository HEAD is the one recorded at its last scrape (into data stores as loaded).
+def is_source_unchanged(heads_key, head):
+    
+    if (not is_data_store_kept()): # (Nothing kept from last scrape.)
+        return False;
+    
+    return (head is not None and heads.get_head(heads_conn, heads_key) == head);
+
+
+# Get commit source's repository was scraped up to at its last scrape, if only commits after it need scraping (None
+# otherwise, e.g., if history was rewritten since, or with 'pack' backend, which walks whole history).
+def get_source_base_commit(source, heads_key, head):
+    
+    if (head is None or args.backend == 'pack' or not is_data_store_kept()):
+        return None;
+    
+    recorded_head = heads.get_head(heads_conn, heads_key);
+    if (recorded_head is None or not gitcmd.is_ancestor(os.path.abspath(source['uri']), recorded_head, head)):
+        return None;
+    
+    return recorded_head;
+
+
+# Set repository to process (identifiers, labels and dates) from source (as in script arguments); get its paths to process.
+def set_repo(source):
     
-    global args;
     global path_to_repo;
     global repo_remote_hostname;
     global repo_owner;
     global repo_name;
-    global path_in_repo;
     global labels_for_repo;
     global since_dt_str;
     global until_dt_str;
+    
+    path_to_repo = os.path.abspath(source['uri']);
+    
+    if (path_to_repo not in repo_ids): # (Daemon processes same repositories over and over.)
+        remote_origin_url = sh.get_remote_origin_url(path_to_repo);
+        repo_ids[path_to_repo] = sh.get_repo_id(remote_origin_url);
+    repo_remote_hostname, repo_owner, repo_name = repo_ids[path_to_repo];
+    if (args.anonymize):
+        repo_remote_hostname = pseudonyms.get_pseudonym(repo_remote_hostname);
+        repo_owner = pseudonyms.get_pseudonym(repo_owner);
+        repo_name = pseudonyms.get_pseudonym(repo_name);
+
+    paths = get_source_paths(source);
+    
+    labels_for_repo = args.labels + source['labels_for_repo'];
+    labels_for_repo = tuple(list(set(labels_for_repo))); # Eliminate any duplicates.
+
+    since = '';
+    if (len(source['since']) > 1):
+        print(sh.get_warning_str("Too many \'since\' dates"));
+    elif (len(source['since']) == 1):
+        since = source['since'][0]; # Only elem in list.
+    since = sh.get_since_dt_str(since) if since else since; # To potentially prevent unnecessary function call.
+    since_dt_str = since if since else args.since;
+    
+    until = '';
+    if (len(source['until']) > 1):
+        print(sh.get_warning_str("Too many \'until\' dates"));
+    elif (len(source['until']) == 1):
+        until = source['until'][0]; # Only elem in list.
+    until = sh.get_until_dt_str(until) if until else until; # To potentially prevent unnecessary function call.
+    until_dt_str = until if until else args.until;
+    
+    return paths;
+
+
+# Scrape commit records of local repository (path, as in script sources) into DataFrame, without writing any data store (library entry point).
+# (Arguments as for the script: paths in repo and labels are lists, dates are strings; commit records are not cached.
+# Bad arguments raise ValueError; 'quiet' leaves out progress output.)
+def scrape_repo(repo_path, paths_in_repo=None, labels=None, since=None, until=None, anonymize=False, backend='git', quiet=False):
+    
+    global args;
+    global path_in_repo;
+    
+    if (backend not in BACKENDS): # (Instead of argument parser exiting.)
+        raise ValueError("Unrecognized backend '" + str(backend) + "'.");
+    
+    argv = ['--sources', repo_path, '--backend', backend];
+    if (paths_in_repo):
+        argv = argv + ['--paths', ';'.join(paths_in_repo)];
+    if (labels):
+        argv = argv + ['--labels', ';'.join(labels)];
+    if (since):
+        argv = argv + ['--since', since];
+    if (until):
+        argv = argv + ['--until', until];
+    if (anonymize):
+        argv = argv + ['--anonymize'];
+    if (quiet):
+        argv = argv + ['--quiet'];
+    
+    args = process_args(argv);
+    check_scrape_args();
+    if (args.anonymize):
+        pseudonyms.set_key(args.anonymize_key);
+    
+    sources = sh.get_repo_local_paths(repo_path);
+    if (len(sources) != 1):
+        raise ValueError("Must provide one valid repository path.");
+    paths = set_repo(sources[0]);
+    
+    commits_dfs = list();
+    for path in paths:
+        path_in_repo = path;
+        if (args.backend == 'pack'):
+            (commits_df, files_df) = get_pack_commits_df();
+        else:
+            (commits_df, files_df) = get_commits_df();
+        commits_dfs.append(commits_df);
+    
+    return sh.concat_commits_dfs(commits_dfs);
+
+
+# Get sources string (as in script arguments) of source, with absolute repository path, and script's paths in repo and labels folded in.
+def get_source_str(source):
+    
+    query = [('path', path) for path in sorted(set(args.paths + source['paths_in_repo']))];
+    query = query + [('label', label) for label in sorted(set(args.labels + tuple(source['labels_for_repo'])))];
+    query = query + [('since', since) for since in source['since']];
+    query = query + [('until', until) for until in source['until']];
+    
+    return os.path.abspath(source['uri']) + (('?' + urllib.urlencode(query)) if (query) else '');
+
+
+# Submit sources as job to daemon's spool directory.
+def submit_job():
+    
+    sources = sh.get_repo_local_paths(args.sources) if (args.sources) else list();
+    if (not sources):
+        sys.exit("Must provide at least one valid repository URI.");
+    
+    args.paths = sh.get_paths_in_repo(args.paths);
+    args.labels = sh.get_labels(args.labels);
+    for source in sources: # (Script's dates apply to sources without their own.)
+        source['since'] = source['since'] if (source['since'] or not args.since) else [args.since];
+        source['until'] = source['until'] if (source['until'] or not args.until) else [args.until];
+    
+    try:
+        spool.open_spool(args.submit);
+        job_path = spool.submit_job(args.submit, ';'.join([get_source_str(source) for source in sources]));
+    except (IOError, OSError):
+        sys.exit('Bad spool directory \'' + args.submit + '\'.');
+    
+    print("[daemon] Submitted job: \'" + job_path + '\'');
+
+
+# Request daemon stop (signal handler); daemon stops once current batch is written to data store.
+def stop_daemon(signum, frame):
+    
+    global daemon_stop_requested;
+    
+    daemon_stop_requested = True;
+
+
+# Initialize daemon worker process (forked from daemon): own database connections, and no tracing.
+def init_daemon_worker():
+    
+    global cache_conn;
+    
+    instrument.forget_trace();
+    instrument.set_boundary_hook(None);
+    
+    if (args.cache):
+        cache_conn = cache.open_cache(args.cache);
+    if (args.anonymize and args.pseudonyms):
+        pseudonyms.open_table(args.pseudonyms);
+
+
+# Scrape project (source, path in repo, and commit scraped up to at last scrape, if any) of daemon job: get commits and
+# per-file DataFrames, and error message (None if scraped).
+def scrape_daemon_project(project):
+    
+    global path_in_repo;
+    global base_commit;
+    
+    (source, path, base_commit) = project;
+    
+    try:
+        set_repo(source);
+        path_in_repo = path;
+        if (args.backend == 'pack'):
+            (commits_df, files_df) = get_pack_commits_df();
+        else:
+            (commits_df, files_df) = get_commits_df();
+        pseudonyms.flush_table();
+    except (Exception, SystemExit): # (A failing project only fails its own job.)
+        return None, None, traceback.format_exc().strip().split('\n')[-1];
+    
+    return commits_df, files_df, None;
+
+
+# Process batch of claimed daemon jobs: scrape their projects (in worker pool, if any), then write all their commit records to data store(s) at once.
+def process_daemon_batch(job_paths, pool):
+    
+    t1 = datetime.datetime.now();
+    span = instrument.start_span('daemon.batch', jobs=len(job_paths));
+    
+    until_now = sh.get_utc_now_str() if (until_is_now) else None;
+    
+    projects = list();
+    job_project_indices = list(); # Indices of projects of each job.
+    job_is_valid = list(); # Whether each job has any valid sources.
+    source_heads = list(); # Heads table key, HEAD and project indices of each changed source.
+    batch_heads_keys = set();
+    num_unchanged = 0;
+    for job_path in job_paths:
+        
+        sources_str = spool.read_job(job_path);
+        if (sources_str not in daemon_sources):
+            daemon_sources[sources_str] = sh.get_repo_local_paths(sources_str);
+        
+        project_indices = list();
+        for source in daemon_sources[sources_str]:
+            source_project_indices = list();
+            source_base_commit = None;
+            if (heads_conn is not None):
+                (heads_key, head) = get_source_head(source);
+                if (heads_key in batch_heads_keys or is_source_unchanged(heads_key, head)): # (Or already in batch.)
+                    num_unchanged = num_unchanged + 1;
+                    continue;
+                batch_heads_keys.add(heads_key);
+                source_heads.append((heads_key, head, source_project_indices));
+                source_base_commit = get_source_base_commit(source, heads_key, head);
+            if (until_now and not source['until']):
+                source = dict(source, until=[until_now]);
+            for path in get_source_paths(source):
+                source_project_indices.append(len(projects));
+                projects.append((source, path, source_base_commit));
+            project_indices = project_indices + source_project_indices;
+        job_project_indices.append(project_indices);
+        job_is_valid.append(len(daemon_sources[sources_str]) > 0);
+    
+    if (pool is not None):
+        results = pool.map_async(scrape_daemon_project, projects).get(DAEMON_BATCH_TIMEOUT);
+    else:
+        results = [scrape_daemon_project(project) for project in projects];
+    
+    commits_dfs = [commits_df for (commits_df, files_df, error) in results if (error is None and not commits_df.empty)];
+    if (commits_dfs):
+        store_span = instrument.start_span('store_write');
+        if (updates_in_place):
+            replaced_projects = list(); # Commit records of projects replaced in data store (all, or those of commits after last scrape).
+            for j in range(0, len(projects)):
+                (commits_df, files_df, error) = results[j];
+                if (error is None and not commits_df.empty):
+                    commit_hashes = commits_df['commit_hash'].tolist() if (projects[j][2] is not None) else None;
+                    replaced_projects.append(tuple(commits_df[['repo_remote_hostname', 'repo_owner', 'repo_name']].iloc[0]) + (projects[j][1], commit_hashes));
+            update_commit_records(sh.concat_commits_dfs(commits_dfs), replaced_projects, args.data_store);
+            instrument.add_counts(store_span, rows=sum([len(commits_df.index) for commits_df in commits_dfs]));
+        else:
+            push_commit_records(sh.concat_commits_dfs(commits_dfs), 'commits', args.data_store);
+            instrument.add_counts(store_span, rows=len(ds_df.index));
+        instrument.end_span(store_span);
+        
+        files_dfs = [files_df for (commits_df, files_df, error) in results if (error is None and not files_df.empty)];
+        if (args.files_data_store and files_dfs):
+            store_span = instrument.start_span('store_write.files');
+            push_file_records(pandas.concat(files_dfs), args.files_data_store);
+            instrument.add_counts(store_span, rows=len(files_ds_df.index));
+            instrument.end_span(store_span);
+    
+    for i in range(0, len(job_paths)):
+        errors = [results[j][2] for j in job_project_indices[i] if (results[j][2] is not None)];
+        for error in errors:
+            print(sh.get_warning_str("Job \'" + os.path.basename(job_paths[i]) + "\' failed: " + error));
+        spool.finish_job(job_paths[i], bool(errors) or not job_is_valid[i]); # (A job without valid sources fails too.)
+    
+    if (heads_conn is not None): # (Once their commit records are in data store.)
+        heads.set_heads(heads_conn, [(heads_key, head) for (heads_key, head, source_project_indices) in source_heads if (head is not None and all([results[j][2] is None for j in source_project_indices]))]);
+    
+    num_records = sum([len(commits_df.index) for commits_df in commits_dfs]);
+    instrument.add_counts(span, rows=num_records);
+    instrument.end_span(span);
+    
+    t2 = datetime.datetime.now();
+    t = t2 - t1;
+    print("[daemon] Batch of " + str(len(job_paths)) + " jobs (" + str(len(projects)) + " repository paths, " + str(num_records) + " commit records" + ((", " + str(num_unchanged) + " unchanged repositories skipped") if (num_unchanged) else "") + "): done in {0}".format(t));
+
+
+# Run as daemon: scrape jobs submitted to spool directory, batch by batch, until stopped (SIGTERM or Ctrl-C).
+def run_daemon():
+    
+    signal.signal(signal.SIGTERM, stop_daemon);
+    signal.signal(signal.SIGINT, stop_daemon);
+    
+    if (args.sources): # Sources given along with daemon make its first job...
+        spool.submit_job(args.daemon, ';'.join([get_source_str(source) for source in args.sources]));
+    
+    pool = None;
+    if (args.jobs > 1): # (Forked after data store is loaded; workers keep their own repository identifiers memo.)
+        pool = multiprocessing.Pool(args.jobs, init_daemon_worker);
+    
+    print("[daemon] Waiting for jobs (Ctrl-C to stop)");
+    reclaim = True; # Jobs left claimed by a previous (killed) daemon are processed first.
+    while (not daemon_stop_requested):
+        job_paths = spool.claim_jobs(args.daemon, reclaim);
+        reclaim = False;
+        if (job_paths):
+            process_daemon_batch(job_paths, pool);
+        else:
+            time.sleep(args.poll_interval);
+    
+    if (pool is not None):
+        pool.close();
+        pool.join();
+    print("[daemon] Stopped");
+
+
+# Driver for scraper.
+def main():
+    
+    global args;
+    global path_in_repo;
 
     args = process_args();
+    if (args.submit): # Only submit job to daemon (no data store is loaded)...
+        submit_job();
+        return;
+    profiling.start(args.profile, args.profile_memory);
     print("Checking arguments");
     check_args();
     
@@ -408,58 +1314,53 @@ def main():
     print('');
     
     t1 = datetime.datetime.now();
-    num_repos = len(args.sources);
-    for i in range(0, num_repos):
-        
-        print("Processing repository " + str(i+1) + " of " + str(num_repos));
-        
-        source = args.sources[i];
-        
-        path_to_repo = source['uri'];
-        print("[instance] Local path: \'" + path_to_repo + '\'');
-        path_to_repo = os.path.abspath(path_to_repo);
-        
-        remote_origin_url = sh.get_remote_origin_url(path_to_repo);
-        repo_remote_hostname, repo_owner, repo_name = sh.get_repo_id(remote_origin_url);
-        if (args.anonymize):
-            repo_remote_hostname = sh.get_hash_str(repo_remote_hostname);
-            repo_owner = sh.get_hash_str(repo_owner);
-            repo_name = sh.get_hash_str(repo_name);
-
-        paths = args.paths + source['paths_in_repo'];
-        paths = list(set(paths)); # Eliminate any duplicates.
-        paths = paths if paths else ['.'];
-        
-        labels_for_repo = args.labels + source['labels_for_repo'];
-        labels_for_repo = tuple(list(set(labels_for_repo))); # Eliminate any duplicates.
-
-        since = '';
-        if (len(source['since']) > 1):
-            print(sh.get_warning_str("Too many \'since\' dates"));
-        elif (len(source['since']) == 1):
-            since = source['since'][0]; # Only elem in list.
-        since = sh.get_since_dt_str(since) if since else since; # To potentially prevent unnecessary function call.
-        since_dt_str = since if since else args.since;
-        
-        until = '';
-        if (len(source['until']) > 1):
-            print(sh.get_warning_str("Too many \'until\' dates"));
-        elif (len(source['until']) == 1):
-            until = source['until'][0]; # Only elem in list.
-        until = sh.get_until_dt_str(until) if until else until; # To potentially prevent unnecessary function call.
-        until_dt_str = until if until else args.until;
-
-        num_paths = len(paths);
-        for j in range(0, num_paths): # For each path in repo...
+    run_span = instrument.start_span('scraper.run');
+    if (args.daemon):
+        run_daemon();
+    else:
+        num_repos = len(args.sources);
+        for i in range(0, num_repos):
             
-            path_in_repo = paths[j];
-            print("Processing repository path " + str(j+1) + " of " + str(num_paths));
-            print("[instance] Path: \'" + path_in_repo + "\'");
-            print("[instance] Since: " + since_dt_str);
-            print("[instance] Until: " + until_dt_str);
-            process_project();
-        
-        print('');
+            print("Processing repository " + str(i+1) + " of " + str(num_repos));
+            
+            source = args.sources[i];
+            
+            print("[instance] Local path: \'" + source['uri'] + '\'');
+            if (heads_conn is not None):
+                (heads_key, head) = get_source_head(source);
+                if (is_source_unchanged(heads_key, head)):
+                    print("[instance] Unchanged since last scrape (HEAD " + head[:12] + "); skipping");
+                    print('');
+                    continue;
+            paths = set_repo(source);
+
+            num_paths = len(paths);
+            for j in range(0, num_paths): # For each path in repo...
+                
+                path_in_repo = paths[j];
+                print("Processing repository path " + str(j+1) + " of " + str(num_paths));
+                print("[instance] Path: \'" + path_in_repo + "\'");
+                print("[instance] Since: " + since_dt_str);
+                print("[instance] Until: " + until_dt_str);
+                process_project();
+            
+            if (heads_conn is not None and head is not None): # (Once its commit records are in data store.)
+                heads.set_heads(heads_conn, [(heads_key, head)]);
+            
+            print('');
+    
+    if (cache_conn is not None):
+        cache.close_cache(cache_conn);
+    if (heads_conn is not None):
+        heads.close_heads(heads_conn);
+    pseudonyms.close_table();
+    
+    instrument.end_span(run_span);
+    instrument.close_trace();
+    
+    report_paths = profiling.stop(os.path.splitext(args.data_store)[0]);
+    for report_path in report_paths:
+        print("[global] Profile: \'" + report_path + '\'');
     
     t2 = datetime.datetime.now();
     t = t2 - t1;
@@ -468,5 +1369,5 @@ def main():
     return;
 
 
-main();
-
+if (__name__ == '__main__'):
+    main();